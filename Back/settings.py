@@ -83,6 +83,26 @@ DATABASES = {
     }
 }
 
+# Cache (LocMem por defecto; configurable por entorno, p.ej. DatabaseCache o RedisCache en producción)
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'u2group-cache'),
+    }
+}
+
+# LocMem es local a cada proceso: las cachés que deben verse igual en todos los workers
+# (carritos, payloads de productos) solo se activan con un backend compartido (Redis,
+# Memcached o DatabaseCache). Con un solo proceso se puede forzar con CACHE_IS_SHARED=true.
+CACHE_IS_SHARED = os.environ.get(
+    'CACHE_IS_SHARED',
+    str(not CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache')))
+).lower() in ['1', 'true', 'yes']
+
+# Buffer de contadores (likes, favoritos, vistas): se escriben cada N segundos o M eventos
+COUNTER_BUFFER_FLUSH_INTERVAL = int(os.environ.get('COUNTER_BUFFER_FLUSH_INTERVAL', 5))
+COUNTER_BUFFER_FLUSH_EVENTS = int(os.environ.get('COUNTER_BUFFER_FLUSH_EVENTS', 100))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -119,6 +139,8 @@ STATICFILES_DIRS = [
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# URL pública del backend, usada para URLs de media fuera de un request (p.ej. payloads en caché)
+BASE_URL = os.environ.get('BASE_URL', 'http://localhost:8000')
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
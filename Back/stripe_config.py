@@ -2,9 +2,13 @@
 Stripe payment configuration and utilities for U2Group
 """
 
+import json
 import os
+import time
+
 import stripe
 from django.conf import settings
+from django.core.cache import cache
 
 # Initialize Stripe with secret key
 stripe.api_key = os.environ.get('STRIPE_SECRET_KEY', 'sk_test_your_stripe_secret_key_here')
@@ -119,3 +123,181 @@ def test_stripe_connection():
             False,
             f"❌ Error inesperado: {str(e)}"
         )
+
+
+# Códigos de descuento locales (se validan sin llamar a Stripe)
+DISCOUNT_CODES = {
+    'DESCUENTO20': {
+        'percentage': 20,
+        'min_amount': 1000,  # $10.00 en centavos
+        'max_discount': 5000,  # $50.00 en centavos
+        'active': True
+    },
+    'WELCOME10': {
+        'percentage': 10,
+        'min_amount': 500,   # $5.00 en centavos
+        'max_discount': 2000, # $20.00 en centavos
+        'active': True
+    },
+    'FLASH25': {
+        'percentage': 25,
+        'min_amount': 2000,  # $20.00 en centavos
+        'max_discount': 10000, # $100.00 en centavos
+        'active': True
+    }
+}
+
+# Códigos promocionales de Stripe sincronizados por el comando sync_promotion_codes
+# (guardados en SiteConfig); las validaciones nunca consultan Stripe
+PROMOTION_CODES_CONFIG_KEY = 'stripe_promotion_codes'
+PROMOTION_CODES_CACHE_KEY = 'stripe:promotion_codes'
+PROMOTION_CODES_CACHE_TTL = 60 * 5
+STRIPE_PAGE_SIZE = 100  # Máximo permitido por las APIs de listado de Stripe
+
+# Tiempo tras el cual se reintenta validar la cuenta de Stripe si falló
+STRIPE_CONFIG_RETRY_AFTER = 60
+
+_stripe_config_payload = None
+_stripe_config_retry_at = 0.0
+
+
+def _normalize_promotion_code(promotion_code):
+    """
+    Normalizar un código promocional de Stripe al mismo formato que DISCOUNT_CODES
+
+    Returns:
+        dict | None: Información del descuento o None si no es un cupón porcentual
+    """
+    coupon = promotion_code.coupon
+    if not coupon.percent_off:
+        # Solo se soportan cupones porcentuales
+        return None
+
+    restrictions = promotion_code.get('restrictions') or {}
+    return {
+        'percentage': coupon.percent_off,
+        'min_amount': restrictions.get('minimum_amount') or 0,
+        'max_discount': None,
+        'active': bool(promotion_code.active and coupon.valid)
+    }
+
+
+def fetch_promotion_codes():
+    """
+    Listar todos los códigos promocionales activos de Stripe (paginando)
+
+    Returns:
+        tuple: ({código: información del descuento}, número de llamadas a la API)
+    """
+    codes = {}
+    api_calls = 1
+    page = stripe.PromotionCode.list(active=True, limit=STRIPE_PAGE_SIZE)
+    while True:
+        for promotion_code in page.data:
+            discount_info = _normalize_promotion_code(promotion_code)
+            if discount_info and discount_info['active']:
+                codes[promotion_code.code.strip().upper()] = discount_info
+        if not page.has_more:
+            break
+        page = stripe.PromotionCode.list(active=True, limit=STRIPE_PAGE_SIZE, starting_after=page.data[-1].id)
+        api_calls += 1
+    return codes, api_calls
+
+
+def save_promotion_codes(codes):
+    """
+    Guardar los códigos promocionales sincronizados en SiteConfig
+
+    Args:
+        codes (dict): {código: información del descuento}
+    """
+    from admin_api.models import SiteConfig
+
+    SiteConfig.objects.update_or_create(
+        key=PROMOTION_CODES_CONFIG_KEY,
+        defaults={
+            'value': json.dumps(codes),
+            'category': 'system',
+            'description': 'Códigos promocionales activos de Stripe (sync_promotion_codes)'
+        }
+    )
+    cache.delete(PROMOTION_CODES_CACHE_KEY)
+
+
+def get_promotion_codes():
+    """
+    Códigos promocionales sincronizados (desde la caché con TTL o SiteConfig)
+
+    Returns:
+        dict: {código: información del descuento}
+    """
+    codes = cache.get(PROMOTION_CODES_CACHE_KEY)
+    if codes is not None:
+        return codes
+
+    from admin_api.models import SiteConfig
+
+    value = SiteConfig.objects.filter(key=PROMOTION_CODES_CONFIG_KEY).values_list('value', flat=True).first()
+    try:
+        codes = json.loads(value) if value else {}
+    except ValueError:
+        print(f"❌ Códigos promocionales inválidos en SiteConfig ({PROMOTION_CODES_CONFIG_KEY})")
+        codes = {}
+    cache.set(PROMOTION_CODES_CACHE_KEY, codes, PROMOTION_CODES_CACHE_TTL)
+    return codes
+
+
+def get_discount_code(code):
+    """
+    Obtener la información de un código de descuento sin llamar a Stripe.
+    Se buscan los códigos locales y luego los códigos promocionales de Stripe
+    sincronizados previamente (ver sync_promotion_codes).
+
+    Args:
+        code (str): Código de descuento
+
+    Returns:
+        dict | None: Información del descuento o None si es inválido
+    """
+    code = (code or '').strip().upper()
+    if not code:
+        return None
+
+    discount_info = DISCOUNT_CODES.get(code) or get_promotion_codes().get(code)
+    if not discount_info or not discount_info.get('active'):
+        return None
+    return discount_info
+
+
+def get_stripe_config_payload():
+    """
+    Obtener la configuración pública de Stripe para el frontend.
+    Un resultado válido se guarda para toda la vida del proceso; si la validación
+    falla (p.ej. un error de red) se reintenta pasados STRIPE_CONFIG_RETRY_AFTER segundos.
+
+    Returns:
+        dict: Configuración de Stripe
+    """
+    global _stripe_config_payload, _stripe_config_retry_at
+    if _stripe_config_payload is not None and (
+        _stripe_config_payload['stripe_configured'] or time.monotonic() < _stripe_config_retry_at
+    ):
+        return _stripe_config_payload
+
+    validation_result = validate_stripe_config()
+    is_valid = validation_result.get('valid', False)
+    message = 'Stripe configured successfully' if is_valid else validation_result.get('error', 'Stripe configuration error')
+    _stripe_config_payload = {
+        'stripe_configured': is_valid,
+        'publishable_key': settings.STRIPE_PUBLISHABLE_KEY,
+        'message': message
+    }
+    if not is_valid:
+        _stripe_config_retry_at = time.monotonic() + STRIPE_CONFIG_RETRY_AFTER
+    return _stripe_config_payload
+
+
+def reset_stripe_config_payload():
+    """Forzar el recálculo de la configuración de Stripe en el próximo request"""
+    global _stripe_config_payload
+    _stripe_config_payload = None
@@ -0,0 +1,133 @@
+"""
+Tablas agregadas de ventas del marketplace (DailySales y DailyProductSales).
+
+Los reportes leen estas tablas (O(días)) en lugar de recorrer todas las órdenes.
+Cada día se recalcula completo desde las órdenes, de modo que recalcularlo varias
+veces es idempotente. El refresco incremental solo recalcula los días de las
+órdenes modificadas desde la última marca de agua (watermark) guardada en SiteConfig.
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyProductSales, DailySales, MarketplaceOrder, MarketplaceOrderItem, SiteConfig
+
+# Estados de orden que cuentan como venta
+REVENUE_STATUSES = ('paid', 'processing', 'completed')
+
+WATERMARK_KEY = 'sales_rollup_watermark'
+# Solapamiento aplicado a la marca de agua para no perder órdenes confirmadas tarde
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+
+def _day_bounds(day):
+    """Inicio y fin (zona horaria del sitio) de un día, para filtrar por rango e índices"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def rebuild_sales_day(day):
+    """
+    Recalcular las ventas de un día desde las órdenes
+
+    Args:
+        day (date): Día a recalcular (fecha de creación de las órdenes)
+    """
+    start, end = _day_bounds(day)
+    line_total = ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    items = MarketplaceOrderItem.objects.filter(
+        order__status__in=REVENUE_STATUSES,
+        order__created_at__gte=start,
+        order__created_at__lt=end,
+    )
+
+    product_rows = [
+        DailyProductSales(
+            date=day,
+            product_id=row['product_id'],
+            category=row['product__category'],
+            style=row['product__style'],
+            orders=row['orders'],
+            units=row['units'],
+            revenue=row['revenue'],
+        )
+        for row in items.values('product_id', 'product__category', 'product__style').annotate(
+            orders=Count('order_id', distinct=True),
+            units=Sum('quantity'),
+            revenue=Sum(line_total),
+        )
+    ]
+    totals = items.aggregate(orders=Count('order_id', distinct=True), units=Sum('quantity'), revenue=Sum(line_total))
+
+    with transaction.atomic():
+        DailyProductSales.objects.filter(date=day).exclude(
+            product_id__in=[row.product_id for row in product_rows]
+        ).delete()
+        if product_rows:
+            DailyProductSales.objects.bulk_create(
+                product_rows,
+                update_conflicts=True,
+                unique_fields=['date', 'product'],
+                update_fields=['category', 'style', 'orders', 'units', 'revenue', 'updated_at'],
+            )
+
+        if totals['orders']:
+            DailySales.objects.update_or_create(
+                date=day,
+                defaults={'orders': totals['orders'], 'units': totals['units'], 'revenue': totals['revenue']}
+            )
+        else:
+            DailySales.objects.filter(date=day).delete()
+
+
+def rebuild_sales_days(days):
+    """Recalcular varios días (sin repetir)"""
+    days = sorted(set(days))
+    for day in days:
+        rebuild_sales_day(day)
+    return days
+
+
+def refresh_sales_rollups(since=None):
+    """
+    Recalcular los días de las órdenes modificadas desde la marca de agua
+
+    Args:
+        since (datetime): Fecha desde la cual buscar cambios (por defecto la marca de agua guardada;
+                          si no existe se recalcula todo)
+
+    Returns:
+        list: Días recalculados
+    """
+    if since is None:
+        watermark = SiteConfig.objects.filter(key=WATERMARK_KEY).values_list('value', flat=True).first()
+        since = datetime.fromisoformat(watermark) - REFRESH_OVERLAP if watermark else None
+
+    changed = MarketplaceOrder.objects.all()
+    if since is not None:
+        changed = changed.filter(updated_at__gte=since)
+
+    new_watermark = changed.aggregate(last=Max('updated_at'))['last']
+    days = rebuild_sales_days(
+        changed.annotate(day=TruncDate('created_at')).order_by().values_list('day', flat=True).distinct()
+    )
+
+    if new_watermark is not None:
+        SiteConfig.objects.update_or_create(
+            key=WATERMARK_KEY,
+            defaults={
+                'value': new_watermark.isoformat(),
+                'category': 'system',
+                'description': 'Última orden incluida en las tablas de ventas'
+            }
+        )
+    return days
+
+
+def refresh_order_sales(order):
+    """Efecto secundario de OrderStateMachine: recalcular el día de la orden"""
+    rebuild_sales_day(timezone.localdate(order.created_at))
@@ -0,0 +1,247 @@
+"""
+Procesamiento del contenido de los blogs al guardar (render once).
+
+El contenido se escribe en el editor como texto plano (párrafos separados por
+líneas en blanco) o con HTML básico. Al guardar se convierte una sola vez en
+HTML saneado (content_html) y de ahí se derivan el extracto, el número de
+palabras, el tiempo de lectura y las imágenes referenciadas; así el cliente
+solo muestra el HTML ya listo. Un hash del contenido evita volver a procesarlo
+si no cambió. Las etiquetas (tags) también se normalizan aquí.
+
+Este módulo no importa modelos para poder usarse desde Blog.save().
+"""
+
+import hashlib
+import json
+import math
+import re
+from html import escape
+from html.parser import HTMLParser
+
+from django.utils.text import slugify
+
+WORDS_PER_MINUTE = 200
+EXCERPT_WORDS = 40
+MAX_TAG_LENGTH = 50
+
+# Etiquetas permitidas y sus atributos; el resto se descarta (se conserva su texto)
+ALLOWED_TAGS = {
+    'p': (), 'br': (), 'strong': (), 'b': (), 'em': (), 'i': (), 'u': (),
+    'h2': (), 'h3': (), 'h4': (), 'ul': (), 'ol': (), 'li': (),
+    'blockquote': (), 'code': (), 'pre': (), 'hr': (),
+    'a': ('href', 'title'),
+    'img': ('src', 'alt', 'title', 'width', 'height'),
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+# Etiquetas cuyo contenido tampoco se conserva
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript'}
+ALLOWED_URL_SCHEMES = ('http://', 'https://', 'mailto:', '/')
+BLOCK_TAGS = {'p', 'h2', 'h3', 'h4', 'ul', 'ol', 'li', 'blockquote', 'pre', 'hr', 'br'}
+
+HTML_TAG_RE = re.compile(r'<\s*/?\s*[a-zA-Z][^>]*>')
+BLOCK_TAG_RE = re.compile(r'<\s*(?:p|h[1-6]|ul|ol|blockquote|pre|div)\b', re.IGNORECASE)
+IMAGE_URL_RE = re.compile(r'(https?://\S+?\.(?:jpe?g|png|gif|webp|avif))(?=[\s)"\']|$)', re.IGNORECASE)
+
+
+def _safe_url(url):
+    url = (url or '').strip()
+    return url if url.lower().startswith(ALLOWED_URL_SCHEMES) else None
+
+
+class _Sanitizer(HTMLParser):
+    """Reescribe el HTML conservando solo ALLOWED_TAGS y junta el texto plano y las imágenes"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.images = []
+        self._open = []
+        self._dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self._dropping += 1
+            return
+        if self._dropping:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag not in ALLOWED_TAGS:
+            return
+
+        rendered = []
+        for name, value in attrs:
+            if name not in ALLOWED_TAGS[tag]:
+                continue
+            if name in ('href', 'src'):
+                value = _safe_url(value)
+                if value is None:
+                    continue
+            rendered.append(f' {name}="{escape(value or "", quote=True)}"')
+
+        if tag == 'img':
+            src = dict(attrs).get('src')
+            if not _safe_url(src):
+                return
+            self.images.append(src.strip())
+            rendered.append(' loading="lazy"')
+        if tag == 'a':
+            rendered.append(' rel="noopener noreferrer"')
+
+        self.html.append(f'<{tag}{"".join(rendered)}>')
+        if tag not in VOID_TAGS:
+            self._open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self._open and self._open[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self._dropping = max(0, self._dropping - 1)
+            return
+        if self._dropping or tag not in self._open:
+            return
+        # Cerrar también las etiquetas que quedaron abiertas dentro de esta
+        while self._open:
+            open_tag = self._open.pop()
+            self.html.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+
+    def handle_data(self, data):
+        if self._dropping:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self._open:
+            self.html.append(f'</{self._open.pop()}>')
+
+
+def _text_to_html(content, escape_text=True):
+    """Texto plano: un <p> por bloque separado por líneas en blanco, <br> por salto de línea"""
+    blocks = [block.strip() for block in re.split(r'\n\s*\n', content.replace('\r\n', '\n'))]
+    html = []
+    for block in blocks:
+        if block:
+            lines = [escape(line.strip(), quote=False) if escape_text else line.strip() for line in block.split('\n')]
+            html.append(f'<p>{"<br>".join(lines)}</p>')
+    return '\n'.join(html)
+
+
+def render_content(content):
+    """
+    Convertir el contenido del editor en HTML saneado
+
+    Args:
+        content (str): Texto plano o HTML básico
+
+    Returns:
+        tuple: (html saneado, texto plano, lista de URLs de imágenes)
+    """
+    content = content or ''
+    if not HTML_TAG_RE.search(content):
+        source = _text_to_html(content)
+    elif not BLOCK_TAG_RE.search(content):
+        # HTML en línea (negritas, enlaces) dentro de párrafos escritos como texto
+        source = _text_to_html(content, escape_text=False)
+    else:
+        source = content
+
+    parser = _Sanitizer()
+    parser.feed(source)
+    parser.close()
+
+    text = ' '.join(''.join(parser.text).split())
+    images = list(parser.images)
+    # URLs de imágenes pegadas como texto (fuera de <img>)
+    for url in IMAGE_URL_RE.findall(text):
+        images.append(url)
+    return ''.join(parser.html), text, list(dict.fromkeys(images))
+
+
+def content_hash(content):
+    return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+
+def build_excerpt(text, words=EXCERPT_WORDS):
+    """Primeras palabras del texto plano, con puntos suspensivos si se recorta"""
+    parts = text.split()
+    excerpt = ' '.join(parts[:words])
+    return f'{excerpt}…' if len(parts) > words else excerpt
+
+
+def format_read_time(word_count):
+    """Tiempo de lectura en el formato que usa el frontend ('5 min')"""
+    return f'{max(1, math.ceil(word_count / WORDS_PER_MINUTE))} min'
+
+
+def process_blog_content(blog, force=False):
+    """
+    Renderizar el contenido de un blog y derivar sus campos (sin guardar)
+
+    Args:
+        blog (Blog): Blog a procesar
+        force (bool): Procesar aunque el contenido no haya cambiado
+
+    Returns:
+        list: Campos modificados (vacía si el contenido no cambió)
+    """
+    digest = content_hash(blog.content)
+    if not force and digest == blog.content_hash and blog.excerpt:
+        return []
+
+    # Un extracto igual al derivado del contenido anterior se regenera; uno escrito a mano no
+    previous_text = render_content(blog.content_html)[1] if blog.content_html else ''
+    derived_excerpt = not blog.excerpt or blog.excerpt == build_excerpt(previous_text)
+
+    html, text, images = render_content(blog.content)
+    word_count = len(text.split())
+
+    blog.content_html = html
+    blog.content_images = images
+    blog.word_count = word_count
+    blog.read_time = format_read_time(word_count)
+    blog.content_hash = digest
+    changed = ['content_html', 'content_images', 'word_count', 'read_time', 'content_hash']
+
+    if derived_excerpt:
+        blog.excerpt = build_excerpt(text)
+        changed.append('excerpt')
+    return changed
+
+
+def parse_tags(tags):
+    """
+    Normalizar el campo de texto libre Blog.tags
+
+    Acepta una lista JSON ('["a", "b"]') o texto separado por comas, punto y coma,
+    saltos de línea o '#'.
+
+    Returns:
+        dict: {slug: nombre} en el orden en que aparecen, sin repetidos
+    """
+    tags = (tags or '').strip()
+    names = None
+    if tags.startswith('['):
+        try:
+            names = [str(name) for name in json.loads(tags)]
+        except ValueError:
+            names = None
+    if names is None:
+        names = re.split(r'[,;\n#]', tags.strip('[]'))
+
+    parsed = {}
+    for name in names:
+        name = ' '.join(name.strip().strip('\'"').split())[:MAX_TAG_LENGTH]
+        slug = slugify(name)[:MAX_TAG_LENGTH]
+        if slug and slug not in parsed:
+            parsed[slug] = name
+    return parsed
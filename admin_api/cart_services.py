@@ -0,0 +1,158 @@
+"""
+Servicios del carrito del marketplace.
+
+Los items del carrito se cargan en una sola consulta que anota el subtotal de
+cada línea y el total del carrito (función de ventana), con solo los campos de
+tarjeta del producto. El resultado serializado se guarda en caché por usuario
+y se invalida en cada escritura del carrito y cuando cambia un producto que
+contiene (ver signals). La caché solo se usa con un backend compartido entre
+workers (settings.CACHE_IS_SHARED); con LocMem una escritura invalidaría solo
+el proceso que la atendió.
+
+Cada usuario tiene como máximo un carrito activo (restricción única parcial
+sobre user WHERE is_active), lo que permite resolverlo y agregar líneas con
+un INSERT ... ON CONFLICT en lugar de leer y escribir por separado.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Prefetch, Sum, Window
+
+from .models import Cart, CartItem
+from .serializers import CartSerializer, PRODUCT_CARD_FIELDS
+
+CART_SNAPSHOT_TTL = 60 * 10
+
+
+def _snapshot_cache_key(user_id):
+    return f'cart:snapshot:{user_id}'
+
+
+def cart_items_queryset():
+    """Items con line_subtotal y cart_total calculados en SQL y el producto reducido"""
+    line_subtotal = ExpressionWrapper(
+        F('quantity') * F('price'),
+        output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+    return (
+        CartItem.objects
+        .select_related('product')
+        .only('id', 'cart_id', 'quantity', 'price', 'plan_type', 'area_unit',
+              *[f'product__{field}' for field in PRODUCT_CARD_FIELDS])
+        .annotate(
+            line_subtotal=line_subtotal,
+            cart_total=Window(expression=Sum(line_subtotal), partition_by=[F('cart_id')])
+        )
+        .order_by('id')
+    )
+
+
+def with_cart_items(queryset):
+    """Precargar los items anotados en un queryset de carritos"""
+    return queryset.prefetch_related(Prefetch('items', queryset=cart_items_queryset()))
+
+
+def get_or_create_active_cart(user_id):
+    """
+    Obtener el carrito activo de un usuario, creándolo si no existe.
+
+    Si dos requests crean el carrito a la vez, la restricción única parcial
+    hace fallar a una de ellas, que entonces usa el carrito de la otra.
+
+    Returns:
+        tuple: (Cart, created)
+    """
+    cart = Cart.objects.filter(user_id=user_id, is_active=True).first()
+    if cart is not None:
+        return cart, False
+    try:
+        with transaction.atomic():
+            return Cart.objects.create(user_id=user_id, is_active=True), True
+    except IntegrityError:
+        return Cart.objects.get(user_id=user_id, is_active=True), False
+
+
+def upsert_cart_item(cart_id, product_id, quantity, price, plan_type, area_unit):
+    """
+    Agregar un producto al carrito con un solo INSERT ... ON CONFLICT (cart, product) DO UPDATE.
+    Si la línea ya existe se reemplazan la cantidad, el precio y la variante del plano
+    (no se suma la cantidad), igual que al volver a elegir plan/área desde la ficha del producto.
+
+    Args:
+        cart_id (int): ID del carrito activo
+        product_id (int): ID del producto
+        quantity (int): Cantidad
+        price (Decimal): Precio al momento de agregar
+        plan_type (str): 'pdf' o 'editable'
+        area_unit (str): 'm2' o 'sqft'
+    """
+    CartItem.objects.bulk_create(
+        [CartItem(
+            cart_id=cart_id,
+            product_id=product_id,
+            quantity=quantity,
+            price=Decimal(str(price)),
+            plan_type=plan_type,
+            area_unit=area_unit
+        )],
+        update_conflicts=True,
+        unique_fields=['cart', 'product'],
+        update_fields=['quantity', 'price', 'plan_type', 'area_unit'],
+    )
+
+
+def get_cart_snapshot(user_id, request=None):
+    """
+    Obtener el carrito activo serializado de un usuario (desde caché si existe
+    y la caché es compartida).
+    Si el usuario no tiene carrito activo se crea uno vacío.
+
+    Args:
+        user_id (int): ID del usuario
+        request: Request para construir URLs absolutas
+
+    Returns:
+        dict: Datos serializados del carrito
+    """
+    cache_key = _snapshot_cache_key(user_id)
+    data = cache.get(cache_key) if settings.CACHE_IS_SHARED else None
+    if data is not None:
+        return data
+
+    cart = with_cart_items(Cart.objects.filter(user_id=user_id, is_active=True)).first()
+    if cart is None:
+        cart, _ = get_or_create_active_cart(user_id)
+        cart._prefetched_objects_cache = {'items': CartItem.objects.none()}
+
+    data = CartSerializer(cart, context={'request': request}).data
+    if settings.CACHE_IS_SHARED:
+        cache.set(cache_key, data, CART_SNAPSHOT_TTL)
+    return data
+
+
+def invalidate_cart_snapshot(user_id):
+    """Invalidar el carrito en caché de un usuario"""
+    cache.delete(_snapshot_cache_key(user_id))
+
+
+def product_cart_user_ids(product_id):
+    """Usuarios con un carrito activo que contiene el producto"""
+    return list(
+        CartItem.objects.filter(product_id=product_id, cart__is_active=True)
+        .values_list('cart__user_id', flat=True).distinct()
+    )
+
+
+def invalidate_cart_snapshots(user_ids):
+    """Invalidar los carritos en caché de varios usuarios"""
+    if user_ids:
+        cache.delete_many([_snapshot_cache_key(user_id) for user_id in user_ids])
+
+
+def invalidate_product_carts(product_id):
+    """Invalidar los carritos en caché que contienen un producto (cambió su precio, imagen, etc.)"""
+    if settings.CACHE_IS_SHARED:
+        invalidate_cart_snapshots(product_cart_user_ids(product_id))
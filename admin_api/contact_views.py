@@ -6,6 +6,7 @@ from django.core.mail import send_mail
 from django.conf import settings
 from .models import ContactMessage
 from .serializers import ContactMessageSerializer
+from .dashboard_services import contact_message_counts, invalidate_dashboard_summary
 
 class ContactMessageViewSet(viewsets.ModelViewSet):
     """
@@ -49,6 +50,7 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
     def mark_all_as_read(self, request):
         """Marcar todos los mensajes como leídos"""
         ContactMessage.objects.filter(is_read=False).update(is_read=True)
+        invalidate_dashboard_summary()
         return Response({'status': 'success'})
     
     @action(detail=True, methods=['patch'])
@@ -75,18 +77,14 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Obtener estadísticas de mensajes"""
-        total = ContactMessage.objects.count()
-        new_count = ContactMessage.objects.filter(status='new').count()
-        read_count = ContactMessage.objects.filter(status='read').count()
-        responded_count = ContactMessage.objects.filter(status='responded').count()
-        archived_count = ContactMessage.objects.filter(status='archived').count()
+        counts = contact_message_counts()
         
         return Response({
-            'total': total,
-            'new': new_count,
-            'read': read_count,
-            'responded': responded_count,
-            'archived': archived_count
+            'total': counts['total'],
+            'new': counts['new'],
+            'read': counts['read'],
+            'responded': counts['responded'],
+            'archived': counts['archived']
         })
 
 @api_view(['POST'])
@@ -0,0 +1,131 @@
+"""
+Buffer de escritura diferida (write-behind) para contadores de alto volumen.
+
+Los incrementos (likes, favoritos, vistas) se acumulan en memoria del proceso
+por (modelo, campo, objeto) y se escriben juntos cada FLUSH_INTERVAL segundos
+o cada FLUSH_EVENTS eventos, con una sola sentencia por (modelo, campo):
+
+    UPDATE tabla SET campo = campo + CASE id WHEN 1 THEN 3 WHEN 7 THEN 1 ... END
+    WHERE id IN (1, 7, ...)
+
+Como se escriben deltas relativos (no valores absolutos como bulk_update),
+varios workers de gunicorn pueden vaciar sus buffers a la vez sin pisarse.
+El buffer se vacía también al terminar el proceso (atexit).
+"""
+
+import atexit
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+
+
+class CounterBuffer:
+    """Acumulador de incrementos por proceso"""
+
+    def __init__(self, flush_interval, flush_events):
+        self.flush_interval = flush_interval
+        self.flush_events = flush_events
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # {(modelo, campo): {pk: delta}}
+        self._pending = defaultdict(lambda: defaultdict(int))
+        self._events = 0
+        self._last_flush = time.monotonic()
+        self._pid = os.getpid()
+        self._timer = None
+
+    def _ensure_process(self):
+        # Tras un fork (gunicorn --preload) el hijo no hereda el hilo ni debe reescribir
+        # los incrementos del padre: empieza con un buffer vacío
+        if self._pid != os.getpid():
+            self._reset()
+        if self._timer is None and self.flush_interval > 0:
+            self._timer = threading.Thread(target=self._run_timer, name='counter-buffer-flush', daemon=True)
+            self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+                # Este hilo no pasa por el ciclo de request: cerrar su conexión
+                connection.close()
+
+    def increment(self, model, pk, field, delta=1):
+        """
+        Registrar un incremento (o decremento) de un contador
+
+        Args:
+            model: Modelo del objeto (p.ej. Blog)
+            pk (int): ID del objeto
+            field (str): Campo contador (p.ej. 'like_count')
+            delta (int): Cantidad a sumar
+        """
+        with self._lock:
+            self._ensure_process()
+            self._pending[(model, field)][pk] += delta
+            self._events += 1
+            should_flush = self._events >= self.flush_events
+
+        if should_flush:
+            self.flush()
+
+    def pending(self, model, pk, field):
+        """Delta aún no escrito en este proceso para un contador"""
+        with self._lock:
+            return self._pending.get((model, field), {}).get(pk, 0)
+
+    def flush(self):
+        """
+        Escribir todos los incrementos acumulados
+
+        Returns:
+            int: Número de sentencias UPDATE ejecutadas
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+                return 0
+            pending = self._pending
+            self._pending = defaultdict(lambda: defaultdict(int))
+            self._events = 0
+            self._last_flush = time.monotonic()
+
+        statements = 0
+        for (model, field), deltas in pending.items():
+            deltas = {pk: delta for pk, delta in deltas.items() if delta}
+            if not deltas:
+                continue
+            try:
+                # Los contadores son enteros; los puntajes (p.ej. popularidad) son flotantes
+                output_field = FloatField() if any(isinstance(delta, float) for delta in deltas.values()) else IntegerField()
+                model.objects.filter(pk__in=deltas).update(**{
+                    field: F(field) + Case(
+                        *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+                        default=Value(0),
+                        output_field=output_field
+                    )
+                })
+                statements += 1
+            except Exception as e:
+                print(f"❌ Error escribiendo contadores {model.__name__}.{field}: {e}")
+                # Devolver los incrementos al buffer para el siguiente intento
+                with self._lock:
+                    for pk, delta in deltas.items():
+                        self._pending[(model, field)][pk] += delta
+        return statements
+
+
+counter_buffer = CounterBuffer(
+    flush_interval=getattr(settings, 'COUNTER_BUFFER_FLUSH_INTERVAL', 5),
+    flush_events=getattr(settings, 'COUNTER_BUFFER_FLUSH_EVENTS', 100),
+)
+
+atexit.register(counter_buffer.flush)
@@ -0,0 +1,92 @@
+"""
+Resumen del panel de administración (contadores principales).
+
+Cada modelo se resume con una sola consulta de agregación condicional
+(Count(..., filter=Q(...))). El resultado se guarda en caché por un tiempo
+corto y se invalida explícitamente en las escrituras relevantes (ver signals).
+"""
+
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from design.models import DesignEntry
+from .models import Blog, ContactMessage, MarketplaceOrder, MarketplaceProduct, ProductFavorite, Project
+
+DASHBOARD_CACHE_KEY = 'admin:dashboard:summary'
+DASHBOARD_CACHE_TTL = 60
+RECENT_DAYS = 30
+
+
+def contact_message_counts():
+    """Contadores de mensajes de contacto por estado (una consulta)"""
+    return ContactMessage.objects.aggregate(
+        total=Count('id'),
+        unread=Count('id', filter=Q(is_read=False)),
+        **{value: Count('id', filter=Q(status=value)) for value, _ in ContactMessage.STATUS_CHOICES}
+    )
+
+
+def build_dashboard_summary():
+    """Calcular todos los contadores del panel"""
+    recent = timezone.now() - timedelta(days=RECENT_DAYS)
+    sale_statuses = ('paid', 'processing', 'completed')
+
+    orders = MarketplaceOrder.objects.aggregate(
+        total=Count('id'),
+        recent=Count('id', filter=Q(created_at__gte=recent)),
+        revenue=Sum('total_amount', filter=Q(status__in=sale_statuses)),
+        **{value: Count('id', filter=Q(status=value)) for value, _ in MarketplaceOrder.STATUS_CHOICES}
+    )
+    products = MarketplaceProduct.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        featured=Count('id', filter=Q(is_featured=True)),
+    )
+    blogs = Blog.objects.aggregate(
+        total=Count('id'),
+        featured=Count('id', filter=Q(featured=True)),
+        likes=Sum('like_count'),
+        favorites=Sum('favorite_count'),
+    )
+    projects = Project.objects.aggregate(
+        total=Count('id'),
+        featured=Count('id', filter=Q(featured=True)),
+        on_map=Count('id', filter=Q(show_on_map=True)),
+    )
+    design_entries = DesignEntry.objects.aggregate(
+        total=Count('id'),
+        recent=Count('id', filter=Q(created_at__gte=recent)),
+    )
+
+    # Sum() devuelve None cuando no hay filas
+    orders['revenue'] = orders['revenue'] or 0
+    blogs['likes'] = blogs['likes'] or 0
+    blogs['favorites'] = blogs['favorites'] or 0
+
+    return {
+        'orders': orders,
+        'products': products,
+        'product_favorites': ProductFavorite.objects.count(),
+        'blogs': blogs,
+        'projects': projects,
+        'contact_messages': contact_message_counts(),
+        'design_entries': design_entries,
+        'generated_at': timezone.now(),
+    }
+
+
+def get_dashboard_summary():
+    """Obtener el resumen del panel (desde caché si existe)"""
+    summary = cache.get(DASHBOARD_CACHE_KEY)
+    if summary is None:
+        summary = build_dashboard_summary()
+        cache.set(DASHBOARD_CACHE_KEY, summary, DASHBOARD_CACHE_TTL)
+    return summary
+
+
+def invalidate_dashboard_summary(*args, **kwargs):
+    """Invalidar el resumen en caché (se usa también como receptor de señales)"""
+    cache.delete(DASHBOARD_CACHE_KEY)
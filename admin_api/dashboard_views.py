@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .dashboard_services import get_dashboard_summary
+from .models import DailyProductSales, DailySales
+
+DEFAULT_REPORT_DAYS = 30
+DEFAULT_PRODUCTS_LIMIT = 10
+MAX_PRODUCTS_LIMIT = 100
+SALES_GROUPS = ('category', 'style')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard_summary(request):
+    """Contadores principales del panel en una sola llamada (caché de corta duración)"""
+    return Response(get_dashboard_summary())
+
+
+def get_report_range(request):
+    """
+    Obtener el rango de fechas del reporte (date_from/date_to, por defecto los últimos 30 días)
+
+    Raises:
+        ValueError: Si alguna fecha no tiene formato YYYY-MM-DD
+    """
+    date_to = request.query_params.get('date_to')
+    date_to = date.fromisoformat(date_to) if date_to else timezone.localdate()
+    date_from = request.query_params.get('date_from')
+    date_from = date.fromisoformat(date_from) if date_from else date_to - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+    return date_from, date_to
+
+
+def sum_sales(queryset):
+    return queryset.aggregate(orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue'))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sales_daily(request):
+    """Ventas por día del rango solicitado"""
+    try:
+        date_from, date_to = get_report_range(request)
+    except ValueError:
+        return Response({'error': 'Formato de fecha inválido (YYYY-MM-DD)'}, status=400)
+
+    queryset = DailySales.objects.filter(date__gte=date_from, date__lte=date_to)
+    days = list(queryset.order_by('date').values('date', 'orders', 'units', 'revenue'))
+    return Response({
+        'date_from': date_from,
+        'date_to': date_to,
+        'totals': sum_sales(queryset),
+        'days': days
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sales_by_product(request):
+    """Productos más vendidos del rango solicitado"""
+    try:
+        date_from, date_to = get_report_range(request)
+    except ValueError:
+        return Response({'error': 'Formato de fecha inválido (YYYY-MM-DD)'}, status=400)
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_PRODUCTS_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PRODUCTS_LIMIT:
+        return Response({'error': f'limit debe ser un entero entre 1 y {MAX_PRODUCTS_LIMIT}'}, status=400)
+
+    products = (
+        DailyProductSales.objects.filter(date__gte=date_from, date__lte=date_to)
+        .values('product_id', 'product__name', 'category', 'style')
+        .annotate(orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue'))
+        .order_by('-revenue')[:limit]
+    )
+    return Response({
+        'date_from': date_from,
+        'date_to': date_to,
+        'products': list(products)
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sales_by_group(request):
+    """Ventas agrupadas por categoría o estilo (?group_by=category|style)"""
+    group_by = request.query_params.get('group_by', 'category')
+    if group_by not in SALES_GROUPS:
+        return Response({'error': f'group_by debe ser uno de: {", ".join(SALES_GROUPS)}'}, status=400)
+    try:
+        date_from, date_to = get_report_range(request)
+    except ValueError:
+        return Response({'error': 'Formato de fecha inválido (YYYY-MM-DD)'}, status=400)
+
+    groups = (
+        DailyProductSales.objects.filter(date__gte=date_from, date__lte=date_to)
+        .values(group_by)
+        .annotate(orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue'))
+        .order_by('-revenue')
+    )
+    return Response({
+        'date_from': date_from,
+        'date_to': date_to,
+        'group_by': group_by,
+        'groups': list(groups)
+    })
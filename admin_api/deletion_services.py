@@ -0,0 +1,136 @@
+"""
+Borrado masivo de proyectos, blogs y productos del marketplace.
+
+Todo el lote se borra en una transacción con QuerySet.delete(), que elimina
+cada tabla relacionada con una sola sentencia por conjunto de IDs (en lugar de
+contar y borrar relación por relación). Los archivos de media de las filas
+borradas no se tocan en la petición: sus rutas se encolan en
+PendingFileDeletion dentro de la misma transacción y el comando
+sweep_deleted_files los elimina después.
+"""
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import (
+    Blog, BlogImage, MarketplaceOrderItem, MarketplaceProduct, MarketplaceProductImage,
+    PendingFileDeletion, Project, ProjectImage
+)
+from .signals import coalesce_on_commit
+
+# tipo -> (modelo, [(modelo con archivos, campo FK al objeto, campos de archivo)])
+BULK_DELETE_TARGETS = {
+    'project': (Project, [
+        (Project, 'id', ['image']),
+        (ProjectImage, 'project_id', ['image']),
+    ]),
+    'blog': (Blog, [
+        (Blog, 'id', ['image']),
+        (BlogImage, 'blog_id', ['image']),
+    ]),
+    'product': (MarketplaceProduct, [
+        (MarketplaceProduct, 'id', ['image', 'zip_file']),
+        (MarketplaceProductImage, 'product_id', ['image']),
+    ]),
+}
+BULK_DELETE_MAX_IDS = 500
+
+
+def media_path(value):
+    """Ruta relativa al almacenamiento de un archivo guardado (None para URLs externas o vacíos)"""
+    value = str(value or '').strip()
+    if not value or value.startswith(('http://', 'https://')):
+        return None
+    if value.startswith(settings.MEDIA_URL):
+        value = value[len(settings.MEDIA_URL):]
+    return value.lstrip('/') or None
+
+
+def collect_file_paths(file_sources, ids):
+    """Rutas de los archivos de los objetos a borrar y de sus relaciones (una consulta por modelo)"""
+    paths = set()
+    for model, fk_field, file_fields in file_sources:
+        for row in model.objects.filter(**{f'{fk_field}__in': ids}).values_list(*file_fields):
+            paths.update(path for path in map(media_path, row) if path)
+    return paths
+
+
+def queue_file_deletions(paths):
+    """Encolar archivos para el barrido posterior (sin repetir rutas ya encoladas)"""
+    PendingFileDeletion.objects.bulk_create(
+        [PendingFileDeletion(path=path) for path in sorted(paths)], ignore_conflicts=True, batch_size=500
+    )
+    return len(paths)
+
+
+def bulk_delete(target, ids):
+    """
+    Borrar varios objetos del mismo tipo en una transacción
+
+    Los productos con órdenes no se borran (borrarían el historial de ventas por
+    cascada); se devuelven en 'protected'.
+
+    Args:
+        target (str): 'project', 'blog' o 'product'
+        ids (list): IDs a borrar
+
+    Returns:
+        dict: Total borrado, conteo por modelo (de QuerySet.delete()), IDs borrados,
+              inexistentes y protegidos, y número de archivos encolados
+    """
+    model, file_sources = BULK_DELETE_TARGETS[target]
+    ids = list(dict.fromkeys(ids))
+
+    with transaction.atomic():
+        queryset = model.objects.filter(id__in=ids)
+        protected = []
+        if model is MarketplaceProduct:
+            protected = sorted(set(
+                MarketplaceOrderItem.objects.filter(product_id__in=ids).values_list('product_id', flat=True)
+            ))
+            queryset = queryset.exclude(id__in=protected)
+
+        found = list(queryset.select_for_update().values_list('id', flat=True))
+        deleted, by_model, queued = 0, {}, 0
+        if found:
+            paths = collect_file_paths(file_sources, found)
+            # Una señal por fila borrada: agrupar sus invalidaciones de caché
+            with coalesce_on_commit():
+                deleted, by_model = model.objects.filter(id__in=found).delete()
+            queued = queue_file_deletions(paths)
+
+    found_ids = set(found) | set(protected)
+    return {
+        'deleted': deleted,
+        'deleted_by_model': by_model,
+        'ids': found,
+        'missing': [pk for pk in ids if pk not in found_ids],
+        'protected': protected,
+        'files_queued': queued,
+    }
+
+
+def parse_bulk_ids(data):
+    """
+    IDs del cuerpo {'ids': [...]} de una petición de borrado masivo
+
+    Solo se aceptan enteros positivos o textos de dígitos ("12"); los booleanos
+    (True es un int en Python), decimales y demás valores se rechazan.
+
+    Raises:
+        ValueError: Si ids no es una lista de enteros o excede BULK_DELETE_MAX_IDS
+    """
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids:
+        raise ValueError('ids debe ser una lista no vacía')
+    if len(ids) > BULK_DELETE_MAX_IDS:
+        raise ValueError(f'Máximo {BULK_DELETE_MAX_IDS} ids por petición')
+
+    parsed = []
+    for pk in ids:
+        if isinstance(pk, str) and pk.strip().isascii() and pk.strip().isdigit():
+            pk = int(pk.strip())
+        if type(pk) is not int or pk <= 0:
+            raise ValueError('ids debe contener solo enteros positivos')
+        parsed.append(pk)
+    return parsed
@@ -0,0 +1,75 @@
+"""
+Likes y favoritos de blogs y proyectos.
+
+Cada visitante tiene una fila en BlogLikeFavorite/ProjectLikeFavorite y los
+totales se mantienen en columnas denormalizadas (like_count, favorite_count)
+actualizadas con F(), de modo que alternar una interacción cuesta un número
+fijo de consultas sin importar cuántas interacciones existan. Los incrementos
+de los contadores pasan por el buffer de escritura diferida (counter_buffer).
+"""
+
+import hashlib
+
+from django.db import transaction
+
+from .counter_buffer import counter_buffer
+from .models import Blog, BlogLikeFavorite, Project, ProjectLikeFavorite
+
+# acción -> (campo de la interacción, contador en el objeto)
+INTERACTION_ACTIONS = {
+    'like': ('liked', 'like_count'),
+    'favorite': ('favorited', 'favorite_count'),
+}
+
+# tipo de objeto -> (modelo, modelo de interacciones, campo FK)
+INTERACTION_TARGETS = {
+    'blog': (Blog, BlogLikeFavorite, 'blog'),
+    'project': (Project, ProjectLikeFavorite, 'project'),
+}
+
+
+def get_visitor_id(request):
+    """Identificador del visitante a partir de la IP y el User-Agent"""
+    user_ip = request.META.get('REMOTE_ADDR', 'unknown')
+    user_agent = request.META.get('HTTP_USER_AGENT', 'unknown')
+    visitor_hash = hashlib.md5(f"{user_ip}{user_agent}".encode()).hexdigest()[:8]
+    return f'visitor_{visitor_hash}'
+
+
+def toggle_interaction(target, target_id, visitor_id, action):
+    """
+    Alternar un like o favorito y actualizar el contador del objeto
+
+    Args:
+        target (str): 'blog' o 'project'
+        target_id (int): ID del blog o proyecto
+        visitor_id (str): Identificador del visitante
+        action (str): 'like' o 'favorite'
+
+    Returns:
+        dict: Estado de la interacción y contadores actualizados
+    """
+    model, interaction_model, fk_field = INTERACTION_TARGETS[target]
+    flag_field, counter_field = INTERACTION_ACTIONS[action]
+    lookup = {f'{fk_field}_id': target_id, 'visitor_id': visitor_id}
+
+    with transaction.atomic():
+        # Crear la fila del visitante si no existe (INSERT ... ON CONFLICT DO NOTHING)
+        interaction_model.objects.bulk_create([interaction_model(**lookup)], ignore_conflicts=True)
+        interaction = interaction_model.objects.select_for_update().get(**lookup)
+
+        new_value = not getattr(interaction, flag_field)
+        setattr(interaction, flag_field, new_value)
+        interaction.save(update_fields=[flag_field, 'updated_at'])
+
+    counter_buffer.increment(model, target_id, counter_field, 1 if new_value else -1)
+
+    # Contadores guardados más los incrementos de este proceso aún no escritos
+    counters = model.objects.filter(pk=target_id).values('like_count', 'favorite_count').get()
+    return {
+        'success': True,
+        'liked': interaction.liked,
+        'favorited': interaction.favorited,
+        'like_count': counters['like_count'] + counter_buffer.pending(model, target_id, 'like_count'),
+        'favorite_count': counters['favorite_count'] + counter_buffer.pending(model, target_id, 'favorite_count'),
+    }
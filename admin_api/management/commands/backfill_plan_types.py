@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from admin_api.models import CartItem, MarketplaceOrderItem
+
+PRICE_TOLERANCE = Decimal('0.01')
+
+
+def variant_prices(product):
+    """
+    Precios de cada variante del producto, con las mismas reglas que el frontend
+    (lib/price-utils.ts): si la variante no tiene precio propio se usa el precio base
+    (PDF) o el precio base * 1.5 (editable).
+    """
+    base_price = product.price or Decimal('0')
+    return [
+        ('pdf', 'm2', product.price_pdf_m2 or base_price),
+        ('pdf', 'sqft', product.price_pdf_sqft or base_price),
+        ('editable', 'm2', product.price_editable_m2 or base_price * Decimal('1.5')),
+        ('editable', 'sqft', product.price_editable_sqft or base_price * Decimal('1.5')),
+    ]
+
+
+def infer_plan_variant(item):
+    """Inferir (plan_type, area_unit) comparando el precio pagado con los precios del producto"""
+    for plan_type, area_unit, price in variant_prices(item.product):
+        if abs(item.price - price) < PRICE_TOLERANCE:
+            return plan_type, area_unit
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Backfill plan_type/area_unit on cart and order items created before they were stored'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Items updated per database batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report changes without saving them')
+
+    def handle(self, *args, **options):
+        for model in (CartItem, MarketplaceOrderItem):
+            updated, unmatched = self.backfill(model, options)
+            self.stdout.write(self.style.SUCCESS(
+                f'{model.__name__}: {updated} items updated, {unmatched} without a matching variant'
+                + (' (dry run)' if options['dry_run'] else '')
+            ))
+
+    def backfill(self, model, options):
+        batch_size = options['batch_size']
+        queryset = model.objects.filter(plan_type='').select_related('product').only(
+            'id', 'price', 'plan_type', 'area_unit',
+            'product__price', 'product__price_pdf_m2', 'product__price_pdf_sqft',
+            'product__price_editable_m2', 'product__price_editable_sqft'
+        ).order_by('id')
+
+        updated = 0
+        unmatched = 0
+        batch = []
+        for item in queryset.iterator(chunk_size=batch_size):
+            variant = infer_plan_variant(item)
+            if variant is None:
+                unmatched += 1
+                self.stdout.write(f'  {model.__name__} #{item.id}: no variant matches price {item.price}')
+                continue
+
+            item.plan_type, item.area_unit = variant
+            batch.append(item)
+            if len(batch) >= batch_size:
+                updated += self.save_batch(model, batch, options)
+                batch = []
+
+        if batch:
+            updated += self.save_batch(model, batch, options)
+        return updated, unmatched
+
+    def save_batch(self, model, batch, options):
+        if not options['dry_run']:
+            model.objects.bulk_update(batch, ['plan_type', 'area_unit'])
+        return len(batch)
@@ -0,0 +1,43 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from admin_api.analytics_services import REVENUE_STATUSES
+from admin_api.models import MarketplaceOrderItem, MarketplaceProduct, ProductFavorite
+from admin_api.popularity_services import event_weight
+
+
+class Command(BaseCommand):
+    help = 'Seed product popularity scores from stored favorites, purchases and view counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Products updated per database batch')
+
+    def handle(self, *args, **options):
+        # Los eventos nuevos se suman de forma incremental; este comando solo inicializa
+        # (o corrige) los puntajes a partir de los datos que tienen fecha
+        scores = defaultdict(float)
+        now = timezone.now()
+
+        for product_id, view_count in MarketplaceProduct.objects.filter(view_count__gt=0).values_list('id', 'view_count'):
+            # Las vistas no guardan fecha: se cuentan como actuales
+            scores[product_id] += event_weight('view', now) * view_count
+
+        for product_id, created_at in ProductFavorite.objects.values_list('product_id', 'created_at').iterator():
+            scores[product_id] += event_weight('favorite', created_at)
+
+        purchases = MarketplaceOrderItem.objects.filter(order__status__in=REVENUE_STATUSES).values_list(
+            'product_id', 'quantity', 'order__created_at'
+        )
+        for product_id, quantity, created_at in purchases.iterator():
+            scores[product_id] += event_weight('purchase', created_at) * quantity
+
+        products = [
+            MarketplaceProduct(id=product_id, popularity_score=score)
+            for product_id, score in scores.items()
+        ]
+        MarketplaceProduct.objects.exclude(id__in=scores).update(popularity_score=0)
+        MarketplaceProduct.objects.bulk_update(products, ['popularity_score'], batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'{len(products)} product scores rebuilt'))
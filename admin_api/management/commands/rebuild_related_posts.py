@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from admin_api.related_services import rebuild_related_posts, related_posts_need_rebuild, update_related_posts
+
+
+class Command(BaseCommand):
+    help = 'Update the precomputed related posts of the blogs that changed (incremental TF-IDF)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-stale', action='store_true',
+                            help='Only run when a blog changed or a related list points to a deleted blog (for cron)')
+        parser.add_argument('--full', action='store_true',
+                            help='Re-tokenize every blog and recompute the IDF and every related list')
+
+    def handle(self, *args, **options):
+        if options['if_stale'] and not options['full'] and not related_posts_need_rebuild():
+            self.stdout.write('Related posts are up to date')
+            return
+        updated = rebuild_related_posts() if options['full'] else update_related_posts()
+        self.stdout.write(self.style.SUCCESS(f'Related posts computed for {updated} blogs'))
@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import stripe
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from admin_api.models import MarketplaceOrder, SiteConfig
+from admin_api.order_services import OrderStateMachine
+from admin_api.payment_services import cache_payment_states
+
+WATERMARK_KEY = 'stripe_reconcile_watermark'
+STRIPE_PAGE_SIZE = 100  # Máximo permitido por las APIs de listado de Stripe
+
+
+class Command(BaseCommand):
+    help = 'Reconcile pending marketplace orders against Stripe PaymentIntents and Checkout Sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='ISO date/datetime to list Stripe objects from (overrides the stored watermark)')
+        parser.add_argument('--lookback-hours', type=int, default=24,
+                            help='Overlap applied to the watermark to catch intents created before it but paid later')
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders matched/updated per database batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report changes without saving them')
+
+    def handle(self, *args, **options):
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+        run_started_at = timezone.now()
+        since = self.get_since(options)
+        created_filter = {'gte': int(since.timestamp())}
+        self.stdout.write(f'Listing Stripe objects created since {since.isoformat()}')
+
+        api_calls = 0
+
+        # PaymentIntents: {id: status}
+        intent_statuses = {}
+        page = stripe.PaymentIntent.list(created=created_filter, limit=STRIPE_PAGE_SIZE)
+        api_calls += 1
+        while True:
+            for payment_intent in page.data:
+                intent_statuses[payment_intent.id] = payment_intent.status
+            if not page.has_more:
+                break
+            page = stripe.PaymentIntent.list(created=created_filter, limit=STRIPE_PAGE_SIZE,
+                                             starting_after=page.data[-1].id)
+            api_calls += 1
+
+        # Checkout Sessions: {payment_intent_id: customer_email} de las sesiones pagadas
+        session_emails = {}
+        page = stripe.checkout.Session.list(created=created_filter, limit=STRIPE_PAGE_SIZE)
+        api_calls += 1
+        while True:
+            for session in page.data:
+                payment_intent_id = session.get('payment_intent')
+                if not payment_intent_id or session.get('payment_status') != 'paid':
+                    continue
+                intent_statuses.setdefault(payment_intent_id, 'succeeded')
+                customer_details = session.get('customer_details') or {}
+                session_emails[payment_intent_id] = customer_details.get('email')
+            if not page.has_more:
+                break
+            page = stripe.checkout.Session.list(created=created_filter, limit=STRIPE_PAGE_SIZE,
+                                                starting_after=page.data[-1].id)
+            api_calls += 1
+
+        updated_orders, completed = self.apply(intent_statuses, session_emails, options)
+
+        if not options['dry_run']:
+            cache_payment_states({o.stripe_payment_intent_id: o.payment_status for o in updated_orders})
+            SiteConfig.objects.update_or_create(
+                key=WATERMARK_KEY,
+                defaults={
+                    'value': run_started_at.isoformat(),
+                    'category': 'system',
+                    'description': 'Última reconciliación de órdenes con Stripe'
+                }
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(intent_statuses)} Stripe intents, {len(updated_orders)} orders updated, '
+            f'{completed} completed, {api_calls} Stripe API calls'
+            + (' (dry run)' if options['dry_run'] else '')
+        ))
+
+    def get_since(self, options):
+        if options['since']:
+            try:
+                since = datetime.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f"Invalid --since value: {options['since']}")
+            return since if timezone.is_aware(since) else since.replace(tzinfo=dt_timezone.utc)
+
+        watermark = SiteConfig.objects.filter(key=WATERMARK_KEY).values_list('value', flat=True).first()
+        if watermark:
+            return datetime.fromisoformat(watermark) - timedelta(hours=options['lookback_hours'])
+        return timezone.now() - timedelta(days=7)
+
+    def apply(self, intent_statuses, session_emails, options):
+        """Actualizar en bloque las órdenes que coinciden con los intents de Stripe"""
+        batch_size = options['batch_size']
+        synced_at = timezone.now()
+        intent_ids = list(intent_statuses)
+        updated_orders = []
+        completed = 0
+        sources = OrderStateMachine.TRANSITIONS['payment_succeeded'][0]
+
+        for start in range(0, len(intent_ids), batch_size):
+            batch_ids = intent_ids[start:start + batch_size]
+            orders = MarketplaceOrder.objects.filter(stripe_payment_intent_id__in=batch_ids).only(
+                'id', 'stripe_payment_intent_id', 'status', 'payment_status', 'customer_email', 'updated_at'
+            )
+            changed = []
+            completable_ids = []
+            for order in orders:
+                payment_status = intent_statuses[order.stripe_payment_intent_id]
+                dirty = order.payment_status != payment_status
+                order.payment_status = payment_status
+                order.payment_status_synced_at = synced_at
+
+                if order.status in sources and payment_status == 'succeeded':
+                    completable_ids.append(order.id)
+                    dirty = True
+
+                email = session_emails.get(order.stripe_payment_intent_id)
+                if email and not order.customer_email:
+                    order.customer_email = email
+                    dirty = True
+
+                if dirty:
+                    order.updated_at = synced_at
+                    changed.append(order)
+                    self.stdout.write(f'  Order #{order.id}: {order.status} ({payment_status})')
+
+            if changed and not options['dry_run']:
+                MarketplaceOrder.objects.bulk_update(
+                    changed,
+                    ['payment_status', 'payment_status_synced_at', 'customer_email', 'updated_at'],
+                    batch_size=batch_size
+                )
+                # Las transiciones de estado pasan por la máquina de estados (bloqueo de filas
+                # y factura una sola vez, aunque un webhook llegue al mismo tiempo)
+                completed += len(OrderStateMachine.advance_many(completable_ids, 'payment_succeeded'))
+            else:
+                completed += len(completable_ids)
+            updated_orders.extend(changed)
+
+        return updated_orders, completed
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from admin_api.analytics_services import rebuild_sales_days, refresh_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Refresh the daily sales rollup tables from orders changed since the stored watermark'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='ISO date/datetime of order changes to include (overrides the stored watermark)')
+        parser.add_argument('--days', type=int,
+                            help='Rebuild the last N days entirely (e.g. after deleting orders or editing items)')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None:
+            today = timezone.localdate()
+            days = rebuild_sales_days(today - timedelta(days=offset) for offset in range(options['days']))
+        else:
+            days = refresh_sales_rollups(since=self.get_since(options))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(days)} days rebuilt' + (f' ({days[0]} .. {days[-1]})' if days else '')
+        ))
+
+    def get_since(self, options):
+        if not options['since']:
+            return None
+        try:
+            since = datetime.fromisoformat(options['since'])
+        except ValueError:
+            raise CommandError(f"Invalid --since value: {options['since']}")
+        return since if timezone.is_aware(since) else since.replace(tzinfo=dt_timezone.utc)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from admin_api.blog_content import process_blog_content
+from admin_api.models import Blog
+
+RENDERED_FIELDS = ['content_html', 'content_images', 'word_count', 'read_time', 'content_hash', 'excerpt']
+
+
+class Command(BaseCommand):
+    help = 'Render blog content to cached HTML and derive excerpt, word count, read time and images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Blogs updated per database batch')
+        parser.add_argument('--force', action='store_true', help='Re-render blogs whose content did not change')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Blog.objects.only('id', 'content', *RENDERED_FIELDS).order_by('id')
+
+        rendered = 0
+        batch = []
+        for blog in queryset.iterator(chunk_size=batch_size):
+            if not process_blog_content(blog, force=options['force']):
+                continue
+            batch.append(blog)
+            if len(batch) >= batch_size:
+                rendered += self.save_batch(batch)
+                batch = []
+
+        if batch:
+            rendered += self.save_batch(batch)
+        self.stdout.write(self.style.SUCCESS(f'{rendered} blogs rendered'))
+
+    def save_batch(self, batch):
+        Blog.objects.bulk_update(batch, RENDERED_FIELDS)
+        return len(batch)
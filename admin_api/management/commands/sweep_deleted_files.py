@@ -0,0 +1,37 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from admin_api.models import PendingFileDeletion
+
+
+class Command(BaseCommand):
+    help = 'Delete media files queued for removal by bulk deletes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Files removed per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        removed = 0
+        failed = 0
+        last_id = 0
+
+        while True:
+            batch = list(PendingFileDeletion.objects.filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            done = []
+            for pending in batch:
+                try:
+                    default_storage.delete(pending.path)
+                    done.append(pending.id)
+                except Exception as e:
+                    # Se deja en la cola para el siguiente barrido
+                    failed += 1
+                    self.stderr.write(f'  {pending.path}: {e}')
+            PendingFileDeletion.objects.filter(id__in=done).delete()
+            removed += len(done)
+
+        self.stdout.write(self.style.SUCCESS(f'{removed} files removed, {failed} failed'))
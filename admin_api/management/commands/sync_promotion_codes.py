@@ -0,0 +1,19 @@
+import stripe
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Back.stripe_config import fetch_promotion_codes, save_promotion_codes
+
+
+class Command(BaseCommand):
+    help = 'Sync active Stripe promotion codes so discount validation never calls Stripe'
+
+    def handle(self, *args, **options):
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+        try:
+            codes, api_calls = fetch_promotion_codes()
+        except stripe.error.StripeError as e:
+            raise CommandError(f'Stripe error: {e}')
+
+        save_promotion_codes(codes)
+        self.stdout.write(self.style.SUCCESS(f'{len(codes)} promotion codes synced, {api_calls} Stripe API calls'))
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from admin_api.models import MarketplaceProduct
+from admin_api.product_services import cache_product_payloads, serialize_products
+
+
+class Command(BaseCommand):
+    help = 'Prefill the per-product payload cache for all active marketplace products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Products serialized per query')
+
+    def handle(self, *args, **options):
+        if not settings.CACHE_IS_SHARED:
+            raise CommandError('The product cache is disabled: configure a shared CACHE_BACKEND (or CACHE_IS_SHARED=true)')
+        batch_size = options['batch_size']
+        product_ids = list(MarketplaceProduct.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+
+        for start in range(0, len(product_ids), batch_size):
+            cache_product_payloads(serialize_products(product_ids[start:start + batch_size]))
+
+        self.stdout.write(self.style.SUCCESS(f'{len(product_ids)} product payloads cached'))
@@ -0,0 +1,260 @@
+"""
+Consultas del mapa de proyectos.
+
+El mapa pide solo su área visible (bounding box) y un nivel de zoom. Los
+proyectos se agrupan en SQL en una cuadrícula fija anclada en (-180, -90) cuyo
+tamaño de celda depende del zoom (CLUSTER_CELLS_PER_TILE celdas por tile de
+256 px), de modo que los grupos no cambian al desplazar el mapa. Las celdas con
+un solo proyecto se devuelven como puntos con sus datos; el resto como grupos
+con su número de proyectos, centro y extensión.
+
+Para la carga inicial también existe un FeatureCollection GeoJSON de todos los
+proyectos, guardado en caché ya serializado y comprimido (con sus ETags) y
+regenerado cuando cambian los campos del mapa de algún proyecto (ver signals).
+Como la caché puede ser local a cada worker, el feed expira a los
+GEOJSON_CACHE_TTL segundos: los demás workers lo regeneran en ese plazo.
+La búsqueda de proyectos cercanos filtra por bounding box en SQL y calcula las
+distancias exactas con NumPy.
+"""
+
+import gzip
+import hashlib
+import json
+import math
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, FloatField, Max, Min, Q
+from django.db.models.functions import Cast, Floor
+
+from .models import Project
+from .serializers import build_media_url
+
+CLUSTER_CELLS_PER_TILE = 4
+# A partir de este zoom se devuelven todos los puntos sin agrupar
+MAX_CLUSTER_ZOOM = 16
+MAX_ZOOM = 22
+MAP_POINT_FIELDS = ('id', 'title', 'latitude', 'longitude', 'image', 'category', 'location')
+
+
+def parse_bbox(value):
+    """
+    Interpretar ?bbox=oeste,sur,este,norte (grados)
+
+    Raises:
+        ValueError: Si no son cuatro números válidos
+    """
+    west, south, east, north = (float(part) for part in value.split(','))
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError('bbox fuera de rango')
+    return west, south, east, north
+
+
+def cell_size(zoom):
+    """Tamaño de celda (grados) para un nivel de zoom"""
+    return 360.0 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
+
+
+def map_projects(bbox=None):
+    """Proyectos visibles en el mapa dentro del bounding box (filtro por rangos indexados)"""
+    queryset = Project.objects.filter(show_on_map=True, latitude__isnull=False, longitude__isnull=False)
+    if bbox is None:
+        return queryset
+
+    west, south, east, north = bbox
+    queryset = queryset.filter(latitude__gte=south, latitude__lte=north)
+    if west <= east:
+        return queryset.filter(longitude__gte=west, longitude__lte=east)
+    # El área cruza el antimeridiano
+    return queryset.filter(Q(longitude__gte=west) | Q(longitude__lte=east))
+
+
+def serialize_point(project, request=None):
+    image = project['image']
+    return {
+        'id': project['id'],
+        'title': project['title'],
+        'category': project['category'],
+        'location': project['location'],
+        'latitude': float(project['latitude']),
+        'longitude': float(project['longitude']),
+        'image': build_media_url(request, f"{settings.MEDIA_URL}{image}") if image else None,
+    }
+
+
+def cluster_projects(bbox, zoom, request=None):
+    """
+    Agrupar los proyectos del área visible
+
+    Args:
+        bbox (tuple): (oeste, sur, este, norte) o None para todo el mapa
+        zoom (int): Nivel de zoom del mapa (0-22)
+        request: Para construir URLs absolutas de las imágenes
+
+    Returns:
+        dict: zoom, tamaño de celda, grupos y puntos individuales
+    """
+    queryset = map_projects(bbox)
+    if zoom >= MAX_CLUSTER_ZOOM:
+        points = [serialize_point(project, request) for project in queryset.values(*MAP_POINT_FIELDS)]
+        return {'zoom': zoom, 'cell_size': None, 'clusters': [], 'points': points}
+
+    size = cell_size(zoom)
+    cells = (
+        queryset
+        .annotate(
+            cell_x=Floor((Cast('longitude', FloatField()) + 180.0) / size),
+            cell_y=Floor((Cast('latitude', FloatField()) + 90.0) / size),
+        )
+        .values('cell_x', 'cell_y')
+        .annotate(
+            count=Count('id'),
+            project_id=Min('id'),
+            center_lat=Avg(Cast('latitude', FloatField())),
+            center_lng=Avg(Cast('longitude', FloatField())),
+            south=Min('latitude'),
+            north=Max('latitude'),
+            west=Min('longitude'),
+            east=Max('longitude'),
+        )
+        .order_by()
+    )
+
+    clusters = []
+    single_ids = []
+    for cell in cells:
+        if cell['count'] == 1:
+            single_ids.append(cell['project_id'])
+            continue
+        clusters.append({
+            'count': cell['count'],
+            'latitude': cell['center_lat'],
+            'longitude': cell['center_lng'],
+            'bounds': [float(cell['west']), float(cell['south']), float(cell['east']), float(cell['north'])],
+        })
+
+    points = [
+        serialize_point(project, request)
+        for project in Project.objects.filter(id__in=single_ids).values(*MAP_POINT_FIELDS)
+    ] if single_ids else []
+    return {'zoom': zoom, 'cell_size': size, 'clusters': clusters, 'points': points}
+
+
+# Campos de Project que aparecen en el GeoJSON: cambiarlos regenera el feed
+GEOJSON_FIELDS = frozenset(MAP_POINT_FIELDS) | {'show_on_map'}
+GEOJSON_CACHE_KEY = 'projects:map:geojson'
+GEOJSON_CACHE_TTL = 60
+
+
+def build_projects_geojson():
+    """
+    Generar el FeatureCollection de los proyectos del mapa, ya codificado
+
+    Returns:
+        dict: body (bytes JSON), gzip_body (bytes comprimidos) y el ETag de cada uno
+    """
+    features = []
+    for project in map_projects().order_by('id').values(*MAP_POINT_FIELDS):
+        point = serialize_point(project)
+        features.append({
+            'type': 'Feature',
+            'id': point['id'],
+            'geometry': {'type': 'Point', 'coordinates': [point.pop('longitude'), point.pop('latitude')]},
+            'properties': point,
+        })
+
+    body = json.dumps({'type': 'FeatureCollection', 'features': features}, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha1(body).hexdigest()
+    return {
+        'body': body,
+        # mtime=0 para que los mismos datos produzcan siempre los mismos bytes
+        'gzip_body': gzip.compress(body, compresslevel=9, mtime=0),
+        # Cada codificación es una representación distinta: ETags distintos
+        'etag': f'"{digest}"',
+        'gzip_etag': f'"{digest}-gzip"',
+    }
+
+
+def get_projects_geojson():
+    """FeatureCollection en caché (se genera si no existe)"""
+    feed = cache.get(GEOJSON_CACHE_KEY)
+    if feed is None:
+        feed = refresh_projects_geojson()
+    return feed
+
+
+def refresh_projects_geojson():
+    """Regenerar y guardar el FeatureCollection"""
+    feed = build_projects_geojson()
+    cache.set(GEOJSON_CACHE_KEY, feed, GEOJSON_CACHE_TTL)
+    return feed
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+DEFAULT_NEARBY_RADIUS_KM = 100
+MAX_NEARBY_RADIUS_KM = 2000
+DEFAULT_NEARBY_LIMIT = 20
+MAX_NEARBY_LIMIT = 100
+
+
+def radius_bbox(latitude, longitude, radius_km):
+    """Bounding box (oeste, sur, este, norte) que contiene el círculo de radio radius_km"""
+    delta_lat = radius_km / KM_PER_DEGREE_LAT
+    south = max(latitude - delta_lat, -90.0)
+    north = min(latitude + delta_lat, 90.0)
+
+    cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+    if north >= 90 or south <= -90 or cos_lat <= 0 or radius_km / (KM_PER_DEGREE_LAT * cos_lat) >= 180:
+        # Cerca de los polos el círculo cubre todas las longitudes
+        return -180.0, south, 180.0, north
+
+    delta_lng = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    # Normalizar a [-180, 180); si west > east el área cruza el antimeridiano
+    west = (longitude - delta_lng + 180.0) % 360.0 - 180.0
+    east = (longitude + delta_lng + 180.0) % 360.0 - 180.0
+    return west, south, east, north
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Distancias de círculo máximo (km) de un punto a arreglos de puntos (vectorizado)"""
+    lat1 = np.radians(latitude)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlng = np.radians(longitudes - longitude)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_projects(latitude, longitude, radius_km=DEFAULT_NEARBY_RADIUS_KM, limit=DEFAULT_NEARBY_LIMIT, request=None):
+    """
+    Proyectos del mapa más cercanos a un punto
+
+    Los candidatos se filtran en SQL con el bounding box del radio (índice de
+    latitud/longitud) y las distancias exactas se calculan con NumPy.
+
+    Returns:
+        list: Puntos del mapa con distance_km, del más cercano al más lejano
+    """
+    candidates = np.array(
+        map_projects(radius_bbox(latitude, longitude, radius_km))
+        .annotate(lat=Cast('latitude', FloatField()), lng=Cast('longitude', FloatField()))
+        .values_list('id', 'lat', 'lng'),
+        dtype=np.float64,
+    ).reshape(-1, 3)
+    if not len(candidates):
+        return []
+
+    distances = haversine_km(latitude, longitude, candidates[:, 1], candidates[:, 2])
+    inside = np.flatnonzero(distances <= radius_km)
+    nearest = inside[np.argsort(distances[inside], kind='stable')[:limit]]
+
+    ids = [int(pk) for pk in candidates[nearest, 0]]
+    projects = {project['id']: project for project in Project.objects.filter(id__in=ids).values(*MAP_POINT_FIELDS)}
+    results = []
+    for pk, distance in zip(ids, distances[nearest]):
+        point = serialize_point(projects[pk], request)
+        point['distance_km'] = round(float(distance), 3)
+        results.append(point)
+    return results
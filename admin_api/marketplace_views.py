@@ -2,8 +2,10 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
 from django.core.mail import send_mail, EmailMessage
 from django.template.loader import render_to_string
 from django.conf import settings
@@ -20,11 +22,21 @@ from django.contrib.auth.models import User
 
 from .models import (
     MarketplaceProduct, MarketplaceProductImage, Cart, CartItem, MarketplaceOrder, 
-    MarketplaceOrderItem, ProductFavorite, OrderZipFile
+    MarketplaceOrderItem, ProductFavorite, OrderZipFile, PLAN_TYPE_CHOICES, AREA_UNIT_CHOICES
 )
 from .serializers import (
     MarketplaceProductSerializer, CartSerializer, CartItemSerializer,
-    MarketplaceOrderSerializer, MarketplaceOrderItemSerializer, ProductFavoriteSerializer
+    MarketplaceOrderSerializer, MarketplaceOrderItemSerializer, ProductFavoriteSerializer,
+    PRODUCT_CARD_FIELDS
+)
+from .payment_services import get_payment_state, record_payment_state
+from .order_services import OrderStateMachine, IllegalTransition
+from .views import BULK_DELETE_ACTION, bulk_delete_response
+from .popularity_services import order_products, record_product_event, record_product_view
+from .product_services import get_product_detail
+from .cart_services import (
+    get_cart_snapshot, invalidate_cart_snapshot, with_cart_items,
+    get_or_create_active_cart, upsert_cart_item
 )
 
 # Configurar Stripe
@@ -38,6 +50,17 @@ class MarketplaceProductViewSet(viewsets.ModelViewSet):
     serializer_class = MarketplaceProductSerializer
     permission_classes = [AllowAny]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # is_favorited del usuario en la misma consulta (sin pedir los favoritos aparte)
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_favorited=Exists(ProductFavorite.objects.filter(user=user, product=OuterRef('pk')))
+            )
+        # ?ordering=popular: ranking por popularidad con decaimiento temporal
+        return order_products(queryset, self.request.query_params.get('ordering'))
+
     def list(self, request, *args, **kwargs):
         """Listar productos del marketplace"""
         print("🛍️ MarketplaceProductViewSet.list() - Iniciando...")
@@ -57,6 +80,28 @@ class MarketplaceProductViewSet(viewsets.ModelViewSet):
             print(f"❌ Error en MarketplaceProductViewSet.list(): {e}")
             return Response({'error': str(e)}, status=500)
 
+    def retrieve(self, request, *args, **kwargs):
+        """Obtener un producto (payload en caché) y registrar la vista (escritura diferida)"""
+        try:
+            product_id = int(kwargs['pk'])
+        except (TypeError, ValueError):
+            return Response({'error': 'Producto no encontrado'}, status=404)
+
+        payload = get_product_detail(product_id, request.user)
+        if payload is None:
+            return Response({'error': 'Producto no encontrado'}, status=404)
+
+        record_product_view(product_id)
+        return Response(payload)
+
+    @action(**BULK_DELETE_ACTION)
+    def bulk_delete(self, request):
+        """
+        Eliminar varios productos en una transacción: {"ids": [1, 2, 3]}
+        Los productos con órdenes no se eliminan (se devuelven en 'protected').
+        """
+        return bulk_delete_response(request, 'product')
+
     def create(self, request, *args, **kwargs):
         """Crear producto con imágenes múltiples"""
         with transaction.atomic():
@@ -184,8 +229,15 @@ class MarketplaceProductViewSet(viewsets.ModelViewSet):
         quantity = int(request.data.get('quantity', 1))
         
         # Obtener información del plan y área
-        plan_type = request.data.get('plan_type', 'pdf')  # 'pdf' o 'editable'
-        area_unit = request.data.get('area_unit', 'm2')   # 'm2' o 'sqft'
+        plan_type = request.data.get('plan_type') or 'pdf'  # 'pdf' o 'editable'
+        area_unit = request.data.get('area_unit') or 'm2'   # 'm2' o 'sqft'
+        # El carrito local del frontend usa 'pdf-editable' para el plano editable
+        if plan_type == 'pdf-editable':
+            plan_type = 'editable'
+        if plan_type not in dict(PLAN_TYPE_CHOICES):
+            return Response({'error': f'Tipo de plano inválido: {plan_type}'}, status=400)
+        if area_unit not in dict(AREA_UNIT_CHOICES):
+            return Response({'error': f'Unidad de área inválida: {area_unit}'}, status=400)
         
         # Obtener el precio del request o usar el precio del producto
         custom_price = request.data.get('price')
@@ -200,52 +252,18 @@ class MarketplaceProductViewSet(viewsets.ModelViewSet):
         print(f"🛒 Plan Type: {plan_type}, Area Unit: {area_unit}")
         print(f"🛒 Product base price: ${product.price}")
 
-        # Obtener o crear carrito activo
-        # Primero, desactivar todos los carritos activos del usuario
-        Cart.objects.filter(user=user, is_active=True).update(is_active=False)
-        
-        # Luego, obtener el carrito más reciente o crear uno nuevo
-        cart = Cart.objects.filter(user=user).order_by('-created_at').first()
-        
-        if not cart:
-            # Si no hay carritos, crear uno nuevo
-            cart = Cart.objects.create(user=user, is_active=True)
-            created = True
-        else:
-            # Reactivar el carrito más reciente
-            cart.is_active = True
-            cart.save()
-            created = False
-        
+        # Obtener el carrito activo (único por usuario) y agregar/reemplazar la línea
+        # con un solo INSERT ... ON CONFLICT
+        cart, created = get_or_create_active_cart(user.id)
         print(f"🛒 Cart: #{cart.id} (created: {created})")
 
-        # Verificar si ya existe un item para este producto
-        existing_item = CartItem.objects.filter(cart=cart, product=product).first()
-        
-        if existing_item:
-            # Si ya existe, reemplazar completamente (no sumar cantidad)
-            existing_item.quantity = quantity
-            existing_item.price = price  # Actualizar precio por si cambió el plan
-            existing_item.save()
-            print(f"🛒 Updated existing item #{existing_item.id} - quantity: {existing_item.quantity}, price: ${existing_item.price}")
-            cart_item = existing_item
-        else:
-            # Si no existe, crear nuevo item con el precio especificado
-            cart_item = CartItem.objects.create(
-                cart=cart,
-                product=product,
-                quantity=quantity,
-                price=price
-            )
-            print(f"🛒 Created new item #{cart_item.id} - quantity: {quantity}, price: ${price}")
-            print(f"🛒 Plan: {plan_type}, Area Unit: {area_unit}")
+        upsert_cart_item(cart.id, product.id, quantity, price, plan_type, area_unit)
+        record_product_event(product.id, 'cart_add')
+        print(f"🛒 Upserted item - product: #{product.id}, quantity: {quantity}, price: ${price}, plan: {plan_type}/{area_unit}")
 
-        # Verificar el carrito después de agregar el item
-        cart.refresh_from_db()
-        print(f"🛒 Cart now has {cart.items.count()} items, total: ${cart.total}")
-        
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        # Devolver el carrito actualizado (se regenera la caché del usuario)
+        invalidate_cart_snapshot(user.id)
+        return Response(get_cart_snapshot(user.id, request))
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def toggle_favorite(self, request, pk=None):
@@ -262,6 +280,7 @@ class MarketplaceProductViewSet(viewsets.ModelViewSet):
             favorite.delete()
             return Response({'favorited': False})
 
+        record_product_event(product.id, 'favorite')
         return Response({'favorited': True})
 
 class CartViewSet(viewsets.ModelViewSet):
@@ -291,21 +310,8 @@ class CartViewSet(viewsets.ModelViewSet):
                 user = User.objects.get(username='juan')
                 print(f"🛒 CartViewSet.list() - User: {user.username}")
                 
-                queryset = Cart.objects.filter(user=user, is_active=True)
-                print(f"🛒 Queryset count: {queryset.count()}")
-                
-                if queryset.exists():
-                    cart = queryset.first()
-                    print(f"🛒 Found cart #{cart.id} with {cart.items.count()} items")
-                    serializer = self.get_serializer(cart)
-                    return Response(serializer.data)
-                else:
-                    print(f"🛒 No active cart found for user")
-                    # Crear un carrito vacío para el usuario
-                    cart = Cart.objects.create(user=user, is_active=True)
-                    print(f"🛒 Created new empty cart #{cart.id}")
-                    serializer = self.get_serializer(cart)
-                    return Response(serializer.data)
+                # Carrito activo desde caché (se crea uno vacío si no existe)
+                return Response(get_cart_snapshot(user.id, request))
             except User.DoesNotExist:
                 print("🛒 User 'juan' not found")
                 return Response({'error': 'Usuario no encontrado'}, status=404)
@@ -327,7 +333,7 @@ class CartViewSet(viewsets.ModelViewSet):
                     return Response({'error': "Usuario de desarrollo 'juan' no existe"}, status=400)
 
             # Obtener el carrito activo del usuario
-            cart = Cart.objects.filter(user=user, is_active=True).first()
+            cart = with_cart_items(Cart.objects.filter(user=user, is_active=True)).first()
             
             if not cart:
                 return Response({'error': 'No hay carrito activo'}, status=400)
@@ -360,7 +366,9 @@ class CartViewSet(viewsets.ModelViewSet):
                     user=user,
                     stripe_payment_intent_id=payment_intent.id,
                     total_amount=cart.total,
-                    status='pending'
+                    status='pending',
+                    payment_status=payment_intent.status,
+                    payment_status_synced_at=timezone.now()
                 )
                 print(f"📦 Orden creada: #{order.id}")
 
@@ -371,13 +379,16 @@ class CartViewSet(viewsets.ModelViewSet):
                         order=order,
                         product=item.product,
                         quantity=item.quantity,
-                        price=item.price
+                        price=item.price,
+                        plan_type=item.plan_type,
+                        area_unit=item.area_unit
                     )
                     print(f"📦 Item agregado: {item.product.name} x{item.quantity}")
 
                 # Desactivar carrito
                 cart.is_active = False
-                cart.save()
+                cart.save(update_fields=['is_active', 'updated_at'])
+                invalidate_cart_snapshot(cart.user_id)
                 print(f"🛒 Carrito desactivado")
 
             print(f"✅ Checkout completado exitosamente")
@@ -409,12 +420,12 @@ class CartViewSet(viewsets.ModelViewSet):
                 item.delete()
             else:
                 item.quantity = quantity
-                item.save()
+                item.save(update_fields=['quantity'])
         except CartItem.DoesNotExist:
             return Response({'error': 'Item no encontrado'}, status=400)
 
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        invalidate_cart_snapshot(cart.user_id)
+        return Response(get_cart_snapshot(cart.user_id, request))
 
     @action(detail=True, methods=['post'])
     def remove_item(self, request, pk=None):
@@ -428,8 +439,8 @@ class CartViewSet(viewsets.ModelViewSet):
         except CartItem.DoesNotExist:
             return Response({'error': 'Item no encontrado'}, status=400)
 
-        serializer = CartSerializer(cart)
-        return Response(serializer.data)
+        invalidate_cart_snapshot(cart.user_id)
+        return Response(get_cart_snapshot(cart.user_id, request))
 
     @action(detail=False, methods=['post'])
     def checkout(self, request):
@@ -445,7 +456,7 @@ class CartViewSet(viewsets.ModelViewSet):
                     return Response({'error': "Usuario de desarrollo 'juan' no existe"}, status=400)
 
             # Obtener el carrito activo del usuario
-            cart = Cart.objects.filter(user=user, is_active=True).first()
+            cart = with_cart_items(Cart.objects.filter(user=user, is_active=True)).first()
             
             if not cart:
                 return Response({'error': 'No hay carrito activo'}, status=400)
@@ -478,7 +489,9 @@ class CartViewSet(viewsets.ModelViewSet):
                     user=user,
                     stripe_payment_intent_id=payment_intent.id,
                     total_amount=cart.total,
-                    status='pending'
+                    status='pending',
+                    payment_status=payment_intent.status,
+                    payment_status_synced_at=timezone.now()
                 )
                 print(f"📦 Orden creada: #{order.id}")
 
@@ -489,13 +502,16 @@ class CartViewSet(viewsets.ModelViewSet):
                         order=order,
                         product=item.product,
                         quantity=item.quantity,
-                        price=item.price
+                        price=item.price,
+                        plan_type=item.plan_type,
+                        area_unit=item.area_unit
                     )
                     print(f"📦 Item agregado: {item.product.name} x{item.quantity}")
 
                 # Desactivar carrito
                 cart.is_active = False
-                cart.save()
+                cart.save(update_fields=['is_active', 'updated_at'])
+                invalidate_cart_snapshot(cart.user_id)
                 print(f"🛒 Carrito desactivado")
 
             print(f"✅ Checkout completado exitosamente")
@@ -546,7 +562,9 @@ class CartViewSet(viewsets.ModelViewSet):
                     user=request.user,
                     stripe_payment_intent_id=payment_intent.id,
                     total_amount=cart.total,
-                    status='pending'
+                    status='pending',
+                    payment_status=payment_intent.status,
+                    payment_status_synced_at=timezone.now()
                 )
                 print(f"📦 Orden creada: #{order.id}")
 
@@ -557,31 +575,26 @@ class CartViewSet(viewsets.ModelViewSet):
                         order=order,
                         product=item.product,
                         quantity=item.quantity,
-                        price=item.price
+                        price=item.price,
+                        plan_type=item.plan_type,
+                        area_unit=item.area_unit
                     )
                     print(f"📦 Item agregado: {item.product.name} x{item.quantity}")
 
                 # Desactivar carrito
                 cart.is_active = False
-                cart.save()
+                cart.save(update_fields=['is_active', 'updated_at'])
+                invalidate_cart_snapshot(cart.user_id)
                 print(f"🛒 Carrito desactivado")
 
             print(f"✅ Checkout completado exitosamente")
             print(f"📦 Orden #{order.id} creada y lista para pago")
             
-            # Marcar la orden como completada inmediatamente (para pruebas)
-            order.status = 'completed'
-            order.save()
+            # Marcar la orden como completada inmediatamente (para pruebas);
+            # la máquina de estados envía la factura automáticamente
+            OrderStateMachine.advance(order.id, 'payment_succeeded')
             print(f"✅ Orden #{order.id} marcada como completada")
             
-            # Enviar factura automáticamente
-            try:
-                print(f"📧 Enviando factura automática para orden #{order.id}")
-                self.send_invoice_automatically(order)
-                print(f"📧 Factura enviada exitosamente para orden #{order.id}")
-            except Exception as e:
-                print(f"❌ Error enviando factura: {e}")
-            
             return Response({
                 'order_id': order.id,
                 'client_secret': payment_intent.client_secret,
@@ -593,6 +606,14 @@ class CartViewSet(viewsets.ModelViewSet):
             print(f"❌ Error en checkout: {e}")
             return Response({'error': str(e)}, status=500)
 
+class MarketplaceOrderPagination(PageNumberPagination):
+    """
+    Paginación del historial de órdenes
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
 class MarketplaceOrderViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para órdenes del marketplace
@@ -600,17 +621,32 @@ class MarketplaceOrderViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = MarketplaceOrderSerializer
     permission_classes = [AllowAny]
 
+    pagination_class = MarketplaceOrderPagination
+
     def get_queryset(self):
         # En desarrollo, si no hay usuario autenticado, usar el usuario 'juan'
         try:
             if hasattr(self.request, 'user') and self.request.user and self.request.user.is_authenticated:
-                return MarketplaceOrder.objects.filter(user=self.request.user)
-            from django.contrib.auth.models import User
-            dev_user = User.objects.get(username='juan')
-            return MarketplaceOrder.objects.filter(user=dev_user)
+                queryset = MarketplaceOrder.objects.filter(user=self.request.user)
+            else:
+                from django.contrib.auth.models import User
+                dev_user = User.objects.get(username='juan')
+                queryset = MarketplaceOrder.objects.filter(user=dev_user)
         except Exception:
             return MarketplaceOrder.objects.none()
 
+        if self.action in ('list', 'retrieve'):
+            # Historial: número fijo de consultas sin importar cuántas órdenes/items haya
+            items = MarketplaceOrderItem.objects.select_related('product').only(
+                'id', 'order_id', 'product_id', 'quantity', 'price', 'plan_type', 'area_unit', 'zip_sent', 'zip_sent_at',
+                *[f'product__{field}' for field in PRODUCT_CARD_FIELDS]
+            ).order_by('id')
+            queryset = queryset.select_related('user').prefetch_related(
+                Prefetch('items', queryset=items),
+                'items__product__additional_images'
+            )
+        return queryset
+
     @action(detail=True, methods=['post'])
     def confirm_payment(self, request, pk=None):
         """Confirmar pago y enviar archivos ZIP"""
@@ -620,16 +656,15 @@ class MarketplaceOrderViewSet(viewsets.ReadOnlyModelViewSet):
             return Response({'error': 'Orden ya procesada'}, status=400)
 
         try:
-            # Verificar pago con Stripe
-            payment_intent = stripe.PaymentIntent.retrieve(order.stripe_payment_intent_id)
+            # Verificar pago con el estado local (solo consulta Stripe si está desactualizado)
+            payment_state = get_payment_state(order.stripe_payment_intent_id)
             
-            if payment_intent.status == 'succeeded':
-                # Actualizar estado de la orden
-                order.status = 'paid'
-                order.save()
-
-                # Enviar archivos ZIP por email
-                self.send_zip_files(order)
+            if payment_state and payment_state['status'] == 'succeeded':
+                # Actualizar estado de la orden (los archivos ZIP se envían una sola vez al ganar la transición)
+                try:
+                    OrderStateMachine.advance(order.id, 'payment_confirmed')
+                except IllegalTransition:
+                    return Response({'error': 'Orden ya procesada'}, status=400)
 
                 return Response({'status': 'success', 'message': 'Pago confirmado y archivos enviados'})
             else:
@@ -638,6 +673,46 @@ class MarketplaceOrderViewSet(viewsets.ReadOnlyModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=500)
 
+    @action(detail=False, methods=['get'])
+    def get_order_by_payment_intent(self, request):
+        """Obtener orden por payment_intent_id"""
+        payment_intent_id = request.query_params.get('payment_intent_id')
+        
+        if not payment_intent_id:
+            return Response({
+                'error': 'payment_intent_id es requerido'
+            }, status=400)
+        
+        try:
+            order = MarketplaceOrder.objects.select_related('user').get(stripe_payment_intent_id=payment_intent_id)
+            payment_state = get_payment_state(payment_intent_id)
+            
+            return Response({
+                'success': True,
+                'order': {
+                    'id': order.id,
+                    'user': {
+                        'id': order.user.id,
+                        'username': order.user.username,
+                        'email': order.user.email
+                    },
+                    'total_amount': float(order.total_amount),
+                    'status': order.status,
+                    'payment_status': payment_state['status'] if payment_state else order.payment_status,
+                    'created_at': order.created_at.isoformat(),
+                    'stripe_payment_intent_id': order.stripe_payment_intent_id
+                }
+            })
+        except MarketplaceOrder.DoesNotExist:
+            return Response({
+                'error': 'Orden no encontrada'
+            }, status=404)
+        except Exception as e:
+            print(f"❌ Error buscando orden por payment_intent_id: {e}")
+            return Response({
+                'error': f'Error interno: {str(e)}'
+            }, status=500)
+
     def send_zip_files(self, order):
         """Enviar archivos ZIP por email"""
         try:
@@ -654,8 +729,8 @@ class MarketplaceOrderViewSet(viewsets.ReadOnlyModelViewSet):
                         'path': item.product.zip_file.path
                     })
                     item.zip_sent = True
-                    item.zip_sent_at = datetime.now()
-                    item.save()
+                    item.zip_sent_at = timezone.now()
+                    item.save(update_fields=['zip_sent', 'zip_sent_at'])
 
             if zip_files:
                 # Enviar email
@@ -675,7 +750,7 @@ class MarketplaceOrderViewSet(viewsets.ReadOnlyModelViewSet):
                 )
 
                 order.zip_files_sent = True
-                order.save()
+                order.save(update_fields=['zip_files_sent', 'updated_at'])
 
         except Exception as e:
             print(f"Error enviando archivos ZIP: {e}")
@@ -814,7 +889,48 @@ class ProductFavoriteViewSet(viewsets.ModelViewSet):
         return ProductFavorite.objects.filter(user=self.request.user)
 
     def perform_create(self, serializer):
-        serializer.save()
+        favorite = serializer.save()
+        record_product_event(favorite.product_id, 'favorite')
+
+    @action(detail=False, methods=['post'])
+    def sync(self, request):
+        """
+        Sincronizar varios favoritos en una sola llamada
+        Body: {"add": [product_id, ...], "remove": [product_id, ...]}
+        """
+        add_ids = request.data.get('add', [])
+        remove_ids = request.data.get('remove', [])
+        if not isinstance(add_ids, list) or not isinstance(remove_ids, list):
+            return Response({'error': 'add y remove deben ser listas de IDs'}, status=400)
+        try:
+            add_ids = {int(product_id) for product_id in add_ids}
+            remove_ids = {int(product_id) for product_id in remove_ids} - add_ids
+        except (TypeError, ValueError):
+            return Response({'error': 'add y remove deben ser listas de IDs'}, status=400)
+
+        user = request.user
+        with transaction.atomic():
+            if remove_ids:
+                ProductFavorite.objects.filter(user=user, product_id__in=remove_ids).delete()
+            if add_ids:
+                existing = set(
+                    ProductFavorite.objects.filter(user=user, product_id__in=add_ids).values_list('product_id', flat=True)
+                )
+                new_ids = set(
+                    MarketplaceProduct.objects.filter(id__in=add_ids - existing, is_active=True).values_list('id', flat=True)
+                )
+                ProductFavorite.objects.bulk_create(
+                    [ProductFavorite(user=user, product_id=product_id) for product_id in new_ids],
+                    ignore_conflicts=True
+                )
+            else:
+                new_ids = set()
+
+        for product_id in new_ids:
+            record_product_event(product_id, 'favorite')
+
+        favorite_ids = list(ProductFavorite.objects.filter(user=user).values_list('product_id', flat=True))
+        return Response({'favorites': favorite_ids, 'count': len(favorite_ids)})
 
     @action(detail=False, methods=['get'])
     def count(self, request):
@@ -1007,45 +1123,7 @@ class ProductFavoriteViewSet(viewsets.ModelViewSet):
             return Response({
                 'status': 'error',
                 'message': f'Error en prueba del sistema de facturas: {str(e)}'
-            }, status=500) 
-
-    @action(detail=False, methods=['get'])
-    def get_order_by_payment_intent(self, request):
-        """Obtener orden por payment_intent_id"""
-        payment_intent_id = request.query_params.get('payment_intent_id')
-        
-        if not payment_intent_id:
-            return Response({
-                'error': 'payment_intent_id es requerido'
-            }, status=400)
-        
-        try:
-            order = MarketplaceOrder.objects.get(stripe_payment_intent_id=payment_intent_id)
-            
-            return Response({
-                'success': True,
-                'order': {
-                    'id': order.id,
-                    'user': {
-                        'id': order.user.id,
-                        'username': order.user.username,
-                        'email': order.user.email
-                    },
-                    'total_amount': float(order.total_amount),
-                    'status': order.status,
-                    'created_at': order.created_at.isoformat(),
-                    'stripe_payment_intent_id': order.stripe_payment_intent_id
-                }
-            })
-        except MarketplaceOrder.DoesNotExist:
-            return Response({
-                'error': 'Orden no encontrada'
-            }, status=404)
-        except Exception as e:
-            print(f"❌ Error buscando orden por payment_intent_id: {e}")
-            return Response({
-                'error': f'Error interno: {str(e)}'
-            }, status=500) 
+            }, status=500)
 
 @method_decorator(csrf_exempt, name='dispatch')
 class StripeWebhookView(View):
@@ -1083,29 +1161,22 @@ class StripeWebhookView(View):
         try:
             payment_intent_id = payment_intent['id']
             print(f"✅ Pago exitoso: {payment_intent_id}")
+            record_payment_state(payment_intent_id, payment_intent.get('status', 'succeeded'))
             
             # Buscar la orden por payment_intent_id
-            try:
-                order = MarketplaceOrder.objects.get(stripe_payment_intent_id=payment_intent_id)
-                print(f"📦 Orden encontrada: #{order.id}")
-                print(f"📦 Usuario: {order.user.username}")
-                print(f"📦 Estado actual: {order.status}")
-                
-                # Actualizar estado de la orden
-                order.status = 'completed'
-                order.save()
-                print(f"✅ Orden #{order.id} marcada como completada")
-                
-                # Enviar factura automáticamente
-                try:
-                    print(f"📧 Enviando factura automática para orden #{order.id}")
-                    self.send_invoice_automatically(order)
-                    print(f"📧 Factura enviada exitosamente para orden #{order.id}")
-                except Exception as e:
-                    print(f"❌ Error enviando factura: {e}")
-                
-            except MarketplaceOrder.DoesNotExist:
+            order_id = MarketplaceOrder.objects.filter(
+                stripe_payment_intent_id=payment_intent_id
+            ).values_list('id', flat=True).first()
+            if order_id is None:
                 print(f"❌ Orden no encontrada para payment_intent: {payment_intent_id}")
+                return
+            
+            # Marcar como completada; la factura se envía una sola vez, con el primer pago de la orden
+            try:
+                OrderStateMachine.advance(order_id, 'payment_succeeded')
+                print(f"✅ Orden #{order_id} marcada como completada")
+            except IllegalTransition as e:
+                print(f"ℹ️ {e}")
                 
         except Exception as e:
             print(f"❌ Error manejando pago exitoso: {e}")
@@ -1115,15 +1186,21 @@ class StripeWebhookView(View):
         try:
             payment_intent_id = payment_intent['id']
             print(f"❌ Pago fallido: {payment_intent_id}")
+            record_payment_state(payment_intent_id, payment_intent.get('status', 'requires_payment_method'))
             
             # Buscar la orden y marcarla como fallida
-            try:
-                order = MarketplaceOrder.objects.get(stripe_payment_intent_id=payment_intent_id)
-                order.status = 'failed'
-                order.save()
-                print(f"❌ Orden #{order.id} marcada como fallida")
-            except MarketplaceOrder.DoesNotExist:
+            order_id = MarketplaceOrder.objects.filter(
+                stripe_payment_intent_id=payment_intent_id
+            ).values_list('id', flat=True).first()
+            if order_id is None:
                 print(f"❌ Orden no encontrada para payment_intent: {payment_intent_id}")
+                return
+            
+            try:
+                OrderStateMachine.advance(order_id, 'payment_failed')
+                print(f"❌ Orden #{order_id} marcada como fallida")
+            except IllegalTransition as e:
+                print(f"ℹ️ {e}")
                 
         except Exception as e:
             print(f"❌ Error manejando pago fallido: {e}")
@@ -1137,35 +1214,30 @@ class StripeWebhookView(View):
             print(f"🛒 Checkout completado: {checkout_session['id']}")
             print(f"📧 Email del cliente desde Stripe: {customer_email}")
             print(f"💳 Payment Intent: {payment_intent_id}")
+            if payment_intent_id and checkout_session.get('payment_status') == 'paid':
+                record_payment_state(payment_intent_id, 'succeeded')
             
             # Buscar la orden por payment_intent_id
-            try:
-                order = MarketplaceOrder.objects.get(stripe_payment_intent_id=payment_intent_id)
-                print(f"📦 Orden encontrada: #{order.id}")
-                
-                # Actualizar estado de la orden
-                order.status = 'completed'
-                order.save()
-                print(f"✅ Orden #{order.id} marcada como completada")
-                
-                # Guardar el email del cliente en la orden (prioridad al email de Stripe)
-                if customer_email:
-                    order.customer_email = customer_email
-                    order.save()
-                    print(f"📧 Email del cliente guardado desde Stripe: {customer_email}")
-                else:
-                    print(f"⚠️ No se encontró email del cliente en el checkout de Stripe")
-                
-                # Enviar factura automáticamente usando el email de Stripe
-                try:
-                    print(f"📧 Enviando factura automática para orden #{order.id}")
-                    self.send_invoice_automatically(order, customer_email)
-                    print(f"📧 Factura enviada exitosamente para orden #{order.id}")
-                except Exception as e:
-                    print(f"❌ Error enviando factura: {e}")
-                
-            except MarketplaceOrder.DoesNotExist:
+            order_id = MarketplaceOrder.objects.filter(
+                stripe_payment_intent_id=payment_intent_id
+            ).values_list('id', flat=True).first()
+            if order_id is None:
                 print(f"❌ Orden no encontrada para payment_intent: {payment_intent_id}")
+                return
+            
+            # Guardar el email del cliente (prioridad al email de Stripe) en el mismo UPDATE de la transición
+            fields = {'customer_email': customer_email} if customer_email else {}
+            if not customer_email:
+                print(f"⚠️ No se encontró email del cliente en el checkout de Stripe")
+            
+            # Marcar como completada; la factura se envía una sola vez, con el primer pago de la orden
+            try:
+                OrderStateMachine.advance(order_id, 'payment_succeeded', **fields)
+                print(f"✅ Orden #{order_id} marcada como completada")
+            except IllegalTransition as e:
+                print(f"ℹ️ {e}")
+                if fields:
+                    MarketplaceOrder.objects.filter(pk=order_id).update(**fields)
                 
         except Exception as e:
             print(f"❌ Error manejando checkout completado: {e}")
@@ -1344,6 +1416,16 @@ class StripeWebhookView(View):
             print(f"❌ Error general enviando factura automática: {e}")
             raise e 
 
+def send_order_invoice(order):
+    """Efecto secundario de OrderStateMachine: enviar la factura con el primer pago de la orden"""
+    print(f"📧 Enviando factura automática para orden #{order.id}")
+    StripeWebhookView().send_invoice_automatically(order)
+
+
+def send_order_zip_files(order):
+    """Efecto secundario de OrderStateMachine: enviar los ZIP al confirmar el pago"""
+    MarketplaceOrderViewSet().send_zip_files(order)
+
 @method_decorator(csrf_exempt, name='dispatch')
 class SendZipFilesView(View):
     @method_decorator(csrf_exempt)
@@ -1411,6 +1493,15 @@ class SendZipFilesView(View):
                     'message': 'El archivo es demasiado grande. Máximo 50MB'
                 }, status=400)
             
+            # Marcar que se enviaron los archivos (no se permite en órdenes canceladas o fallidas)
+            try:
+                order = OrderStateMachine.advance(order.id, 'files_sent', zip_files_sent=True)
+            except IllegalTransition as e:
+                return JsonResponse({
+                    'success': False,
+                    'message': str(e)
+                }, status=400)
+            
             # Crear el registro del archivo ZIP
             zip_record = OrderZipFile.objects.create(
                 order=order,
@@ -1422,10 +1513,6 @@ class SendZipFilesView(View):
                 sent_at=timezone.now()
             )
             
-            # Marcar que se enviaron los archivos
-            order.zip_files_sent = True
-            order.status = 'completed'
-            order.save()
             
             # Enviar email al cliente con el archivo ZIP adjunto
             subject = f'Archivos de tu orden #{order.id} - U2 Group'
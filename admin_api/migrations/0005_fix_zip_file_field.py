@@ -9,10 +9,16 @@ class Migration(migrations.Migration):
         ('admin_api', '0004_marketplaceproduct_zip_file_cart_marketplaceorder_and_more'),
     ]
 
+    # 0004 ya crea la columna zip_file: aquí solo se actualiza el estado del modelo,
+    # de lo contrario la migración falla en bases de datos nuevas (columna duplicada)
     operations = [
-        migrations.AddField(
-            model_name='marketplaceproduct',
-            name='zip_file',
-            field=models.FileField(blank=True, help_text='Archivo ZIP del producto', null=True, upload_to='marketplace/zips/'),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='marketplaceproduct',
+                    name='zip_file',
+                    field=models.FileField(blank=True, help_text='Archivo ZIP del producto', null=True, upload_to='marketplace/zips/'),
+                ),
+            ],
         ),
     ]
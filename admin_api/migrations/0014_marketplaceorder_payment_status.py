@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-19 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0013_siteconfig'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketplaceorder',
+            name='payment_status',
+            field=models.CharField(blank=True, default='', help_text='Último estado conocido del PaymentIntent en Stripe', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='marketplaceorder',
+            name='payment_status_synced_at',
+            field=models.DateTimeField(blank=True, help_text='Fecha de la última sincronización del estado del pago', null=True),
+        ),
+        migrations.AlterField(
+            model_name='marketplaceorder',
+            name='stripe_payment_intent_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0014_marketplaceorder_payment_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='marketplaceorder',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('paid', 'Pagado'), ('processing', 'Procesando'), ('completed', 'Completado'), ('cancelled', 'Cancelado'), ('failed', 'Fallido')], default='pending', max_length=20),
+        ),
+    ]
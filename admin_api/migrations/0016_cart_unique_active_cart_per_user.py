@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-19 14:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def deactivate_duplicate_active_carts(apps, schema_editor):
+    """Dejar activo solo el carrito más reciente de cada usuario antes de crear la restricción"""
+    Cart = apps.get_model('admin_api', 'Cart')
+    keep_ids = {}
+    for cart_id, user_id in Cart.objects.filter(is_active=True).order_by('-created_at', '-id').values_list('id', 'user_id'):
+        keep_ids.setdefault(user_id, cart_id)
+    Cart.objects.filter(is_active=True).exclude(id__in=keep_ids.values()).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0015_alter_marketplaceorder_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(deactivate_duplicate_active_carts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('user',), name='unique_active_cart_per_user'),
+        ),
+    ]
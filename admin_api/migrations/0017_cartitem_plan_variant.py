@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-19 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0016_cart_unique_active_cart_per_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='area_unit',
+            field=models.CharField(blank=True, choices=[('m2', 'm²'), ('sqft', 'sq.ft')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='plan_type',
+            field=models.CharField(blank=True, choices=[('pdf', 'PDF'), ('editable', 'Archivo Editable')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='marketplaceorderitem',
+            name='area_unit',
+            field=models.CharField(blank=True, choices=[('m2', 'm²'), ('sqft', 'sq.ft')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='marketplaceorderitem',
+            name='plan_type',
+            field=models.CharField(blank=True, choices=[('pdf', 'PDF'), ('editable', 'Archivo Editable')], default='', max_length=20),
+        ),
+    ]
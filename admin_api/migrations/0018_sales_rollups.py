@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-19 14:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0017_cartitem_plan_variant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Ventas diarias',
+                'verbose_name_plural': 'Ventas diarias',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(max_length=100)),
+                ('style', models.CharField(max_length=100)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='admin_api.marketplaceproduct')),
+            ],
+            options={
+                'verbose_name': 'Ventas diarias por producto',
+                'verbose_name_plural': 'Ventas diarias por producto',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date', 'category'], name='admin_api_d_date_8a67c6_idx'), models.Index(fields=['date', 'style'], name='admin_api_d_date_bbba68_idx')],
+                'unique_together': {('date', 'product')},
+            },
+        ),
+    ]
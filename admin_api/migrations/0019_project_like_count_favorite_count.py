@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-19 14:18
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_project_counters(apps, schema_editor):
+    """Inicializar los contadores con las interacciones ya guardadas"""
+    Project = apps.get_model('admin_api', 'Project')
+    ProjectLikeFavorite = apps.get_model('admin_api', 'ProjectLikeFavorite')
+    counts = ProjectLikeFavorite.objects.values('project_id').annotate(
+        likes=Count('id', filter=Q(liked=True)),
+        favorites=Count('id', filter=Q(favorited=True)),
+    )
+    for row in counts:
+        Project.objects.filter(pk=row['project_id']).update(like_count=row['likes'], favorite_count=row['favorites'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0018_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='favorite_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='like_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_project_counters, migrations.RunPython.noop),
+    ]
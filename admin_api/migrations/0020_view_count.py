@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0019_project_like_count_favorite_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='view_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='marketplaceproduct',
+            name='view_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
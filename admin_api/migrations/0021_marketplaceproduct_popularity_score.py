@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0020_view_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketplaceproduct',
+            name='popularity_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='marketplaceproduct',
+            index=models.Index(fields=['is_active', '-popularity_score'], name='product_active_popularity_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-19 14:23
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def backfill_blog_slugs(apps, schema_editor):
+    """Generar el slug de los blogs que no tienen (mismo formato que Blog.build_unique_slug)"""
+    Blog = apps.get_model('admin_api', 'Blog')
+    used = set(Blog.objects.exclude(slug__isnull=True).exclude(slug='').values_list('slug', flat=True))
+    for blog in Blog.objects.filter(models.Q(slug__isnull=True) | models.Q(slug='')).order_by('id'):
+        base = slugify(blog.title)[:40].strip('-') or 'blog'
+        slug = base
+        suffix = 2
+        while slug in used:
+            slug = f"{base}-{suffix}"
+            suffix += 1
+        used.add(slug)
+        Blog.objects.filter(pk=blog.pk).update(slug=slug)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0021_marketplaceproduct_popularity_score'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='blog',
+            name='slug',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=50, null=True),
+        ),
+        migrations.RunPython(backfill_blog_slugs, migrations.RunPython.noop),
+    ]
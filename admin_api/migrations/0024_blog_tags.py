@@ -0,0 +1,92 @@
+# Generated by Django 5.2 on 2026-10-19 14:27
+
+import json
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+MAX_TAG_LENGTH = 50
+
+
+def parse_tags(tags):
+    """
+    Copia congelada de blog_content.parse_tags (tal como era al crear esta migración),
+    para que el backfill no cambie si la función de la app cambia después.
+
+    Returns:
+        dict: {slug: nombre} en el orden en que aparecen, sin repetidos
+    """
+    tags = (tags or '').strip()
+    names = None
+    if tags.startswith('['):
+        try:
+            names = [str(name) for name in json.loads(tags)]
+        except ValueError:
+            names = None
+    if names is None:
+        names = re.split(r'[,;\n#]', tags.strip('[]'))
+
+    parsed = {}
+    for name in names:
+        name = ' '.join(name.strip().strip('\'"').split())[:MAX_TAG_LENGTH]
+        slug = slugify(name)[:MAX_TAG_LENGTH]
+        if slug and slug not in parsed:
+            parsed[slug] = name
+    return parsed
+
+
+def backfill_blog_tags(apps, schema_editor):
+    """Crear Tag/BlogTag desde el texto de tags de todos los blogs (en bloque)"""
+    Blog = apps.get_model('admin_api', 'Blog')
+    Tag = apps.get_model('admin_api', 'Tag')
+    BlogTag = apps.get_model('admin_api', 'BlogTag')
+
+    blog_tags = {blog_id: parse_tags(tags) for blog_id, tags in Blog.objects.values_list('id', 'tags').iterator()}
+    names = {}
+    for parsed in blog_tags.values():
+        for slug, name in parsed.items():
+            names.setdefault(slug, name)
+    if not names:
+        return
+
+    Tag.objects.bulk_create([Tag(slug=slug, name=name) for slug, name in names.items()], batch_size=500)
+    tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+    BlogTag.objects.bulk_create(
+        [BlogTag(blog_id=blog_id, tag_id=tag_ids[slug]) for blog_id, parsed in blog_tags.items() for slug in parsed],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0023_blog_content_render'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('slug', models.SlugField(unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BlogTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blog_tags', to='admin_api.blog')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blog_tags', to='admin_api.tag')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tag', 'blog'), name='unique_blog_tag')],
+            },
+        ),
+        migrations.RunPython(backfill_blog_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-19 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0024_blog_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='related_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='related_min_score',
+            field=models.FloatField(default=0),
+        ),
+    ]
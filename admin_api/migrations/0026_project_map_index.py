@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-19 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0025_blog_related_posts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('show_on_map', True)), fields=['latitude', 'longitude'], name='project_map_lat_lng_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0027_pending_file_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='related_stale',
+            field=models.BooleanField(db_index=True, default=True),
+        ),
+    ]
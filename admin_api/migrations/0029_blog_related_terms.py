@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_api', '0028_blog_related_stale'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='related_terms',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,12 +1,33 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Sum
+from django.utils.text import slugify
+from decimal import Decimal
 import uuid
 
+from .blog_content import parse_tags, process_blog_content
+
 def generate_default_visitor_id():
     return f'legacy_{uuid.uuid4().hex[:8]}'
 
 # Create your models here.
 
-class Project(models.Model):
+class CounterFieldsMixin:
+    """
+    Los contadores (COUNTER_FIELDS) solo se modifican con UPDATE ... SET campo = campo + n
+    (F() o el buffer de contadores). Un save() completo de una fila existente no los
+    escribe, para no pisar con el valor leído los incrementos hechos desde entonces.
+    """
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+class Project(CounterFieldsMixin, models.Model):
     """
     Modelo simple para proyectos
     """
@@ -33,6 +54,11 @@ class Project(models.Model):
     status = models.CharField(max_length=50, default="Planning", help_text="Estado del proyecto")
     featured = models.BooleanField(default=False, help_text="Proyecto destacado")
     
+    # Contadores denormalizados de ProjectLikeFavorite (ver interaction_services)
+    like_count = models.IntegerField(default=0)
+    favorite_count = models.IntegerField(default=0)
+    COUNTER_FIELDS = ('like_count', 'favorite_count')
+    
     # Imagen
     image = models.ImageField(upload_to='projects/', null=True, blank=True, help_text="Imagen del proyecto")
     
@@ -44,6 +70,14 @@ class Project(models.Model):
         ordering = ['-created_at']
         verbose_name = "Proyecto"
         verbose_name_plural = "Proyectos"
+        indexes = [
+            # Consultas del mapa por área visible (ver map_services)
+            models.Index(
+                fields=['latitude', 'longitude'],
+                name='project_map_lat_lng_idx',
+                condition=models.Q(show_on_map=True),
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -62,7 +96,7 @@ class ProjectImage(models.Model):
     def __str__(self):
         return f"Imagen de {self.project.title}"
 
-class Blog(models.Model):
+class Blog(CounterFieldsMixin, models.Model):
     """
     Modelo para blogs - Ajustado para coincidir con la base de datos existente
     """
@@ -78,8 +112,22 @@ class Blog(models.Model):
     featured = models.BooleanField(default=False)
     favorite_count = models.IntegerField(default=0)
     like_count = models.IntegerField(default=0)
+    view_count = models.IntegerField(default=0)
+    COUNTER_FIELDS = ('favorite_count', 'like_count', 'view_count')
     excerpt = models.TextField(blank=True, null=True)
-    slug = models.CharField(max_length=50, blank=True, null=True, default="")
+    slug = models.CharField(max_length=50, blank=True, null=True, default="", db_index=True)
+    # Derivados del contenido al guardar (ver blog_content.process_blog_content)
+    content_html = models.TextField(blank=True, default="")
+    content_images = models.JSONField(default=list, blank=True)
+    word_count = models.PositiveIntegerField(default=0)
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    # Blogs relacionados precalculados (ver related_services)
+    related_ids = models.JSONField(default=list, blank=True)
+    related_min_score = models.FloatField(default=0)
+    related_terms = models.JSONField(default=dict, blank=True)
+    related_stale = models.BooleanField(default=True, db_index=True)
+    # Campos que alimentan la similitud: cambiarlos marca los relacionados como desactualizados
+    RELATED_SOURCE_FIELDS = frozenset({'title', 'summary', 'content', 'tags'})
 
     class Meta:
         ordering = ['-date']
@@ -87,6 +135,58 @@ class Blog(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        derived = []
+        # Generar el slug desde el título si no se indicó uno
+        if not self.slug:
+            self.slug = self.build_unique_slug()
+            derived.append('slug')
+        # Renderizar el contenido solo si se está guardando (y cambió)
+        if update_fields is None or 'content' in update_fields or 'excerpt' in update_fields:
+            derived += process_blog_content(self)
+        # Los relacionados se recalculan fuera del request (rebuild_related_posts)
+        if update_fields is None or self.RELATED_SOURCE_FIELDS & set(update_fields):
+            self.related_stale = True
+            derived.append('related_stale')
+        if update_fields is not None and derived:
+            kwargs['update_fields'] = set(update_fields) | set(derived)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Mantener el índice de etiquetas si el texto de tags cambió
+            if (update_fields is None or 'tags' in update_fields) and self.tags != getattr(self, '_loaded_tags', None):
+                self.sync_tags()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Recordar las etiquetas leídas para no resincronizarlas si no cambian
+        if 'tags' in field_names:
+            instance._loaded_tags = instance.tags
+        return instance
+
+    def sync_tags(self):
+        """Actualizar Tag/BlogTag a partir del campo de texto tags"""
+        parsed = parse_tags(self.tags)
+        if parsed:
+            Tag.objects.bulk_create([Tag(slug=slug, name=name) for slug, name in parsed.items()], ignore_conflicts=True)
+        tag_ids = list(Tag.objects.filter(slug__in=parsed).values_list('id', flat=True))
+
+        BlogTag.objects.filter(blog=self).exclude(tag_id__in=tag_ids).delete()
+        if tag_ids:
+            BlogTag.objects.bulk_create([BlogTag(blog=self, tag_id=tag_id) for tag_id in tag_ids], ignore_conflicts=True)
+        self._loaded_tags = self.tags
+
+    def build_unique_slug(self):
+        """Slug a partir del título, con sufijo numérico si ya existe otro blog con el mismo"""
+        base = slugify(self.title)[:40].strip('-') or 'blog'
+        slug = base
+        suffix = 2
+        while Blog.objects.filter(slug=slug).exclude(pk=self.pk).exists():
+            slug = f"{base}-{suffix}"
+            suffix += 1
+        return slug
+
 class BlogImage(models.Model):
     """
     Imágenes adicionales para blogs
@@ -101,6 +201,34 @@ class BlogImage(models.Model):
     def __str__(self):
         return f"Imagen de {self.blog.title}"
 
+class Tag(models.Model):
+    """
+    Etiqueta normalizada de blogs (derivada de Blog.tags al guardar)
+    """
+    name = models.CharField(max_length=50)
+    slug = models.SlugField(max_length=50, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+class BlogTag(models.Model):
+    """
+    Relación blog-etiqueta
+    """
+    blog = models.ForeignKey(Blog, related_name='blog_tags', on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, related_name='blog_tags', on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'blog'], name='unique_blog_tag')
+        ]
+
+    def __str__(self):
+        return f"{self.blog_id} - {self.tag_id}"
+
 class BlogLikeFavorite(models.Model):
     """
     Sistema de likes y favoritos para blogs
@@ -137,7 +265,18 @@ class ProjectLikeFavorite(models.Model):
     def __str__(self):
         return f"{self.visitor_id} - {self.project.title}"
 
-class MarketplaceProduct(models.Model):
+# Variante del plano comprada (tipo de archivo y unidad con la que se calculó el precio)
+PLAN_TYPE_CHOICES = [
+    ('pdf', 'PDF'),
+    ('editable', 'Archivo Editable'),
+]
+
+AREA_UNIT_CHOICES = [
+    ('m2', 'm²'),
+    ('sqft', 'sq.ft'),
+]
+
+class MarketplaceProduct(CounterFieldsMixin, models.Model):
     """
     Productos del marketplace
     """
@@ -165,11 +304,19 @@ class MarketplaceProduct(models.Model):
     area_unit = models.CharField(max_length=10, default='m2')
     garage_spaces = models.IntegerField(default=0)
     main_level_images = models.JSONField(default=list)
+    view_count = models.IntegerField(default=0)
+    # Puntaje con decaimiento temporal (ver popularity_services)
+    popularity_score = models.FloatField(default=0)
+    COUNTER_FIELDS = ('view_count', 'popularity_score')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # ?ordering=popular sobre productos activos
+            models.Index(fields=['is_active', '-popularity_score'], name='product_active_popularity_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -199,13 +346,26 @@ class Cart(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            # Un solo carrito activo por usuario
+            models.UniqueConstraint(fields=['user'], condition=models.Q(is_active=True), name='unique_active_cart_per_user'),
+        ]
 
     def __str__(self):
         return f"Carrito de {self.user.username}"
 
     @property
     def total(self):
-        return sum(item.subtotal for item in self.items.all())
+        """Total del carrito calculado en SQL (o tomado de los items precargados con cart_total)"""
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('items')
+        if prefetched is not None:
+            if not prefetched:
+                return Decimal('0')
+            if hasattr(prefetched[0], 'cart_total'):
+                return prefetched[0].cart_total
+            return sum((item.subtotal for item in prefetched), Decimal('0'))
+        total = self.items.aggregate(total=Sum(F('quantity') * F('price')))['total']
+        return total or Decimal('0')
 
 class CartItem(models.Model):
     """
@@ -215,6 +375,9 @@ class CartItem(models.Model):
     product = models.ForeignKey(MarketplaceProduct, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2, help_text="Precio al momento de agregar al carrito")
+    # Vacío solo en items anteriores a este campo (ver comando backfill_plan_types)
+    plan_type = models.CharField(max_length=20, choices=PLAN_TYPE_CHOICES, blank=True, default='')
+    area_unit = models.CharField(max_length=10, choices=AREA_UNIT_CHOICES, blank=True, default='')
 
     class Meta:
         unique_together = ['cart', 'product']
@@ -224,6 +387,10 @@ class CartItem(models.Model):
 
     @property
     def subtotal(self):
+        # line_subtotal viene anotado por cart_services.cart_items_queryset()
+        line_subtotal = getattr(self, 'line_subtotal', None)
+        if line_subtotal is not None:
+            return line_subtotal
         return self.quantity * self.price
 
 class MarketplaceOrder(models.Model):
@@ -236,12 +403,15 @@ class MarketplaceOrder(models.Model):
         ('processing', 'Procesando'),
         ('completed', 'Completado'),
         ('cancelled', 'Cancelado'),
+        ('failed', 'Fallido'),
     ]
 
     user = models.ForeignKey('auth.User', on_delete=models.CASCADE, related_name='marketplace_orders')
-    stripe_payment_intent_id = models.CharField(max_length=255, null=True, blank=True)
+    stripe_payment_intent_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    payment_status = models.CharField(max_length=50, blank=True, default='', help_text="Último estado conocido del PaymentIntent en Stripe")
+    payment_status_synced_at = models.DateTimeField(null=True, blank=True, help_text="Fecha de la última sincronización del estado del pago")
     customer_email = models.EmailField(blank=True, null=True, help_text="Email del cliente desde el formulario de checkout")
     shipping_address = models.TextField(blank=True)
     billing_address = models.TextField(blank=True)
@@ -263,6 +433,8 @@ class MarketplaceOrderItem(models.Model):
     product = models.ForeignKey(MarketplaceProduct, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    plan_type = models.CharField(max_length=20, choices=PLAN_TYPE_CHOICES, blank=True, default='')
+    area_unit = models.CharField(max_length=10, choices=AREA_UNIT_CHOICES, blank=True, default='')
     zip_sent = models.BooleanField(default=False)
     zip_sent_at = models.DateTimeField(null=True, blank=True)
 
@@ -369,4 +541,68 @@ class SiteConfig(models.Model):
         verbose_name_plural = "Configuraciones del Sitio"
 
     def __str__(self):
-        return f"{self.key}: {self.value[:50]}..." 
\ No newline at end of file
+        return f"{self.key}: {self.value[:50]}..." 
+
+class DailySales(models.Model):
+    """
+    Ventas totales por día (tabla agregada, ver analytics_services)
+    """
+    date = models.DateField(unique=True)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = "Ventas diarias"
+        verbose_name_plural = "Ventas diarias"
+
+    def __str__(self):
+        return f"{self.date}: ${self.revenue} ({self.orders} órdenes)"
+
+
+class DailyProductSales(models.Model):
+    """
+    Ventas por producto y día, con la categoría y el estilo del producto
+    para agrupar sin volver a leer las órdenes (ver analytics_services)
+    """
+    date = models.DateField()
+    product = models.ForeignKey(MarketplaceProduct, on_delete=models.CASCADE, related_name='daily_sales')
+    category = models.CharField(max_length=100)
+    style = models.CharField(max_length=100)
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['date', 'product']
+        indexes = [
+            models.Index(fields=['date', 'category']),
+            models.Index(fields=['date', 'style']),
+        ]
+        verbose_name = "Ventas diarias por producto"
+        verbose_name_plural = "Ventas diarias por producto"
+
+    def __str__(self):
+        return f"{self.date} - {self.product_id}: ${self.revenue}"
+
+
+class PendingFileDeletion(models.Model):
+    """
+    Archivo de media pendiente de borrar del almacenamiento. Los borrados de
+    registros solo encolan la ruta (en la misma transacción) y el comando
+    sweep_deleted_files elimina los archivos después.
+    """
+    path = models.CharField(max_length=500, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = "Archivo pendiente de borrar"
+        verbose_name_plural = "Archivos pendientes de borrar"
+
+    def __str__(self):
+        return self.path
@@ -0,0 +1,175 @@
+"""
+Máquina de estados para MarketplaceOrder.status.
+
+Cada transición se aplica con un UPDATE condicional
+(UPDATE ... SET status = destino WHERE id = X AND status IN (origenes)),
+de modo que solo uno de varios eventos concurrentes (webhooks, polls,
+acciones del admin) puede ganar la transición. Los efectos secundarios
+(factura, envío de ZIPs) se ejecutan una sola vez, tras el commit, y solo
+para quien ganó la transición.
+
+La factura y la compra (popularidad) dependen de la primera vez que la orden
+sale de un estado sin pago hacia uno pagado, sea cual sea el evento: una orden
+confirmada (pending -> paid) y luego completada al enviar los archivos cuenta
+como compra aunque el webhook payment_succeeded llegue tarde y se rechace.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .dashboard_services import invalidate_dashboard_summary
+from .models import MarketplaceOrder
+
+
+class IllegalTransition(Exception):
+    """El evento no es válido para el estado actual de la orden"""
+
+    def __init__(self, order_id, event, current_status=None):
+        self.order_id = order_id
+        self.event = event
+        self.current_status = current_status
+        super().__init__(f"Transición '{event}' no permitida para la orden #{order_id} (estado: {current_status})")
+
+
+class OrderStateMachine:
+    """
+    Transiciones permitidas: evento -> (estados de origen, estado destino, efectos secundarios)
+
+    Los efectos secundarios se indican como rutas importables que reciben la orden.
+    """
+
+    UNPAID_STATUSES = ('pending',)
+    PAID_STATUSES = ('paid', 'processing', 'completed')
+    # Efectos de la primera transición de un estado sin pago a uno pagado
+    FIRST_PAYMENT_SIDE_EFFECTS = [
+        'admin_api.marketplace_views.send_order_invoice',
+        'admin_api.popularity_services.record_order_purchase',
+    ]
+
+    TRANSITIONS = {
+        'payment_confirmed': (
+            ('pending',),
+            'paid',
+            ['admin_api.marketplace_views.send_order_zip_files', 'admin_api.analytics_services.refresh_order_sales'],
+        ),
+        'payment_succeeded': (
+            ('pending', 'paid', 'processing'),
+            'completed',
+            ['admin_api.analytics_services.refresh_order_sales'],
+        ),
+        'payment_failed': (
+            ('pending',),
+            'failed',
+            [],
+        ),
+        'files_sent': (
+            ('pending', 'paid', 'processing', 'completed'),
+            'completed',
+            ['admin_api.analytics_services.refresh_order_sales'],
+        ),
+        'cancel': (
+            ('pending', 'paid', 'processing'),
+            'cancelled',
+            ['admin_api.analytics_services.refresh_order_sales'],
+        ),
+    }
+
+    @classmethod
+    def _get_transition(cls, order_id, event):
+        try:
+            return cls.TRANSITIONS[event]
+        except KeyError:
+            raise IllegalTransition(order_id, event)
+
+    @classmethod
+    def _split_sources(cls, sources, target):
+        """Estados de origen sin pago (si el destino es pagado) y el resto"""
+        if target not in cls.PAID_STATUSES:
+            return (), tuple(sources)
+        unpaid = tuple(status for status in sources if status in cls.UNPAID_STATUSES)
+        return unpaid, tuple(status for status in sources if status not in unpaid)
+
+    @staticmethod
+    def _update_status(order_id, sources, target, fields):
+        """UPDATE condicional de una orden desde los estados indicados (True si la movió)"""
+        if not sources:
+            return False
+        return MarketplaceOrder.objects.filter(pk=order_id, status__in=sources).update(
+            status=target,
+            updated_at=timezone.now(),
+            **fields
+        ) > 0
+
+    @classmethod
+    def _run_side_effects(cls, event, order_ids, first_payment_ids=()):
+        side_effects = [import_string(path) for path in cls._get_transition(None, event)[2]]
+        payment_side_effects = [import_string(path) for path in cls.FIRST_PAYMENT_SIDE_EFFECTS]
+        first_payment_ids = set(first_payment_ids)
+        if not side_effects and not first_payment_ids:
+            return
+        for order in MarketplaceOrder.objects.select_related('user').filter(pk__in=order_ids):
+            for side_effect in (payment_side_effects if order.id in first_payment_ids else []) + side_effects:
+                try:
+                    side_effect(order)
+                except Exception as e:
+                    print(f"❌ Error en efecto secundario '{event}' para orden #{order.id}: {e}")
+
+    @classmethod
+    def advance(cls, order_id, event, **fields):
+        """
+        Aplicar un evento a una orden.
+
+        Args:
+            order_id (int): ID de la orden
+            event (str): Evento (ver TRANSITIONS)
+            **fields: Columnas adicionales a actualizar en el mismo UPDATE
+
+        Returns:
+            MarketplaceOrder: Orden con el estado nuevo
+
+        Raises:
+            IllegalTransition: Si la orden no está en un estado de origen válido
+        """
+        sources, target, _ = cls._get_transition(order_id, event)
+        unpaid_sources, other_sources = cls._split_sources(sources, target)
+
+        with transaction.atomic():
+            # Primero desde los estados sin pago: si gana ese UPDATE es el primer pago de la orden
+            first_payment = cls._update_status(order_id, unpaid_sources, target, fields)
+            updated = first_payment or cls._update_status(order_id, other_sources, target, fields)
+            if not updated:
+                current_status = MarketplaceOrder.objects.filter(pk=order_id).values_list('status', flat=True).first()
+                raise IllegalTransition(order_id, event, current_status)
+            first_payment_ids = [order_id] if first_payment else []
+            transaction.on_commit(invalidate_dashboard_summary)
+            transaction.on_commit(lambda: cls._run_side_effects(event, [order_id], first_payment_ids))
+
+        return MarketplaceOrder.objects.select_related('user').get(pk=order_id)
+
+    @classmethod
+    def advance_many(cls, order_ids, event):
+        """
+        Aplicar un evento a varias órdenes, bloqueando las filas (SELECT ... FOR UPDATE)
+        para saber exactamente cuáles cambiaron. Las órdenes en estados no válidos se omiten.
+
+        Returns:
+            list: IDs de las órdenes que hicieron la transición
+        """
+        sources, target, _ = cls._get_transition(None, event)
+        unpaid_sources, _ = cls._split_sources(sources, target)
+
+        with transaction.atomic():
+            current = dict(
+                MarketplaceOrder.objects.select_for_update()
+                .filter(pk__in=order_ids, status__in=sources)
+                .values_list('id', 'status')
+            )
+            advanced_ids = list(current)
+            if advanced_ids:
+                first_payment_ids = [pk for pk, status in current.items() if status in unpaid_sources]
+                MarketplaceOrder.objects.filter(pk__in=advanced_ids).update(status=target, updated_at=timezone.now())
+                transaction.on_commit(invalidate_dashboard_summary)
+                transaction.on_commit(lambda: cls._run_side_effects(event, advanced_ids, first_payment_ids))
+
+        return advanced_ids
@@ -0,0 +1,144 @@
+"""
+Estado local de los PaymentIntents de Stripe para las órdenes del marketplace.
+
+El estado se guarda en MarketplaceOrder (actualizado por los webhooks) y en la caché,
+de modo que los polls de la página de éxito no consultan Stripe en cada request.
+Solo se hace un retrieve remoto cuando el estado local está desactualizado, y
+únicamente un proceso a la vez por PaymentIntent (single-flight). El turno se
+reclama en la base de datos con un UPDATE condicional sobre
+payment_status_synced_at, de modo que funciona entre workers aunque la caché
+sea local a cada proceso.
+"""
+
+from datetime import timedelta
+
+import stripe
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import MarketplaceOrder
+
+# Tiempo tras el cual el estado local se considera desactualizado
+PAYMENT_STATE_STALE_AFTER = timedelta(seconds=30)
+PAYMENT_STATE_CACHE_TTL = 60 * 5
+# Estados de Stripe que ya no cambian (no requieren volver a consultar)
+TERMINAL_PAYMENT_STATUSES = {'succeeded', 'canceled'}
+
+
+def _state_cache_key(payment_intent_id):
+    return f'stripe:payment_intent:{payment_intent_id}'
+
+
+def _is_fresh(state, max_age):
+    if state['status'] in TERMINAL_PAYMENT_STATUSES:
+        return True
+    synced_at = state.get('synced_at')
+    return synced_at is not None and timezone.now() - synced_at <= max_age
+
+
+def record_payment_state(payment_intent_id, payment_status):
+    """
+    Guardar el estado de un PaymentIntent en la orden y en la caché
+
+    Args:
+        payment_intent_id (str): ID del PaymentIntent
+        payment_status (str): Estado reportado por Stripe
+
+    Returns:
+        dict: Estado guardado ({'status', 'synced_at'})
+    """
+    synced_at = timezone.now()
+    MarketplaceOrder.objects.filter(stripe_payment_intent_id=payment_intent_id).update(
+        payment_status=payment_status,
+        payment_status_synced_at=synced_at
+    )
+    state = {'status': payment_status, 'synced_at': synced_at}
+    cache.set(_state_cache_key(payment_intent_id), state, PAYMENT_STATE_CACHE_TTL)
+    return state
+
+
+def _load_local_state(payment_intent_id):
+    cached = cache.get(_state_cache_key(payment_intent_id))
+    if cached is not None:
+        return cached
+    return _load_db_state(payment_intent_id)
+
+
+def _load_db_state(payment_intent_id):
+    row = MarketplaceOrder.objects.filter(
+        stripe_payment_intent_id=payment_intent_id
+    ).values('payment_status', 'payment_status_synced_at').first()
+    if row is None:
+        return None
+
+    state = {'status': row['payment_status'], 'synced_at': row['payment_status_synced_at']}
+    cache.set(_state_cache_key(payment_intent_id), state, PAYMENT_STATE_CACHE_TTL)
+    return state
+
+
+def _claim_refresh(payment_intent_id, stale_state):
+    """
+    Reclamar la consulta a Stripe de un PaymentIntent (compare-and-set en la BD)
+
+    Solo una petición consigue mover payment_status_synced_at desde el valor que
+    leyó; las demás (de cualquier worker) ven 0 filas actualizadas.
+    """
+    synced_at = stale_state.get('synced_at')
+    orders = MarketplaceOrder.objects.filter(stripe_payment_intent_id=payment_intent_id)
+    if synced_at is None:
+        orders = orders.filter(payment_status_synced_at__isnull=True)
+    else:
+        orders = orders.filter(payment_status_synced_at=synced_at)
+    return orders.update(payment_status_synced_at=timezone.now()) > 0
+
+
+def get_payment_state(payment_intent_id, max_age=PAYMENT_STATE_STALE_AFTER):
+    """
+    Obtener el estado de un PaymentIntent desde la caché/BD, consultando Stripe
+    solo si el estado local es más antiguo que max_age.
+
+    Los polls concurrentes para el mismo PaymentIntent generan como máximo una
+    llamada a Stripe por periodo max_age: el primero reclama la consulta en la BD
+    y los demás devuelven el estado guardado.
+
+    Args:
+        payment_intent_id (str): ID del PaymentIntent
+        max_age (timedelta): Antigüedad máxima aceptada del estado local
+
+    Returns:
+        dict | None: Estado ({'status', 'synced_at'}) o None si no hay orden asociada
+    """
+    if not payment_intent_id:
+        return None
+
+    state = _load_local_state(payment_intent_id)
+    if state is None:
+        return None
+    if _is_fresh(state, max_age):
+        return state
+
+    if not _claim_refresh(payment_intent_id, state):
+        # Otro proceso ya sincronizó o está consultando Stripe: usar lo guardado en la BD
+        return _load_db_state(payment_intent_id) or state
+
+    try:
+        payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        return record_payment_state(payment_intent_id, payment_intent.status)
+    except stripe.error.StripeError as e:
+        print(f"❌ Error consultando PaymentIntent {payment_intent_id}: {e}")
+        return state
+
+
+def cache_payment_states(statuses, synced_at=None):
+    """
+    Publicar en la caché varios estados de PaymentIntents de una sola vez
+
+    Args:
+        statuses (dict): {payment_intent_id: status}
+        synced_at (datetime): Fecha de sincronización (por defecto ahora)
+    """
+    synced_at = synced_at or timezone.now()
+    cache.set_many({
+        _state_cache_key(payment_intent_id): {'status': payment_status, 'synced_at': synced_at}
+        for payment_intent_id, payment_status in statuses.items()
+    }, PAYMENT_STATE_CACHE_TTL)
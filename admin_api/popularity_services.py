@@ -0,0 +1,72 @@
+"""
+Popularidad de productos del marketplace con decaimiento exponencial.
+
+Cada evento (vista, favorito, agregado al carrito, compra) suma a
+MarketplaceProduct.popularity_score un peso escalado por 2^((t - época) / vida media).
+Escalar los eventos nuevos hacia arriba equivale a hacer decaer todos los
+anteriores, sin reescribir el puntaje de los demás productos: ordenar por
+popularity_score da el ranking con decaimiento temporal y cada evento es un
+incremento (que pasa por el buffer de contadores).
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.utils import timezone
+
+from .counter_buffer import counter_buffer
+from .models import MarketplaceProduct
+
+POPULARITY_HALF_LIFE_DAYS = 7
+# Origen de la escala de tiempo; los pesos crecen x2 cada vida media desde aquí.
+# Con 7 días de vida media un float no se desborda hasta ~19 años después; para
+# mover la época basta con cambiarla y ejecutar rebuild_popularity.
+POPULARITY_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+POPULARITY_WEIGHTS = {
+    'view': 1.0,
+    'favorite': 3.0,
+    'cart_add': 5.0,
+    'purchase': 10.0,
+}
+
+# ?ordering=popular (índice product_active_popularity_idx)
+POPULAR_ORDERING = ('-popularity_score', '-id')
+
+
+def event_weight(event, at=None):
+    """
+    Peso de un evento ocurrido en el instante `at` (por defecto ahora)
+
+    Args:
+        event (str): Tipo de evento (ver POPULARITY_WEIGHTS)
+        at (datetime): Momento del evento
+    """
+    at = at or timezone.now()
+    half_lives = (at - POPULARITY_EPOCH).total_seconds() / (POPULARITY_HALF_LIFE_DAYS * 86400)
+    return POPULARITY_WEIGHTS[event] * 2 ** half_lives
+
+
+def record_product_event(product_id, event, at=None):
+    """Sumar un evento al puntaje de popularidad de un producto"""
+    counter_buffer.increment(MarketplaceProduct, product_id, 'popularity_score', event_weight(event, at))
+
+
+def order_products(queryset, ordering):
+    """Aplicar ?ordering=popular (ranking con decaimiento temporal) a un queryset de productos"""
+    if ordering == 'popular':
+        return queryset.order_by(*POPULAR_ORDERING)
+    return queryset
+
+
+def record_product_view(product_id):
+    """Registrar una vista del detalle de un producto: contador de vistas y popularidad"""
+    counter_buffer.increment(MarketplaceProduct, product_id, 'view_count')
+    record_product_event(product_id, 'view')
+
+
+def record_order_purchase(order):
+    """Efecto secundario de OrderStateMachine: sumar la compra de cada producto de la orden"""
+    for product_id, quantity in order.items.values_list('product_id', 'quantity'):
+        counter_buffer.increment(
+            MarketplaceProduct, product_id, 'popularity_score', event_weight('purchase', order.created_at) * quantity
+        )
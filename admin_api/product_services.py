@@ -0,0 +1,156 @@
+"""
+Payloads de productos del marketplace en caché, uno por producto.
+
+Los payloads se serializan sin request (las URLs de media usan settings.BASE_URL),
+sin datos del usuario y sin contadores que cambian con cada visita, de modo que
+se comparten entre todos los visitantes; is_favorited y view_count se agregan al
+responder con una consulta.
+
+Cada payload se guarda bajo (id, versión). La versión de un producto vive en la
+caché y se incrementa cuando cambian el producto (incluidos sus precios) o sus
+imágenes (ver signals), así las versiones anteriores quedan huérfanas y expiran.
+La versión debe verse igual desde todos los workers, por lo que la caché solo se
+usa con un backend compartido (settings.CACHE_IS_SHARED); con LocMem los
+productos se serializan en cada request.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Value
+
+from .models import MarketplaceProduct, ProductFavorite
+from .serializers import MarketplaceProductSerializer
+
+PRODUCT_CACHE_TTL = 60 * 60
+BATCH_MAX_IDS = 50
+
+# Campos que dependen del usuario o cambian con cada visita: no se guardan en el
+# payload compartido y se leen al responder (ver add_live_fields)
+LIVE_FIELDS = ('is_favorited', 'view_count')
+
+
+def _version_cache_key(product_id):
+    return f'marketplace:product:{product_id}:version'
+
+
+def _product_cache_key(product_id, version):
+    return f'marketplace:product:{product_id}:v{version}'
+
+
+def get_product_versions(product_ids):
+    """
+    Obtener la versión actual de varios productos
+
+    Si la versión de un producto no está en la caché (nunca se creó o fue
+    desalojada) se crea una nueva a partir del reloj, que nunca coincide con
+    una versión anterior, de modo que no se reutiliza un payload obsoleto.
+
+    Returns:
+        dict: {product_id: version}
+    """
+    keys = {_version_cache_key(product_id): product_id for product_id in product_ids}
+    versions = {keys[key]: version for key, version in cache.get_many(keys).items()}
+    for product_id in product_ids:
+        if product_id not in versions:
+            key = _version_cache_key(product_id)
+            cache.add(key, time.time_ns(), None)
+            versions[product_id] = cache.get(key)
+    return versions
+
+
+def invalidate_product(product_id):
+    """Pasar a una nueva versión del producto (los payloads anteriores dejan de usarse)"""
+    try:
+        cache.incr(_version_cache_key(product_id))
+    except ValueError:
+        # Sin versión guardada: la próxima lectura crea una nueva
+        pass
+
+
+def serialize_products(product_ids):
+    """
+    Serializar productos activos en una sola consulta (con imágenes precargadas)
+
+    Returns:
+        dict: {product_id: payload}
+    """
+    products = MarketplaceProduct.objects.filter(id__in=product_ids, is_active=True).prefetch_related('additional_images')
+    payloads = {}
+    for data in MarketplaceProductSerializer(products, many=True).data:
+        for field in LIVE_FIELDS:
+            data.pop(field, None)
+        payloads[data['id']] = data
+    return payloads
+
+
+def get_product_payloads(product_ids):
+    """
+    Obtener los payloads de varios productos, desde la caché cuando existen
+    y serializando (y guardando) solo los que faltan.
+
+    Returns:
+        dict: {product_id: payload} (los productos inexistentes o inactivos no aparecen)
+    """
+    if not settings.CACHE_IS_SHARED:
+        return serialize_products(product_ids)
+
+    versions = get_product_versions(product_ids)
+    keys = {_product_cache_key(product_id, versions[product_id]): product_id for product_id in product_ids}
+    cached = cache.get_many(keys)
+    payloads = {keys[key]: payload for key, payload in cached.items()}
+
+    missing = [product_id for product_id in product_ids if product_id not in payloads]
+    if missing:
+        fresh = serialize_products(missing)
+        cache_product_payloads(fresh, versions)
+        payloads.update(fresh)
+    return payloads
+
+
+def cache_product_payloads(payloads, versions=None):
+    """
+    Guardar payloads ya serializados bajo la versión actual de cada producto
+
+    Args:
+        payloads (dict): {product_id: payload}
+        versions (dict): Versiones ya leídas (opcional)
+    """
+    versions = versions or get_product_versions(list(payloads))
+    cache.set_many({
+        _product_cache_key(product_id, versions[product_id]): payload
+        for product_id, payload in payloads.items()
+    }, PRODUCT_CACHE_TTL)
+
+
+def get_product_detail(product_id, user=None):
+    """
+    Payload del detalle de un producto (desde la caché si existe)
+
+    Returns:
+        dict | None: Payload con is_favorited del usuario, o None si no existe o está inactivo
+    """
+    payload = get_product_payloads([product_id]).get(product_id)
+    if payload is None:
+        return None
+    return add_live_fields([payload], user)[0]
+
+
+def add_live_fields(payloads, user):
+    """Copiar los payloads agregando view_count actual e is_favorited del usuario (una consulta)"""
+    if not payloads:
+        return []
+    if user is not None and user.is_authenticated:
+        is_favorited = Exists(ProductFavorite.objects.filter(user=user, product=OuterRef('pk')))
+    else:
+        is_favorited = Value(False)
+    live = {
+        row['id']: row
+        for row in MarketplaceProduct.objects.filter(id__in=[p['id'] for p in payloads])
+        .annotate(is_favorited=is_favorited).values('id', *LIVE_FIELDS)
+    }
+    return [
+        dict(payload, **{field: live.get(payload['id'], {}).get(field, 0) for field in LIVE_FIELDS})
+        for payload in payloads
+    ]
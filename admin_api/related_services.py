@@ -0,0 +1,334 @@
+"""
+Blogs relacionados precalculados por similitud TF-IDF.
+
+Cada blog se representa como un vector TF-IDF (título, resumen, contenido y
+etiquetas) en una matriz dispersa de SciPy con filas normalizadas, de modo que
+la similitud coseno es un producto de matrices. Para cada blog se guardan los
+IDs de los RELATED_POSTS_K más parecidos en Blog.related_ids (y la similitud
+del último en related_min_score) y el detalle solo hace una consulta por clave
+primaria.
+
+El cálculo se hace fuera de los requests: al guardar un blog solo se marca
+related_stale (ver Blog.save) y el comando rebuild_related_posts, programado
+(p.ej. cron cada pocos minutos), actualiza de forma incremental:
+
+- Las frecuencias de términos de cada blog se guardan en Blog.related_terms y
+  el IDF en SiteConfig, así solo se vuelven a tokenizar los blogs marcados.
+- Se recalculan las listas de los blogs marcados, las de los blogs que los
+  incluían, las de aquellos en los que entran (similitud mayor que su
+  related_min_score) y las que apuntan a blogs borrados.
+- Las similitudes se calculan por bloques de SIMILARITY_CHUNK_ROWS filas con
+  productos dispersos, nunca con la matriz densa N x N.
+
+El IDF solo cambia en una reconstrucción completa (--full, o automática si no
+hay IDF guardado o el número de blogs varió más de IDF_MAX_DRIFT); hasta
+entonces los términos nuevos se ignoran.
+"""
+
+import json
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from .blog_content import parse_tags, render_content
+from .models import Blog, SiteConfig
+from .serializers import BLOG_SUMMARY_FIELDS
+
+RELATED_POSTS_K = 4
+# Peso (repeticiones) de cada campo en el documento
+TITLE_WEIGHT = 3
+TAGS_WEIGHT = 2
+MIN_TOKEN_LENGTH = 3
+# Filas por bloque al calcular similitudes
+SIMILARITY_CHUNK_ROWS = 256
+IDF_CONFIG_KEY = 'related_posts_idf'
+# Variación relativa del número de blogs que obliga a recalcular el IDF
+IDF_MAX_DRIFT = 0.2
+
+DOCUMENT_FIELDS = ('id', 'title', 'summary', 'content', 'tags')
+
+STOPWORDS = frozenset("""
+para como pero sus los las del con una por mas que este esta estos estas ese esa eso son ser han hay
+muy sin sobre entre tambien desde hasta cuando donde todo todos cada otro otra nos les lo al
+the and for with that this from are was were have has had not but you your our their its into
+""".split())
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Palabras en minúsculas y sin acentos, sin palabras vacías ni tokens cortos"""
+    text = unicodedata.normalize('NFKD', text.lower()).encode('ascii', 'ignore').decode('ascii')
+    return [token for token in TOKEN_RE.findall(text) if len(token) >= MIN_TOKEN_LENGTH and token not in STOPWORDS]
+
+
+def blog_document(blog):
+    """Tokens de un blog (dict de values() o instancia), con el título y las etiquetas reforzados"""
+    get = blog.get if isinstance(blog, dict) else lambda field: getattr(blog, field)
+    tags = ' '.join(parse_tags(get('tags')).values())
+    content = render_content(get('content'))[1]
+    text = ' '.join([(get('title') or '') + ' '] * TITLE_WEIGHT + [tags + ' '] * TAGS_WEIGHT + [get('summary') or '', content])
+    return tokenize(text)
+
+
+def term_counts(blog):
+    """Frecuencia de cada término de un blog"""
+    return dict(Counter(blog_document(blog)))
+
+
+def build_idf(documents):
+    """IDF suavizado de cada término a partir de las frecuencias de todos los blogs"""
+    document_frequency = Counter()
+    for terms in documents:
+        document_frequency.update(terms.keys())
+    total = len(documents)
+    return {term: float(np.log((1 + total) / (1 + count)) + 1.0) for term, count in document_frequency.items()}
+
+
+def build_matrix(documents, idf):
+    """
+    Matriz dispersa TF-IDF (documentos x términos del IDF)
+
+    TF sublineal (1 + log tf) por IDF, con filas normalizadas (norma L2); los
+    términos que no están en el IDF se ignoran.
+    """
+    if not idf:
+        return sparse.csr_matrix((len(documents), 0), dtype=np.float64)
+
+    vocabulary = {term: col for col, term in enumerate(idf)}
+    rows, cols, counts = [], [], []
+    for row, terms in enumerate(documents):
+        for term, count in terms.items():
+            col = vocabulary.get(term)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+                counts.append(count)
+
+    tfidf = sparse.csr_matrix(
+        (1.0 + np.log(np.asarray(counts, dtype=np.float64)), (rows, cols)),
+        shape=(len(documents), len(vocabulary)),
+    )
+    tfidf = tfidf @ sparse.diags(np.fromiter(idf.values(), dtype=np.float64, count=len(idf)))
+    norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.csr_matrix(sparse.diags(1.0 / norms) @ tfidf)
+
+
+def build_model(blogs):
+    """
+    Construir el modelo TF-IDF completo (tokeniza todos los blogs)
+
+    Args:
+        blogs (iterable): Dicts con DOCUMENT_FIELDS
+
+    Returns:
+        dict: ids, frecuencias de términos, idf y matriz (filas en el orden de ids)
+    """
+    ids, documents = [], []
+    for blog in blogs:
+        ids.append(blog['id'])
+        documents.append(term_counts(blog))
+    idf = build_idf(documents)
+    return {'ids': ids, 'terms': documents, 'idf': idf, 'matrix': build_matrix(documents, idf)}
+
+
+def similarity_rows(matrix, rows):
+    """
+    Similitudes no nulas de las filas indicadas con todas las demás
+
+    Se calculan por bloques de SIMILARITY_CHUNK_ROWS filas con productos
+    dispersos: la memoria depende del bloque, no del cuadrado de los blogs.
+
+    Yields:
+        tuple: (fila, columnas, similitudes), sin la propia fila
+    """
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(rows), SIMILARITY_CHUNK_ROWS):
+        chunk = rows[start:start + SIMILARITY_CHUNK_ROWS]
+        block = sparse.csr_matrix(matrix[chunk] @ transposed)
+        for position, row in enumerate(chunk):
+            begin, end = block.indptr[position], block.indptr[position + 1]
+            cols, scores = block.indices[begin:end], block.data[begin:end]
+            keep = (cols != row) & (scores > 0)
+            yield row, cols[keep], scores[keep]
+
+
+def top_k(ids, cols, scores, k=RELATED_POSTS_K):
+    """Los k más parecidos (empates por posición) como [(blog_id, similitud), ...]"""
+    order = np.lexsort((cols, -scores))[:k]
+    return [(ids[cols[i]], float(scores[i])) for i in order]
+
+
+def top_related(model, rows, k=RELATED_POSTS_K):
+    """
+    Blogs más parecidos a las filas indicadas
+
+    Returns:
+        dict: {blog_id: [(blog_id relacionado, similitud), ...]}
+    """
+    ids = model['ids']
+    return {ids[row]: top_k(ids, cols, scores, k) for row, cols, scores in similarity_rows(model['matrix'], rows)}
+
+
+def save_related(related):
+    """Guardar las listas calculadas (bulk_update, sin pasar por Blog.save)"""
+    blogs = [
+        Blog(id=blog_id, related_ids=[related_id for related_id, _ in items],
+             related_min_score=items[-1][1] if len(items) >= RELATED_POSTS_K else 0.0)
+        for blog_id, items in related.items()
+    ]
+    Blog.objects.bulk_update(blogs, ['related_ids', 'related_min_score'], batch_size=500)
+    return len(blogs)
+
+
+def save_terms(terms_by_id):
+    """Guardar las frecuencias de términos de los blogs vectorizados"""
+    Blog.objects.bulk_update(
+        [Blog(id=blog_id, related_terms=terms) for blog_id, terms in terms_by_id.items()],
+        ['related_terms'], batch_size=500
+    )
+
+
+def load_idf():
+    """
+    IDF guardado y número de blogs con el que se calculó
+
+    Returns:
+        tuple: (idf, documentos) o None si no existe o es inválido
+    """
+    value = SiteConfig.objects.filter(key=IDF_CONFIG_KEY).values_list('value', flat=True).first()
+    if not value:
+        return None
+    try:
+        stored = json.loads(value)
+        return stored['idf'], int(stored['documents'])
+    except (ValueError, KeyError, TypeError):
+        print(f"❌ IDF de blogs relacionados inválido en SiteConfig ({IDF_CONFIG_KEY})")
+        return None
+
+
+def save_idf(idf, documents):
+    """Guardar el IDF del modelo en SiteConfig"""
+    SiteConfig.objects.update_or_create(
+        key=IDF_CONFIG_KEY,
+        defaults={
+            'value': json.dumps({'documents': documents, 'idf': idf}),
+            'category': 'system',
+            'description': 'IDF del modelo de blogs relacionados (rebuild_related_posts)'
+        }
+    )
+
+
+def _take_stale_ids():
+    """
+    IDs marcados como desactualizados, con la marca ya limpia
+
+    Se limpian antes de leer los documentos: un blog guardado mientras tanto
+    vuelve a quedar marcado para la siguiente ejecución.
+    """
+    stale_ids = list(Blog.objects.filter(related_stale=True).values_list('id', flat=True))
+    Blog.objects.filter(id__in=stale_ids).update(related_stale=False)
+    return stale_ids
+
+
+def rebuild_related_posts():
+    """
+    Reconstruir el modelo (IDF incluido) y las listas de todos los blogs
+
+    Returns:
+        int: Número de blogs actualizados
+    """
+    stale_ids = _take_stale_ids()
+    try:
+        model = build_model(Blog.objects.order_by('id').values(*DOCUMENT_FIELDS).iterator())
+        save_idf(model['idf'], len(model['ids']))
+        if not model['ids']:
+            return 0
+        save_terms(dict(zip(model['ids'], model['terms'])))
+        return save_related(top_related(model, list(range(len(model['ids'])))))
+    except Exception:
+        Blog.objects.filter(id__in=stale_ids).update(related_stale=True)
+        raise
+
+
+def update_related_posts():
+    """
+    Actualizar los relacionados de forma incremental con el IDF guardado
+
+    Solo se tokenizan los blogs marcados; se recalculan sus listas y las de los
+    blogs afectados por ellos (ver el docstring del módulo). Sin IDF guardado, o
+    si el número de blogs cambió más de IDF_MAX_DRIFT, se reconstruye todo.
+
+    Returns:
+        int: Número de blogs cuyas listas se recalcularon
+    """
+    stored = load_idf()
+    total = Blog.objects.count()
+    if stored is None or abs(total - stored[1]) > IDF_MAX_DRIFT * max(stored[1], 1):
+        return rebuild_related_posts()
+    idf = stored[0]
+
+    stale_ids = _take_stale_ids()
+    try:
+        stale_terms = {
+            blog['id']: term_counts(blog)
+            for blog in Blog.objects.filter(id__in=stale_ids).values(*DOCUMENT_FIELDS).iterator()
+        }
+        save_terms(stale_terms)
+
+        ids, documents, related_ids, min_scores = [], [], [], []
+        rows = Blog.objects.order_by('id').values_list('id', 'related_terms', 'related_ids', 'related_min_score')
+        for blog_id, terms, related, min_score in rows.iterator():
+            ids.append(blog_id)
+            documents.append(stale_terms.get(blog_id, terms or {}))
+            related_ids.append(related or [])
+            min_scores.append(min_score)
+        model = {'ids': ids, 'terms': documents, 'idf': idf, 'matrix': build_matrix(documents, idf)}
+
+        position = {blog_id: row for row, blog_id in enumerate(ids)}
+        stale_rows = sorted(position[blog_id] for blog_id in stale_terms)
+        list_lengths = np.array([len(items) for items in related_ids], dtype=np.int64)
+        min_scores = np.array(min_scores, dtype=np.float64)
+
+        related, affected = {}, set()
+        for row, cols, scores in similarity_rows(model['matrix'], stale_rows):
+            related[ids[row]] = top_k(ids, cols, scores)
+            # Blogs en cuya lista entra el blog marcado (lista incompleta o mayor similitud que la última)
+            enters = (list_lengths[cols] < RELATED_POSTS_K) | (scores > min_scores[cols])
+            affected.update(cols[enters].tolist())
+        for row, items in enumerate(related_ids):
+            # Listas con un blog marcado (su similitud pudo bajar) o con un blog borrado
+            if any(blog_id in stale_terms or blog_id not in position for blog_id in items):
+                affected.add(row)
+
+        affected.difference_update(stale_rows)
+        related.update(top_related(model, sorted(affected)))
+        return save_related(related)
+    except Exception:
+        Blog.objects.filter(id__in=stale_ids).update(related_stale=True)
+        raise
+
+
+def related_posts_need_rebuild():
+    """Hay blogs marcados como desactualizados o listas que incluyen blogs borrados"""
+    if Blog.objects.filter(related_stale=True).exists():
+        return True
+    existing_ids = set(Blog.objects.values_list('id', flat=True))
+    return any(
+        related_id not in existing_ids
+        for related_ids in Blog.objects.values_list('related_ids', flat=True)
+        for related_id in related_ids or []
+    )
+
+
+def get_related_posts(blog):
+    """Blogs relacionados de un blog, en el orden precalculado (una consulta por clave primaria)"""
+    related_ids = blog.related_ids or []
+    if not related_ids:
+        return []
+    blogs = Blog.objects.only(*BLOG_SUMMARY_FIELDS).in_bulk(related_ids)
+    return [blogs[pk] for pk in related_ids if pk in blogs]
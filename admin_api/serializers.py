@@ -48,9 +48,9 @@ class ProjectSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'description', 'color', 'category', 'type', 'year',
             'utilization', 'services', 'size', 'location', 'latitude', 'longitude', 'show_on_map', 
-            'status', 'featured', 'image', 'created_at', 'updated_at', 'images'
+            'status', 'featured', 'like_count', 'favorite_count', 'image', 'created_at', 'updated_at', 'images'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'images']
+        read_only_fields = ['id', 'like_count', 'favorite_count', 'created_at', 'updated_at', 'images']
 
 class BlogImageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -58,22 +58,61 @@ class BlogImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image', 'blog']
 
 class BlogSerializer(serializers.ModelSerializer):
+    """
+    Blog completo. Las imágenes adicionales se serializan una sola vez (extra_images,
+    prefetch en la vista); images es un alias de la misma lista para el frontend.
+    """
     extra_images = BlogImageSerializer(many=True, read_only=True)
-    images = serializers.SerializerMethodField()
-    
-    def get_images(self, obj):
-        """Alias para extra_images para compatibilidad con el frontend"""
-        return BlogImageSerializer(obj.extra_images.all(), many=True).data
-    
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Alias para extra_images para compatibilidad con el frontend (sin otra consulta)
+        data['images'] = data['extra_images']
+        return data
+
     class Meta:
         model = Blog
         fields = [
             'id', 'title', 'content', 'image', 'date', 'author', 
             'category', 'read_time', 'summary', 'tags',
-            'excerpt', 'slug', 'featured', 'like_count', 'favorite_count',
-            'extra_images', 'images'
+            'excerpt', 'slug', 'featured', 'like_count', 'favorite_count', 'view_count',
+            'content_html', 'content_images', 'word_count',
+            'extra_images'
+        ]
+        read_only_fields = [
+            'id', 'like_count', 'favorite_count', 'view_count',
+            'content_html', 'content_images', 'word_count', 'extra_images'
         ]
-        read_only_fields = ['id', 'like_count', 'favorite_count', 'extra_images', 'images']
+
+def build_blog_image_url(request, image):
+    """URL absoluta de la imagen principal de un blog (guardada como texto)"""
+    if not image:
+        return None
+    if image.startswith('http'):
+        return image
+    if not image.startswith('/media/'):
+        image = f"/media/{image}"
+    return build_media_url(request, image)
+
+# Campos del listado de blogs (nunca incluye content)
+BLOG_SUMMARY_FIELDS = [
+    'id', 'title', 'slug', 'summary', 'excerpt', 'image', 'date', 'author',
+    'category', 'read_time', 'tags', 'featured', 'like_count', 'favorite_count'
+]
+
+class BlogSummarySerializer(serializers.ModelSerializer):
+    """
+    Resumen de un blog para el índice (sin el cuerpo)
+    """
+    image = serializers.SerializerMethodField()
+
+    def get_image(self, obj):
+        return build_blog_image_url(self.context.get('request'), obj.image)
+
+    class Meta:
+        model = Blog
+        fields = BLOG_SUMMARY_FIELDS
+        read_only_fields = BLOG_SUMMARY_FIELDS
 
 class BlogLikeFavoriteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -87,6 +126,15 @@ class ProjectLikeFavoriteSerializer(serializers.ModelSerializer):
         fields = ['id', 'project', 'visitor_id', 'liked', 'favorited', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
+def build_media_url(request, url):
+    """Construir la URL absoluta de un archivo de media"""
+    if request:
+        return request.build_absolute_uri(url)
+    # Usar la URL del servidor configurado
+    from django.conf import settings
+    base_url = getattr(settings, 'BASE_URL', 'http://localhost:8000')
+    return f"{base_url}{url}"
+
 class MarketplaceProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = MarketplaceProductImage
@@ -96,30 +144,22 @@ class MarketplaceProductSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
     additional_images = MarketplaceProductImageSerializer(many=True, read_only=True)
     images = serializers.SerializerMethodField()
+    is_favorited = serializers.SerializerMethodField()
     
     def get_image(self, obj):
         """Obtener la URL completa de la imagen principal"""
         if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            else:
-                # Usar la URL del servidor configurado
-                from django.conf import settings
-                base_url = getattr(settings, 'BASE_URL', 'http://localhost:8000')
-                return f"{base_url}{obj.image.url}"
+            return build_media_url(self.context.get('request'), obj.image.url)
         return None
     
     def get_images(self, obj):
         """Obtener las URLs de las imágenes adicionales"""
-        from django.conf import settings
         request = self.context.get('request')
-        if request:
-            return [request.build_absolute_uri(img.image.url) for img in obj.additional_images.all()]
-        else:
-            # Usar la URL del servidor configurado
-            base_url = getattr(settings, 'BASE_URL', 'http://localhost:8000')
-            return [f"{base_url}{img.image.url}" for img in obj.additional_images.all()]
+        return [build_media_url(request, img.image.url) for img in obj.additional_images.all()]
+    
+    def get_is_favorited(self, obj):
+        """Favorito del usuario (anotado con Exists() en MarketplaceProductViewSet)"""
+        return getattr(obj, 'is_favorited', False)
     
     class Meta:
         model = MarketplaceProduct
@@ -128,19 +168,57 @@ class MarketplaceProductSerializer(serializers.ModelSerializer):
             'area_m2', 'rooms', 'bathrooms', 'floors', 'image', 'zip_file', 'features',
             'is_featured', 'is_active', 'included_items', 'not_included_items',
             'price_editable_m2', 'price_editable_sqft', 'price_pdf_m2', 'price_pdf_sqft',
-            'area_sqft', 'area_unit', 'garage_spaces', 'main_level_images',
-            'additional_images', 'images', 'created_at', 'updated_at'
+            'area_sqft', 'area_unit', 'garage_spaces', 'main_level_images', 'view_count',
+            'additional_images', 'images', 'is_favorited', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'additional_images']
+        read_only_fields = ['id', 'view_count', 'created_at', 'updated_at', 'additional_images', 'is_favorited']
+
+# Campos de la tarjeta de producto (también usados con .only() en los querysets)
+PRODUCT_CARD_FIELDS = [
+    'id', 'name', 'category', 'style', 'price', 'area_m2', 'area_sqft', 'area_unit',
+    'rooms', 'bathrooms', 'floors', 'garage_spaces', 'image', 'is_active'
+]
+
+class MarketplaceProductCardSerializer(serializers.ModelSerializer):
+    """
+    Representación reducida del producto (tarjeta) para carrito y órdenes
+    """
+    image = serializers.SerializerMethodField()
+
+    def get_image(self, obj):
+        """Obtener la URL completa de la imagen principal"""
+        if obj.image:
+            return build_media_url(self.context.get('request'), obj.image.url)
+        return None
+
+    class Meta:
+        model = MarketplaceProduct
+        fields = PRODUCT_CARD_FIELDS
+        read_only_fields = PRODUCT_CARD_FIELDS
+
+class MarketplaceOrderProductSerializer(MarketplaceProductCardSerializer):
+    """
+    Producto de una orden: tarjeta más las imágenes adicionales (precargadas)
+    """
+    images = serializers.SerializerMethodField()
+
+    def get_images(self, obj):
+        """Obtener las URLs de las imágenes adicionales"""
+        request = self.context.get('request')
+        return [build_media_url(request, img.image.url) for img in obj.additional_images.all()]
+
+    class Meta(MarketplaceProductCardSerializer.Meta):
+        fields = PRODUCT_CARD_FIELDS + ['images']
+        read_only_fields = PRODUCT_CARD_FIELDS + ['images']
 
 class CartItemSerializer(serializers.ModelSerializer):
-    product = MarketplaceProductSerializer(read_only=True)
+    product = MarketplaceProductCardSerializer(read_only=True)
     product_id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'product_id', 'quantity', 'price', 'subtotal']
-        read_only_fields = ['id', 'price', 'subtotal']
+        fields = ['id', 'product', 'product_id', 'quantity', 'price', 'plan_type', 'area_unit', 'subtotal']
+        read_only_fields = ['id', 'price', 'plan_type', 'area_unit', 'subtotal']
 
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
@@ -152,22 +230,15 @@ class CartSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'total', 'created_at', 'updated_at']
 
 class MarketplaceOrderItemSerializer(serializers.ModelSerializer):
-    product = MarketplaceProductSerializer(read_only=True)
+    product = MarketplaceOrderProductSerializer(read_only=True)
     plan_info = serializers.SerializerMethodField()
     area_info = serializers.SerializerMethodField()
 
     def get_plan_info(self, obj):
-        """Obtener información del plan seleccionado"""
-        # Por ahora, inferir el plan basado en el precio
-        base_price = float(obj.product.price)
-        item_price = float(obj.price)
-        
-        if abs(item_price - base_price) < 0.01:
-            return "PDF"
-        elif abs(item_price - (base_price * 1.5)) < 0.01:
-            return "Archivo Editable"
-        else:
-            return f"Personalizado (${item_price})"
+        """Obtener información del plan comprado (guardado en el item al agregarlo al carrito)"""
+        if obj.plan_type:
+            return obj.get_plan_type_display()
+        return f"Personalizado (${obj.price})"
     
     def get_area_info(self, obj):
         """Obtener información del área"""
@@ -176,13 +247,16 @@ class MarketplaceOrderItemSerializer(serializers.ModelSerializer):
         return {
             'm2': area_m2,
             'sqft': area_sqft,
-            'unit': obj.product.area_unit or 'm2'
+            'unit': obj.area_unit or obj.product.area_unit or 'm2'
         }
 
     class Meta:
         model = MarketplaceOrderItem
-        fields = ['id', 'product', 'quantity', 'price', 'subtotal', 'zip_sent', 'zip_sent_at', 'plan_info', 'area_info']
-        read_only_fields = ['id', 'subtotal', 'zip_sent', 'zip_sent_at', 'plan_info', 'area_info']
+        fields = [
+            'id', 'product', 'quantity', 'price', 'plan_type', 'area_unit', 'subtotal',
+            'zip_sent', 'zip_sent_at', 'plan_info', 'area_info'
+        ]
+        read_only_fields = ['id', 'plan_type', 'area_unit', 'subtotal', 'zip_sent', 'zip_sent_at', 'plan_info', 'area_info']
 
 class MarketplaceOrderSerializer(serializers.ModelSerializer):
     items = MarketplaceOrderItemSerializer(many=True, read_only=True)
@@ -201,10 +275,10 @@ class MarketplaceOrderSerializer(serializers.ModelSerializer):
         model = MarketplaceOrder
         fields = [
             'id', 'user', 'user_email', 'customer_email', 'stripe_payment_intent_id', 'total_amount', 'status',
-            'shipping_address', 'billing_address', 'zip_files_sent', 'items',
+            'payment_status', 'shipping_address', 'billing_address', 'zip_files_sent', 'items',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'user', 'stripe_payment_intent_id', 'zip_files_sent', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'stripe_payment_intent_id', 'payment_status', 'zip_files_sent', 'created_at', 'updated_at']
 
 class ProductFavoriteSerializer(serializers.ModelSerializer):
     product = MarketplaceProductSerializer(read_only=True)
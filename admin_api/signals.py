@@ -0,0 +1,98 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from design.models import DesignEntry
+from .cart_services import invalidate_cart_snapshots, invalidate_product_carts, product_cart_user_ids
+from .dashboard_services import invalidate_dashboard_summary
+from .models import (
+    Blog, ContactMessage, MarketplaceOrder, MarketplaceProduct, MarketplaceProductImage, ProductFavorite, Project
+)
+from .map_services import GEOJSON_FIELDS, refresh_projects_geojson
+from .product_services import invalidate_product
+from .tag_services import invalidate_tag_counts
+
+_coalescing = threading.local()
+
+
+@contextmanager
+def coalesce_on_commit():
+    """
+    Agrupar los callbacks on_commit de las señales mientras dura el bloque
+
+    Un borrado masivo dispara una señal por fila; dentro de este bloque cada
+    callback (función y argumentos) se registra una sola vez al salir.
+    """
+    pending = _coalescing.pending = {}
+    try:
+        yield
+    finally:
+        _coalescing.pending = None
+    for func, args in pending:
+        transaction.on_commit(lambda func=func, args=args: func(*args))
+
+
+def schedule_on_commit(func, *args):
+    """Ejecutar func(*args) tras el commit (una sola vez si hay un coalesce_on_commit activo)"""
+    pending = getattr(_coalescing, 'pending', None)
+    if pending is not None:
+        pending[(func, args)] = None
+    else:
+        transaction.on_commit(lambda: func(*args))
+
+
+# Modelos que alimentan los contadores del panel de administración.
+# Las escrituras con QuerySet.update() no disparan señales: esos puntos
+# (máquina de estados de órdenes, marcar mensajes como leídos) invalidan explícitamente.
+DASHBOARD_MODELS = [Blog, ContactMessage, DesignEntry, MarketplaceOrder, MarketplaceProduct, ProductFavorite, Project]
+
+for model in DASHBOARD_MODELS:
+    post_save.connect(invalidate_dashboard_summary, sender=model, dispatch_uid=f'dashboard_summary_save_{model.__name__}')
+    post_delete.connect(invalidate_dashboard_summary, sender=model, dispatch_uid=f'dashboard_summary_delete_{model.__name__}')
+
+
+def invalidate_product_payload(sender, instance, **kwargs):
+    """Nueva versión del payload en caché del producto (tras el commit, para no cachear datos viejos)"""
+    product_id = instance.product_id if sender is MarketplaceProductImage else instance.pk
+    schedule_on_commit(invalidate_product, product_id)
+
+
+for model in (MarketplaceProduct, MarketplaceProductImage):
+    post_save.connect(invalidate_product_payload, sender=model, dispatch_uid=f'product_payload_save_{model.__name__}')
+    post_delete.connect(invalidate_product_payload, sender=model, dispatch_uid=f'product_payload_delete_{model.__name__}')
+
+
+def invalidate_product_cart_snapshots(sender, instance, **kwargs):
+    """Invalidar los carritos en caché que muestran el producto (tras el commit)"""
+    product_id = instance.product_id if sender is MarketplaceProductImage else instance.pk
+    schedule_on_commit(invalidate_product_carts, product_id)
+
+
+def invalidate_deleted_product_carts(sender, instance, **kwargs):
+    """Al borrar un producto sus líneas se borran en cascada: leer los usuarios antes"""
+    if settings.CACHE_IS_SHARED:
+        schedule_on_commit(invalidate_cart_snapshots, tuple(product_cart_user_ids(instance.pk)))
+
+
+for model in (MarketplaceProduct, MarketplaceProductImage):
+    post_save.connect(invalidate_product_cart_snapshots, sender=model, dispatch_uid=f'product_carts_save_{model.__name__}')
+post_delete.connect(invalidate_product_cart_snapshots, sender=MarketplaceProductImage, dispatch_uid='product_carts_delete_MarketplaceProductImage')
+pre_delete.connect(invalidate_deleted_product_carts, sender=MarketplaceProduct, dispatch_uid='product_carts_delete_MarketplaceProduct')
+
+
+post_save.connect(invalidate_tag_counts, sender=Blog, dispatch_uid='tag_counts_save_Blog')
+post_delete.connect(invalidate_tag_counts, sender=Blog, dispatch_uid='tag_counts_delete_Blog')
+
+
+def refresh_map_geojson(sender, instance, update_fields=None, **kwargs):
+    """Regenerar el GeoJSON del mapa si cambió algún campo que aparece en él (tras el commit)"""
+    if update_fields is not None and not GEOJSON_FIELDS.intersection(update_fields):
+        return
+    schedule_on_commit(refresh_projects_geojson)
+
+
+post_save.connect(refresh_map_geojson, sender=Project, dispatch_uid='map_geojson_save_Project')
+post_delete.connect(refresh_map_geojson, sender=Project, dispatch_uid='map_geojson_delete_Project')
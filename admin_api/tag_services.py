@@ -0,0 +1,45 @@
+"""
+Conteo de blogs por etiqueta (nube de etiquetas).
+
+Se calcula con un solo GROUP BY sobre BlogTag y se guarda en caché hasta que
+cambie algún blog (ver signals). La invalidación solo llega al worker que
+guardó el blog si la caché es local (LocMem): sin un backend compartido
+(settings.CACHE_IS_SHARED) el conteo expira a los TAG_COUNTS_LOCAL_CACHE_TTL
+segundos.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Tag
+
+TAG_COUNTS_CACHE_KEY = 'blog:tag_counts'
+TAG_COUNTS_CACHE_TTL = 60 * 60
+TAG_COUNTS_LOCAL_CACHE_TTL = 60
+
+
+def get_tag_counts():
+    """
+    Etiquetas con su número de blogs, de la más usada a la menos usada
+
+    Returns:
+        list: [{'name', 'slug', 'count'}]
+    """
+    counts = cache.get(TAG_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = list(
+            Tag.objects.annotate(count=Count('blog_tags'))
+            .filter(count__gt=0)
+            .order_by('-count', 'name')
+            .values('name', 'slug', 'count')
+        )
+        ttl = TAG_COUNTS_CACHE_TTL if settings.CACHE_IS_SHARED else TAG_COUNTS_LOCAL_CACHE_TTL
+        cache.set(TAG_COUNTS_CACHE_KEY, counts, ttl)
+    return counts
+
+
+def invalidate_tag_counts(*args, **kwargs):
+    """Invalidar el conteo en caché tras el commit (se usa también como receptor de señales)"""
+    transaction.on_commit(lambda: cache.delete(TAG_COUNTS_CACHE_KEY))
@@ -1,3 +1,1201 @@
-from django.test import TestCase
+import gzip
+import importlib
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import stripe
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import related_services
+from .analytics_services import WATERMARK_KEY, rebuild_sales_day, refresh_order_sales, refresh_sales_rollups
+from .blog_content import parse_tags, render_content
+from .cart_services import get_or_create_active_cart, upsert_cart_item
+from .counter_buffer import CounterBuffer, counter_buffer
+from .map_services import cluster_projects, haversine_km, map_projects, nearest_projects, radius_bbox, refresh_projects_geojson
+from .models import (
+    Blog, CartItem, DailyProductSales, DailySales, MarketplaceOrder, MarketplaceOrderItem, MarketplaceProduct,
+    MarketplaceProductImage, PendingFileDeletion, ProductFavorite, Project, ProjectImage, SiteConfig
+)
+from .order_services import IllegalTransition, OrderStateMachine
+from . import payment_services
+from .payment_services import get_payment_state, record_payment_state
+from .popularity_services import POPULARITY_EPOCH, POPULARITY_HALF_LIFE_DAYS, event_weight
+from .related_services import build_model, rebuild_related_posts, tokenize, top_related, update_related_posts
+from .tag_services import TAG_COUNTS_CACHE_KEY, TAG_COUNTS_CACHE_TTL, TAG_COUNTS_LOCAL_CACHE_TTL, get_tag_counts
+
+
+def create_product(name='Plano', **fields):
+    data = {
+        'description': 'Descripción', 'category': 'residential', 'style': 'modern', 'price': Decimal('100.00'),
+        'area_m2': 120, 'rooms': 3, 'bathrooms': 2, 'floors': 1,
+    }
+    data.update(fields)
+    return MarketplaceProduct.objects.create(name=name, **data)
+
+
+def create_map_project(title, latitude, longitude, **fields):
+    data = {'year': '2024', 'show_on_map': True, 'latitude': Decimal(str(latitude)), 'longitude': Decimal(str(longitude))}
+    data.update(fields)
+    return Project.objects.create(title=title, **data)
+
+
+class MarketplaceOrderHistoryTests(TestCase):
+    """Historial de órdenes: paginado y con número fijo de consultas"""
+
+    # count, órdenes (+usuario), items (+producto), imágenes adicionales
+    EXPECTED_QUERIES = 4
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', email='cliente@example.com', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_orders(self, orders, items_per_order):
+        for order_index in range(orders):
+            order = MarketplaceOrder.objects.create(
+                user=self.user,
+                stripe_payment_intent_id=f'pi_test_{self.user.id}_{MarketplaceOrder.objects.count()}',
+                total_amount=Decimal('0'),
+            )
+            for item_index in range(items_per_order):
+                product = MarketplaceProduct.objects.create(
+                    name=f'Plano {order_index}-{item_index}',
+                    description='Descripción',
+                    category='residential',
+                    style='modern',
+                    price=Decimal('100.00'),
+                    area_m2=120,
+                    rooms=3,
+                    bathrooms=2,
+                    floors=1,
+                )
+                MarketplaceProductImage.objects.create(product=product, image='marketplace/images/extra1.jpg')
+                MarketplaceProductImage.objects.create(product=product, image='marketplace/images/extra2.jpg')
+                MarketplaceOrderItem.objects.create(
+                    order=order, product=product, quantity=1, price=Decimal('150.00'), plan_type='editable', area_unit='m2'
+                )
+
+    def get_history(self):
+        response = self.client.get('/api/admin/marketplace-orders/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_does_not_grow_with_orders(self):
+        self.create_orders(orders=1, items_per_order=1)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            self.get_history()
+
+        self.create_orders(orders=10, items_per_order=5)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            data = self.get_history()
+
+        self.assertEqual(data['count'], 11)
+        self.assertEqual(len(data['results']), 11)
+
+    def test_items_use_slim_product(self):
+        self.create_orders(orders=1, items_per_order=1)
+        item = self.get_history()['results'][0]['items'][0]
+
+        self.assertEqual(len(item['product']['images']), 2)
+        self.assertNotIn('description', item['product'])
+        self.assertNotIn('zip_file', item['product'])
+        self.assertEqual(item['plan_info'], 'Archivo Editable')
+        self.assertEqual(item['area_info']['m2'], 120)
+
+    def test_history_is_paginated(self):
+        self.create_orders(orders=3, items_per_order=1)
+        response = self.client.get('/api/admin/marketplace-orders/', {'page_size': 2})
+        data = response.json()
+
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next'])
+
+
+class OrderStateMachineTests(TestCase):
+    """Transiciones de estado de las órdenes: solo desde estados de origen válidos"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', email='cliente@example.com', password='secret')
+        self.order = MarketplaceOrder.objects.create(
+            user=self.user, stripe_payment_intent_id='pi_state_machine', total_amount=Decimal('100.00')
+        )
+
+    def test_legal_transition_updates_status(self):
+        order = OrderStateMachine.advance(self.order.id, 'payment_failed')
+
+        self.assertEqual(order.status, 'failed')
+
+    def test_illegal_transition_is_rejected(self):
+        OrderStateMachine.advance(self.order.id, 'payment_failed')
+
+        with self.assertRaises(IllegalTransition) as raised:
+            OrderStateMachine.advance(self.order.id, 'cancel')
+
+        self.assertEqual(raised.exception.current_status, 'failed')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'failed')
+
+    def test_unknown_event_is_rejected(self):
+        with self.assertRaises(IllegalTransition):
+            OrderStateMachine.advance(self.order.id, 'refund')
+
+    def test_side_effects_run_once_for_the_winning_transition(self):
+        with mock.patch('admin_api.analytics_services.refresh_order_sales') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                OrderStateMachine.advance(self.order.id, 'cancel')
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(IllegalTransition):
+                OrderStateMachine.advance(self.order.id, 'cancel')
+
+        self.assertEqual(refresh.call_count, 1)
+
+    def test_advance_many_skips_orders_in_invalid_states(self):
+        completed = MarketplaceOrder.objects.create(
+            user=self.user, stripe_payment_intent_id='pi_state_machine_2', total_amount=Decimal('100.00'), status='completed'
+        )
+
+        advanced = OrderStateMachine.advance_many([self.order.id, completed.id], 'payment_failed')
+
+        self.assertEqual(advanced, [self.order.id])
+        completed.refresh_from_db()
+        self.assertEqual(completed.status, 'completed')
+
+
+class CartUpsertTests(TestCase):
+    """Agregar al carrito: una línea por producto, con INSERT ... ON CONFLICT"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='juan', email='juan@example.com', password='secret')
+        self.product = create_product()
+        self.client = APIClient()
+
+    def tearDown(self):
+        # Escribir los eventos de popularidad mientras existen las tablas de prueba
+        counter_buffer.flush()
+
+    def add_to_cart(self, **data):
+        response = self.client.post(f'/api/admin/marketplace/{self.product.id}/add_to_cart/', data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_upsert_replaces_quantity_and_variant(self):
+        cart, _ = get_or_create_active_cart(self.user.id)
+        upsert_cart_item(cart.id, self.product.id, 2, Decimal('100.00'), 'pdf', 'm2')
+        upsert_cart_item(cart.id, self.product.id, 5, Decimal('150.00'), 'editable', 'sqft')
+
+        item = CartItem.objects.get(cart=cart)
+        self.assertEqual(item.quantity, 5)
+        self.assertEqual(item.price, Decimal('150.00'))
+        self.assertEqual((item.plan_type, item.area_unit), ('editable', 'sqft'))
+
+    def test_add_to_cart_twice_keeps_one_line(self):
+        self.add_to_cart(quantity=1)
+        data = self.add_to_cart(quantity=3, plan_type='pdf-editable')
+
+        self.assertEqual(CartItem.objects.filter(product=self.product).count(), 1)
+        self.assertEqual(len(data['items']), 1)
+        self.assertEqual(data['items'][0]['quantity'], 3)
+        self.assertEqual(data['items'][0]['plan_type'], 'editable')
+
+    def test_one_active_cart_per_user(self):
+        first, created = get_or_create_active_cart(self.user.id)
+        second, created_again = get_or_create_active_cart(self.user.id)
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(first.id, second.id)
+
+
+class CounterBufferTests(TestCase):
+    """Buffer de contadores: deltas acumulados y escritos con un UPDATE por campo"""
+
+    def setUp(self):
+        # Sin hilo de vaciado periódico; se vacía a mano o por número de eventos
+        self.buffer = CounterBuffer(flush_interval=0, flush_events=100)
+        self.blogs = [Blog.objects.create(title=f'Blog {index}') for index in range(3)]
+
+    def test_increments_are_written_on_flush(self):
+        for blog in self.blogs:
+            self.buffer.increment(Blog, blog.pk, 'view_count', 2)
+        self.buffer.increment(Blog, self.blogs[0].pk, 'view_count', 1)
+
+        self.assertEqual(self.buffer.pending(Blog, self.blogs[0].pk, 'view_count'), 3)
+        self.assertEqual(Blog.objects.get(pk=self.blogs[0].pk).view_count, 0)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.buffer.flush(), 1)
+
+        counts = dict(Blog.objects.values_list('id', 'view_count'))
+        self.assertEqual(counts, {self.blogs[0].pk: 3, self.blogs[1].pk: 2, self.blogs[2].pk: 2})
+        self.assertEqual(self.buffer.pending(Blog, self.blogs[0].pk, 'view_count'), 0)
+
+    def test_flush_adds_deltas_to_concurrent_writes(self):
+        blog = self.blogs[0]
+        self.buffer.increment(Blog, blog.pk, 'like_count')
+        # Otro worker escribió su propio delta mientras tanto
+        Blog.objects.filter(pk=blog.pk).update(like_count=5)
+
+        self.buffer.flush()
+
+        self.assertEqual(Blog.objects.get(pk=blog.pk).like_count, 6)
+
+    def test_one_statement_per_field(self):
+        blog = self.blogs[0]
+        self.buffer.increment(Blog, blog.pk, 'like_count')
+        self.buffer.increment(Blog, blog.pk, 'like_count', -1)
+        self.buffer.increment(Blog, blog.pk, 'view_count')
+        self.buffer.increment(Blog, blog.pk, 'favorite_count')
+
+        # like_count suma cero y no se escribe
+        self.assertEqual(self.buffer.flush(), 2)
+
+    def test_flushes_after_flush_events(self):
+        buffer = CounterBuffer(flush_interval=0, flush_events=2)
+        blog = self.blogs[0]
+        buffer.increment(Blog, blog.pk, 'view_count')
+        self.assertEqual(Blog.objects.get(pk=blog.pk).view_count, 0)
+
+        buffer.increment(Blog, blog.pk, 'view_count')
+
+        self.assertEqual(Blog.objects.get(pk=blog.pk).view_count, 2)
+
+
+class BlogContentSanitizerTests(TestCase):
+    """Contenido de los blogs: el HTML guardado en content_html se sanea al guardar"""
+
+    def test_script_tags_are_dropped_with_their_content(self):
+        html = render_content('<p>Hola<script>alert(1)</script><style>p{}</style></p>')[0]
+
+        self.assertEqual(html, '<p>Hola</p>')
+
+    def test_event_handler_attributes_are_stripped(self):
+        html = render_content('<p onclick="x()">Texto <b onmouseover="x()">negrita</b> <img src="https://example.com/a.jpg" onerror="alert(1)"></p>')[0]
+
+        self.assertNotIn('onclick', html)
+        self.assertNotIn('onmouseover', html)
+        self.assertNotIn('onerror', html)
+        self.assertIn('<img src="https://example.com/a.jpg" loading="lazy">', html)
+
+    def test_javascript_urls_are_removed(self):
+        for payload in ('javascript:alert(1)', 'JaVaScRiPt:alert(1)', ' javascript:alert(1)', 'data:text/html;base64,PHNjcmlwdD4='):
+            html = render_content(f'<p><a href="{payload}">enlace</a><img src="{payload}"></p>')[0]
+
+            self.assertNotIn('href', html)
+            self.assertNotIn('<img', html)
+
+    def test_disallowed_tags_are_dropped(self):
+        html = render_content('<p><iframe src="https://example.com"></iframe><svg onload="alert(1)">t</svg><object data="x"></object></p>')[0]
+
+        self.assertEqual(html, '<p>t</p>')
+
+    def test_plain_text_is_escaped(self):
+        html = render_content('1 < 2 & "comillas"\n\n&lt;script&gt;')[0]
+
+        # Las entidades escritas como texto se muestran tal cual, no se interpretan
+        self.assertEqual(html, '<p>1 &lt; 2 &amp; "comillas"</p>\n<p>&amp;lt;script&amp;gt;</p>')
+
+    def test_blog_save_stores_sanitized_html(self):
+        blog = Blog.objects.create(title='XSS', content='<p>Hola</p><script>alert(1)</script><p><a href="javascript:x">y</a></p>')
+
+        self.assertEqual(blog.content_html, '<p>Hola</p><p><a rel="noopener noreferrer">y</a></p>')
+        self.assertEqual(blog.word_count, 2)
+
+
+class ProjectMapClusterTests(TestCase):
+    """Mapa de proyectos: filtro por área visible y agrupación por zoom"""
+
+    def setUp(self):
+        self.lima = [
+            create_map_project('Lima 1', -12.0464, -77.0428),
+            create_map_project('Lima 2', -12.1200, -77.0300),
+            create_map_project('Lima 3', -12.0900, -77.0500),
+        ]
+        self.madrid = create_map_project('Madrid', 40.4168, -3.7038)
+        create_map_project('Oculto', -12.05, -77.04, show_on_map=False)
+
+    def test_nearby_projects_are_clustered_at_low_zoom(self):
+        data = cluster_projects(None, 4)
+
+        self.assertEqual(len(data['clusters']), 1)
+        cluster = data['clusters'][0]
+        self.assertEqual(cluster['count'], 3)
+        west, south, east, north = cluster['bounds']
+        self.assertAlmostEqual(south, -12.12)
+        self.assertAlmostEqual(north, -12.0464)
+        self.assertLess(west, east)
+        self.assertEqual([point['title'] for point in data['points']], ['Madrid'])
+
+    def test_max_cluster_zoom_returns_every_point(self):
+        data = cluster_projects(None, 16)
+
+        self.assertEqual(data['clusters'], [])
+        self.assertEqual(len(data['points']), 4)
+
+    def test_bbox_filters_visible_projects(self):
+        data = cluster_projects((-80, -15, -70, -10), 16)
+
+        self.assertEqual(sorted(point['title'] for point in data['points']), ['Lima 1', 'Lima 2', 'Lima 3'])
+
+    def test_antimeridian_bbox(self):
+        create_map_project('Fiyi', -17.7134, 178.0650)
+        create_map_project('Samoa', -13.7590, -172.1046)
+
+        # west > east: el área cruza el antimeridiano (de 170 a -170 pasando por 180)
+        titles = set(map_projects((170, -20, -170, -10)).values_list('title', flat=True))
+
+        self.assertEqual(titles, {'Fiyi', 'Samoa'})
+
+    def test_map_endpoint(self):
+        response = self.client.get('/api/projects/map/', {'bbox': '-80,-15,-70,-10', 'zoom': 4})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['clusters'][0]['count'], 3)
+
+    def test_map_endpoint_rejects_invalid_bbox(self):
+        for bbox in ('1,2,3', '-80,10,-70,-10', 'a,b,c,d'):
+            response = self.client.get('/api/projects/map/', {'bbox': bbox})
+
+            self.assertEqual(response.status_code, 400)
+
+
+class ProjectGeoJSONTests(TestCase):
+    """Feed GeoJSON del mapa: precodificado, con gzip y respuestas 304"""
+
+    URL = '/api/projects/geojson/'
+
+    def setUp(self):
+        create_map_project('Lima', -12.0464, -77.0428)
+        create_map_project('Oculto', -12.05, -77.04, show_on_map=False)
+        refresh_projects_geojson()
+
+    def test_feed_contains_map_projects(self):
+        response = self.client.get(self.URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/geo+json')
+        features = json.loads(response.content)['features']
+        self.assertEqual([feature['properties']['title'] for feature in features], ['Lima'])
+        self.assertEqual(features[0]['geometry']['coordinates'], [-77.0428, -12.0464])
+
+    def test_gzip_representation_has_its_own_etag(self):
+        plain = self.client.get(self.URL)
+        compressed = self.client.get(self.URL, HTTP_ACCEPT_ENCODING='gzip, deflate')
+
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertNotEqual(compressed['ETag'], plain['ETag'])
+
+    def test_matching_etag_returns_304(self):
+        etag = self.client.get(self.URL)['ETag']
+
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=f'"otro", {etag}')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_weak_or_partial_etags_do_not_match(self):
+        etag = self.client.get(self.URL)['ETag']
+
+        for header in (f'W/{etag}', etag[:-2] + '"', f'"x{etag[1:]}'):
+            response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=header)
+
+            self.assertEqual(response.status_code, 200, header)
+
+    def test_project_change_regenerates_the_feed(self):
+        etag = self.client.get(self.URL)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_map_project('Madrid', 40.4168, -3.7038)
+
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)['features']), 2)
+
+
+class NearbyProjectsTests(TestCase):
+    """Proyectos cercanos: prefiltro por bounding box y distancia exacta (haversine)"""
+
+    def setUp(self):
+        create_map_project('Lima', -12.0464, -77.0428)
+        create_map_project('Callao', -12.0566, -77.1181)
+        create_map_project('Cusco', -13.5320, -71.9675)
+        create_map_project('Madrid', 40.4168, -3.7038)
+
+    def test_haversine_distance(self):
+        # Lima - Madrid: ~9500 km
+        distance = haversine_km(-12.0464, -77.0428, np.array([40.4168]), np.array([-3.7038]))[0]
+
+        self.assertAlmostEqual(distance, 9500, delta=50)
+
+    def test_results_are_sorted_by_distance_within_radius(self):
+        results = nearest_projects(-12.05, -77.05, radius_km=1000)
+
+        self.assertEqual([result['title'] for result in results], ['Lima', 'Callao', 'Cusco'])
+        distances = [result['distance_km'] for result in results]
+        self.assertEqual(distances, sorted(distances))
+        self.assertLess(distances[-1], 1000)
+
+    def test_limit(self):
+        results = nearest_projects(-12.05, -77.05, radius_km=1000, limit=1)
+
+        self.assertEqual([result['title'] for result in results], ['Lima'])
+
+    def test_search_across_the_antimeridian(self):
+        create_map_project('Taveuni', -16.85, 179.95)
+        create_map_project('Vanua Balavu', -17.25, -178.95)
+
+        west, south, east, north = radius_bbox(-17.0, 179.9, 200)
+        results = nearest_projects(-17.0, 179.9, radius_km=200)
+
+        self.assertGreater(west, east)
+        self.assertEqual([result['title'] for result in results], ['Taveuni', 'Vanua Balavu'])
+
+    def test_radius_near_the_pole_covers_every_longitude(self):
+        self.assertEqual(radius_bbox(89.5, 10, 200)[::2], (-180.0, 180.0))
+
+    def test_nearby_endpoint(self):
+        response = self.client.get('/api/projects/nearby/', {'lat': -12.05, 'lng': -77.05, 'radius': 50})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['title'] for result in response.json()['results']], ['Lima', 'Callao'])
+
+    def test_nearby_endpoint_rejects_invalid_parameters(self):
+        for params in ({'lat': -12}, {'lat': 'x', 'lng': 1}, {'lat': 95, 'lng': 0}, {'lat': 0, 'lng': 0, 'radius': -1}):
+            response = self.client.get('/api/projects/nearby/', params)
+
+            self.assertEqual(response.status_code, 400, params)
+
+
+class BulkDeleteTests(TestCase):
+    """Borrado masivo: una transacción, productos con órdenes protegidos y archivos encolados"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='secret', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def bulk_delete(self, resource, ids):
+        return self.client.post(f'/api/admin/{resource}/bulk-delete/', {'ids': ids}, format='json')
+
+    def test_projects_are_deleted_and_their_files_queued(self):
+        project = Project.objects.create(title='Casa', year='2024', image='projects/casa.jpg')
+        ProjectImage.objects.create(project=project, image='projects/extra_images/casa-2.jpg')
+        kept = Project.objects.create(title='Oficina', year='2024')
+
+        response = self.bulk_delete('projects', [project.id, 999999])
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['ids'], [project.id])
+        self.assertEqual(data['missing'], [999999])
+        self.assertEqual(data['files_queued'], 2)
+        self.assertEqual(list(Project.objects.values_list('id', flat=True)), [kept.id])
+        self.assertFalse(ProjectImage.objects.exists())
+        self.assertEqual(
+            set(PendingFileDeletion.objects.values_list('path', flat=True)),
+            {'projects/casa.jpg', 'projects/extra_images/casa-2.jpg'},
+        )
+
+    def test_blogs_with_external_images_queue_no_files(self):
+        blogs = [Blog.objects.create(title=f'Post {index}', image='https://example.com/a.jpg') for index in range(2)]
+
+        response = self.bulk_delete('blogs', [str(blog.id) for blog in blogs])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['deleted_by_model'].get('admin_api.Blog'), 2)
+        self.assertEqual(response.json()['files_queued'], 0)
+        self.assertFalse(Blog.objects.exists())
+
+    def test_products_with_orders_are_protected(self):
+        user = User.objects.create_user(username='cliente', password='secret')
+        sold = create_product('Vendido', image='marketplace/vendido.jpg')
+        unsold = create_product('Sin ventas', image='marketplace/libre.jpg', zip_file='marketplace/zips/libre.zip')
+        order = MarketplaceOrder.objects.create(user=user, total_amount=Decimal('100.00'))
+        MarketplaceOrderItem.objects.create(order=order, product=sold, quantity=1, price=Decimal('100.00'))
+
+        response = self.bulk_delete('marketplace', [sold.id, unsold.id])
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['ids'], [unsold.id])
+        self.assertEqual(data['protected'], [sold.id])
+        self.assertEqual(data['missing'], [])
+        self.assertTrue(MarketplaceProduct.objects.filter(id=sold.id).exists())
+        self.assertTrue(MarketplaceOrderItem.objects.filter(order=order).exists())
+        self.assertFalse(MarketplaceProduct.objects.filter(id=unsold.id).exists())
+        self.assertEqual(
+            set(PendingFileDeletion.objects.values_list('path', flat=True)),
+            {'marketplace/libre.jpg', 'marketplace/zips/libre.zip'},
+        )
+
+    def test_invalid_ids_are_rejected(self):
+        project = Project.objects.create(title='Casa', year='2024')
+
+        for ids in ([True], ['1.5'], [1.0], [0], [None], [], 'abc'):
+            response = self.bulk_delete('projects', ids)
+
+            self.assertEqual(response.status_code, 400, ids)
+            self.assertTrue(response.json()['error'].startswith('Parámetros inválidos: ids debe'), ids)
+        self.assertTrue(Project.objects.filter(id=project.id).exists())
+
+    def test_anonymous_and_non_admin_requests_are_rejected(self):
+        project = Project.objects.create(title='Casa', year='2024')
+        product = create_product()
+        customer = User.objects.create_user(username='cliente', password='secret')
+
+        for user in (None, customer):
+            self.client.force_authenticate(user)
+            for resource, pk in (('projects', project.id), ('blogs', 1), ('marketplace', product.id)):
+                response = self.bulk_delete(resource, [pk])
+
+                self.assertIn(response.status_code, (401, 403), (user, resource))
+        self.assertTrue(Project.objects.filter(id=project.id).exists())
+        self.assertTrue(MarketplaceProduct.objects.filter(id=product.id).exists())
+
+
+class RelatedPostsTests(TestCase):
+    """Blogs relacionados: TF-IDF por bloques dispersos y recálculo incremental de los marcados"""
+
+    def setUp(self):
+        self.concrete = Blog.objects.create(
+            title='Estructuras de concreto armado', summary='Vigas y columnas', content='Vigas columnas concreto acero refuerzo'
+        )
+        self.buildings = Blog.objects.create(
+            title='Concreto armado en edificios', summary='Columnas', content='Columnas vigas concreto sismo'
+        )
+        self.gardens = Blog.objects.create(
+            title='Jardines verticales', summary='Plantas', content='Plantas riego sustrato jardines'
+        )
+        self.irrigation = Blog.objects.create(
+            title='Riego de jardines', summary='Plantas', content='Plantas riego goteo jardines'
+        )
+
+    def related(self, blog):
+        blog.refresh_from_db()
+        return blog.related_ids
+
+    def test_tokenize_strips_accents_stopwords_and_short_tokens(self):
+        self.assertEqual(tokenize('Diseño de la Construcción para un año'), ['diseno', 'construccion', 'ano'])
+
+    def test_top_related_matches_any_chunk_size(self):
+        model = build_model(Blog.objects.order_by('id').values(*related_services.DOCUMENT_FIELDS))
+        rows = list(range(len(model['ids'])))
+        expected = top_related(model, rows)
+
+        with mock.patch.object(related_services, 'SIMILARITY_CHUNK_ROWS', 1):
+            self.assertEqual(top_related(model, rows), expected)
+        self.assertEqual([blog_id for blog_id, _ in expected[self.concrete.id]], [self.buildings.id])
+        self.assertEqual([blog_id for blog_id, _ in expected[self.gardens.id]], [self.irrigation.id])
+
+    def test_rebuild_clears_stale_flags_and_stores_terms(self):
+        rebuild_related_posts()
+
+        self.assertEqual(self.related(self.concrete), [self.buildings.id])
+        self.assertFalse(Blog.objects.filter(related_stale=True).exists())
+        self.concrete.refresh_from_db()
+        self.assertEqual(self.concrete.related_terms['concreto'], 4)
+
+    def test_saving_marks_only_source_fields_as_stale(self):
+        rebuild_related_posts()
+
+        self.concrete.featured = True
+        self.concrete.save(update_fields=['featured'])
+        self.assertFalse(Blog.objects.filter(related_stale=True).exists())
+
+        self.concrete.summary = 'Otro resumen'
+        self.concrete.save(update_fields=['summary'])
+        self.assertEqual(list(Blog.objects.filter(related_stale=True).values_list('id', flat=True)), [self.concrete.id])
+
+    def test_incremental_update_only_tokenizes_stale_blogs(self):
+        rebuild_related_posts()
+        self.gardens.content = 'Concreto vigas columnas acero'
+        self.gardens.save()
+
+        with mock.patch.object(related_services, 'term_counts', wraps=related_services.term_counts) as counts:
+            update_related_posts()
+
+        self.assertEqual(counts.call_count, 1)
+        self.assertIn(self.gardens.id, self.related(self.concrete))
+        self.assertIn(self.gardens.id, self.related(self.buildings))
+        self.assertIn(self.concrete.id, self.related(self.gardens))
+        self.assertFalse(Blog.objects.filter(related_stale=True).exists())
+
+    def test_incremental_update_drops_deleted_blogs(self):
+        rebuild_related_posts()
+        self.buildings.delete()
+
+        with mock.patch.object(related_services, 'IDF_MAX_DRIFT', 1.0), \
+                mock.patch.object(related_services, 'term_counts') as counts:
+            update_related_posts()
+
+        counts.assert_not_called()
+        self.assertEqual(self.related(self.concrete), [])
+
+    def test_failed_update_restores_stale_flags(self):
+        rebuild_related_posts()
+        self.concrete.save()
+
+        with mock.patch.object(related_services, 'save_related', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                update_related_posts()
+
+        self.assertTrue(Blog.objects.get(id=self.concrete.id).related_stale)
+
+
+class ProductFavoriteTests(TestCase):
+    """Favoritos: is_favorited anotado por usuario y sincronización en lote"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', password='secret')
+        self.favorite = create_product('Favorito')
+        self.other = create_product('Otro')
+        ProductFavorite.objects.create(user=self.user, product=self.favorite)
+        self.client = APIClient()
+
+    def tearDown(self):
+        # El detalle registra vistas en el buffer: escribirlas antes de destruir la BD de pruebas
+        counter_buffer.flush()
+
+    def favorited_by_id(self, response):
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        products = data['results'] if isinstance(data, dict) else data
+        return {product['id']: product['is_favorited'] for product in products}
+
+    def test_anonymous_list_is_never_favorited(self):
+        favorited = self.favorited_by_id(self.client.get('/api/admin/marketplace/'))
+
+        self.assertEqual(favorited, {self.favorite.id: False, self.other.id: False})
+
+    def test_authenticated_list_and_detail_are_annotated(self):
+        self.client.force_authenticate(self.user)
+
+        favorited = self.favorited_by_id(self.client.get('/api/admin/marketplace/'))
+        detail = self.client.get(f'/api/admin/marketplace/{self.favorite.id}/').json()
+
+        self.assertEqual(favorited, {self.favorite.id: True, self.other.id: False})
+        self.assertTrue(detail['is_favorited'])
+        self.assertFalse(self.client.get(f'/api/admin/marketplace/{self.other.id}/').json()['is_favorited'])
+
+    def sync(self, add=(), remove=()):
+        return self.client.post('/api/admin/product-favorites/sync/', {'add': list(add), 'remove': list(remove)}, format='json')
+
+    def test_sync_adds_and_removes_in_one_call(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.sync(add=[self.other.id], remove=[self.favorite.id])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'favorites': [self.other.id], 'count': 1})
+        self.assertEqual(list(ProductFavorite.objects.filter(user=self.user).values_list('product_id', flat=True)), [self.other.id])
+
+    def test_sync_is_idempotent_and_skips_inactive_products(self):
+        inactive = create_product('Inactivo', is_active=False)
+        self.client.force_authenticate(self.user)
+
+        response = self.sync(add=[self.favorite.id, inactive.id, 999999])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'favorites': [self.favorite.id], 'count': 1})
+        self.assertEqual(ProductFavorite.objects.filter(user=self.user).count(), 1)
+
+    def test_sync_rejects_invalid_payloads_and_anonymous_users(self):
+        self.assertEqual(self.sync(add=[self.other.id]).status_code, 401)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/admin/product-favorites/sync/', {'add': 'x'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ProductFavorite.objects.filter(product=self.other).exists())
+
+
+class BlogIndexTests(TestCase):
+    """Índice de blogs: paginado y sin el cuerpo; el detalle por slug sí lo incluye"""
+
+    def setUp(self):
+        for index in range(15):
+            Blog.objects.create(
+                title=f'Post {index}', category='Diseño' if index % 2 else 'Obra',
+                content=f'<p>Cuerpo completo {index}</p>', date=f'2024-01-{index + 1:02d}'
+            )
+
+    def test_list_is_paginated_and_never_queries_content(self):
+        for url in ('/api/admin/blogs/', '/api/admin/blogs/summary/'):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertEqual(data['count'], 15)
+            self.assertEqual(len(data['results']), 12)
+            self.assertEqual(data['results'][0]['title'], 'Post 14')
+            self.assertNotIn('content', data['results'][0])
+            self.assertFalse(any('"content"' in query['sql'] for query in queries.captured_queries), url)
+
+    def test_list_filters_by_category(self):
+        data = self.client.get('/api/admin/blogs/', {'category': 'Diseño', 'page_size': 50}).json()
+
+        self.assertEqual(data['count'], 7)
+        self.assertTrue(all(blog['category'] == 'Diseño' for blog in data['results']))
+
+    def test_slug_detail_returns_the_body(self):
+        blog = Blog.objects.get(title='Post 3')
+
+        response = self.client.get(f'/api/admin/blogs/slug/{blog.slug}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['content'], '<p>Cuerpo completo 3</p>')
+        self.assertIn('Cuerpo completo 3', response.json()['content_html'])
+
+
+class SalesRollupTests(TestCase):
+    """Tablas de ventas: refresco incremental por marca de agua, límites de día y reporte por producto"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', password='secret')
+        self.house = create_product('Casa', category='residential', style='modern')
+        self.office = create_product('Oficina', category='commercial', style='classic')
+
+    def create_order(self, created_at, lines, status='paid'):
+        order = MarketplaceOrder.objects.create(user=self.user, total_amount=Decimal('0'), status=status)
+        for product, quantity, price in lines:
+            MarketplaceOrderItem.objects.create(order=order, product=product, quantity=quantity, price=Decimal(price))
+        MarketplaceOrder.objects.filter(pk=order.pk).update(created_at=created_at)
+        order.refresh_from_db()
+        return order
+
+    def snapshot(self):
+        return (
+            list(DailySales.objects.order_by('date').values_list('date', 'orders', 'units', 'revenue')),
+            list(DailyProductSales.objects.order_by('date', 'product_id').values_list(
+                'date', 'product_id', 'category', 'style', 'orders', 'units', 'revenue'
+            )),
+        )
+
+    def test_incremental_refresh_matches_full_rebuild(self):
+        first = self.create_order(datetime(2024, 3, 1, 15, tzinfo=dt_timezone.utc), [(self.house, 1, '100.00')])
+        self.create_order(datetime(2024, 3, 2, 15, tzinfo=dt_timezone.utc), [(self.office, 2, '50.00')])
+        refresh_sales_rollups()
+        self.assertTrue(SiteConfig.objects.filter(key=WATERMARK_KEY).exists())
+
+        # Cambios posteriores: una orden nueva y otra cancelada
+        self.create_order(datetime(2024, 3, 2, 18, tzinfo=dt_timezone.utc), [(self.house, 3, '100.00')])
+        first.status = 'cancelled'
+        first.save()
+        self.assertEqual(refresh_sales_rollups(), [date(2024, 3, 1), date(2024, 3, 2)])
+        incremental = self.snapshot()
+
+        DailySales.objects.all().delete()
+        DailyProductSales.objects.all().delete()
+        SiteConfig.objects.filter(key=WATERMARK_KEY).delete()
+        refresh_sales_rollups()
+
+        self.assertEqual(self.snapshot(), incremental)
+        self.assertEqual(incremental[0], [(date(2024, 3, 2), 2, 5, Decimal('400.00'))])
+
+    def test_days_follow_the_site_timezone(self):
+        # 03:00 UTC del 1 de marzo es el 29 de febrero en Lima (UTC-5)
+        self.create_order(datetime(2024, 3, 1, 3, tzinfo=dt_timezone.utc), [(self.house, 1, '100.00')])
+        self.create_order(datetime(2024, 3, 1, 6, tzinfo=dt_timezone.utc), [(self.house, 1, '100.00')])
+
+        days = refresh_sales_rollups()
+
+        self.assertEqual(days, [date(2024, 2, 29), date(2024, 3, 1)])
+        self.assertEqual(list(DailySales.objects.order_by('date').values_list('date', 'orders')),
+                         [(date(2024, 2, 29), 1), (date(2024, 3, 1), 1)])
+
+    def test_deleting_an_order_line_removes_the_stale_product_row(self):
+        order = self.create_order(timezone.now(), [(self.house, 1, '100.00'), (self.office, 1, '80.00')])
+        refresh_order_sales(order)
+        self.assertEqual(DailyProductSales.objects.count(), 2)
+
+        order.items.filter(product=self.office).delete()
+        call_command('refresh_sales_rollups', days=2, stdout=StringIO())
+
+        self.assertEqual(list(DailyProductSales.objects.values_list('product_id', flat=True)), [self.house.id])
+        self.assertEqual(DailySales.objects.get().revenue, Decimal('100.00'))
+
+    def test_rebuilding_a_day_without_sales_clears_it(self):
+        order = self.create_order(datetime(2024, 3, 1, 15, tzinfo=dt_timezone.utc), [(self.house, 1, '100.00')])
+        rebuild_sales_day(date(2024, 3, 1))
+        MarketplaceOrder.objects.filter(pk=order.pk).update(status='cancelled')
+
+        rebuild_sales_day(date(2024, 3, 1))
+
+        self.assertFalse(DailySales.objects.exists())
+        self.assertFalse(DailyProductSales.objects.exists())
+
+    def test_sales_by_product_limit(self):
+        self.create_order(timezone.now(), [(self.house, 1, '100.00'), (self.office, 1, '80.00')])
+        refresh_sales_rollups()
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.get('/api/admin/dashboard/sales/products/', {'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['product_id'] for row in response.json()['products']], [self.house.id])
+
+        for limit in (-1, 0, 101, 'x'):
+            response = client.get('/api/admin/dashboard/sales/products/', {'limit': limit})
+
+            self.assertEqual(response.status_code, 400, limit)
+            self.assertIn('limit', response.json()['error'])
+
+
+class BlogTagTests(TestCase):
+    """Etiquetas: índice BlogTag sincronizado al guardar, filtro ?tag= y conteo en caché"""
+
+    def setUp(self):
+        cache.delete(TAG_COUNTS_CACHE_KEY)
+
+    def tag_slugs(self, blog):
+        return set(blog.blog_tags.values_list('tag__slug', flat=True))
+
+    def test_save_syncs_the_tag_index(self):
+        blog = Blog.objects.create(title='Casa', tags='Diseño, Casas; casas #Madera')
+        self.assertEqual(self.tag_slugs(blog), {'diseno', 'casas', 'madera'})
+
+        blog.tags = '["Casas", "Acero"]'
+        blog.save(update_fields=['tags'])
+
+        self.assertEqual(self.tag_slugs(blog), {'casas', 'acero'})
+
+    def test_list_filters_by_tag(self):
+        tagged = Blog.objects.create(title='Casa', tags='Diseño, Casas')
+        Blog.objects.create(title='Oficina', tags='Oficinas')
+
+        for tag in ('casas', 'Casas'):
+            results = self.client.get('/api/admin/blogs/', {'tag': tag}).json()['results']
+
+            self.assertEqual([blog['id'] for blog in results], [tagged.id], tag)
+
+    def test_counts_are_invalidated_after_commit(self):
+        Blog.objects.create(title='Casa', tags='Casas, Diseño')
+        Blog.objects.create(title='Otra casa', tags='Casas')
+        self.assertEqual(
+            [(tag['slug'], tag['count']) for tag in get_tag_counts()], [('casas', 2), ('diseno', 1)]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Blog.objects.create(title='Tercera', tags='Diseño')
+
+        self.assertEqual(
+            [(tag['slug'], tag['count']) for tag in get_tag_counts()], [('casas', 2), ('diseno', 2)]
+        )
+
+    def test_local_cache_uses_a_short_ttl(self):
+        for shared, ttl in ((False, TAG_COUNTS_LOCAL_CACHE_TTL), (True, TAG_COUNTS_CACHE_TTL)):
+            cache.delete(TAG_COUNTS_CACHE_KEY)
+            with override_settings(CACHE_IS_SHARED=shared), mock.patch.object(cache, 'set') as cache_set:
+                get_tag_counts()
+
+            self.assertEqual(cache_set.call_args.args[2], ttl, shared)
+
+    def test_migration_parser_matches_the_app_parser(self):
+        migration = importlib.import_module('admin_api.migrations.0024_blog_tags')
+
+        for tags in ('Diseño, Casas; casas', '["Casas", "Acero", "casas"]', '#madera #Acero', '', None, '[roto', '  ' + 'x' * 80):
+            self.assertEqual(migration.parse_tags(tags), parse_tags(tags), tags)
+
+
+class PaymentStateTests(TestCase):
+    """Estado de PaymentIntents: caché/BD, una sola consulta a Stripe por periodo y webhooks"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cliente', password='secret')
+        self.order = MarketplaceOrder.objects.create(
+            user=self.user, stripe_payment_intent_id='pi_state', total_amount=Decimal('100.00'),
+            payment_status='processing', payment_status_synced_at=timezone.now()
+        )
+
+    def make_stale(self, age=timedelta(seconds=60)):
+        MarketplaceOrder.objects.filter(pk=self.order.pk).update(payment_status_synced_at=timezone.now() - age)
+        cache.clear()
+
+    def test_fresh_state_does_not_call_stripe(self):
+        with mock.patch('stripe.PaymentIntent.retrieve') as retrieve:
+            state = get_payment_state('pi_state')
+
+        retrieve.assert_not_called()
+        self.assertEqual(state['status'], 'processing')
+
+    def test_stale_state_is_refreshed_once(self):
+        self.make_stale()
+
+        with mock.patch('stripe.PaymentIntent.retrieve', return_value=SimpleNamespace(status='succeeded')) as retrieve:
+            first = get_payment_state('pi_state')
+            second = get_payment_state('pi_state')
+
+        retrieve.assert_called_once_with('pi_state')
+        self.assertEqual((first['status'], second['status']), ('succeeded', 'succeeded'))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'succeeded')
+
+    def test_terminal_state_is_never_refreshed(self):
+        record_payment_state('pi_state', 'succeeded')
+        self.make_stale(timedelta(days=1))
+
+        with mock.patch('stripe.PaymentIntent.retrieve') as retrieve:
+            self.assertEqual(get_payment_state('pi_state')['status'], 'succeeded')
+
+        retrieve.assert_not_called()
+
+    def test_lost_claim_returns_the_stored_state_without_calling_stripe(self):
+        # Este proceso leyó un estado viejo, pero otro worker ya sincronizó la orden
+        stale = {'status': 'processing', 'synced_at': timezone.now() - timedelta(minutes=5)}
+        record_payment_state('pi_state', 'succeeded')
+
+        with mock.patch.object(payment_services, '_load_local_state', return_value=stale), \
+                mock.patch('stripe.PaymentIntent.retrieve') as retrieve:
+            state = get_payment_state('pi_state')
+
+        retrieve.assert_not_called()
+        self.assertEqual(state['status'], 'succeeded')
+
+    def test_only_one_claim_wins_for_the_same_stale_state(self):
+        self.make_stale()
+        stale = payment_services._load_db_state('pi_state')
+
+        self.assertTrue(payment_services._claim_refresh('pi_state', stale))
+        self.assertFalse(payment_services._claim_refresh('pi_state', stale))
+
+    def test_stripe_error_keeps_the_local_state(self):
+        self.make_stale()
+
+        with mock.patch('stripe.PaymentIntent.retrieve', side_effect=stripe.error.APIConnectionError('down')):
+            state = get_payment_state('pi_state')
+
+        self.assertEqual(state['status'], 'processing')
+
+    def test_webhook_state_is_stored_in_the_order_and_cache(self):
+        record_payment_state('pi_state', 'requires_payment_method')
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'requires_payment_method')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_payment_state('pi_state')['status'], 'requires_payment_method')
+
+    def test_unknown_payment_intent(self):
+        self.assertIsNone(get_payment_state('pi_missing'))
+        self.assertIsNone(get_payment_state(''))
+
+
+class ReconcileOrdersTests(TestCase):
+    """reconcile_orders: estados de Stripe en bloque, --dry-run y transición a completed una sola vez"""
+
+    SIDE_EFFECTS = (
+        'admin_api.marketplace_views.send_order_invoice',
+        'admin_api.analytics_services.refresh_order_sales',
+        'admin_api.popularity_services.record_order_purchase',
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cliente', password='secret')
+        self.pending = MarketplaceOrder.objects.create(
+            user=self.user, stripe_payment_intent_id='pi_paid', total_amount=Decimal('100.00')
+        )
+        self.unpaid = MarketplaceOrder.objects.create(
+            user=self.user, stripe_payment_intent_id='pi_open', total_amount=Decimal('50.00')
+        )
+
+    def reconcile(self, *args, sessions=()):
+        intents = [
+            SimpleNamespace(id='pi_paid', status='succeeded'),
+            SimpleNamespace(id='pi_open', status='requires_payment_method'),
+        ]
+        # Dos páginas de PaymentIntents para recorrer la paginación
+        intent_pages = [SimpleNamespace(data=intents[:1], has_more=True), SimpleNamespace(data=intents[1:], has_more=False)]
+        patches = [mock.patch(path) for path in self.SIDE_EFFECTS]
+        with mock.patch('stripe.PaymentIntent.list', side_effect=intent_pages) as intent_list, \
+                mock.patch('stripe.checkout.Session.list', return_value=SimpleNamespace(data=list(sessions), has_more=False)):
+            side_effects = [patch.start() for patch in patches]
+            try:
+                with self.captureOnCommitCallbacks(execute=True):
+                    call_command('reconcile_orders', *args, stdout=StringIO())
+            finally:
+                for patch in patches:
+                    patch.stop()
+        self.assertEqual(intent_list.call_args_list[1].kwargs['starting_after'], 'pi_paid')
+        return dict(zip(self.SIDE_EFFECTS, side_effects))
+
+    def test_dry_run_writes_nothing(self):
+        side_effects = self.reconcile('--dry-run')
+
+        self.pending.refresh_from_db()
+        self.assertEqual((self.pending.status, self.pending.payment_status), ('pending', ''))
+        self.assertFalse(SiteConfig.objects.filter(key='stripe_reconcile_watermark').exists())
+        self.assertFalse(any(side_effect.called for side_effect in side_effects.values()))
+
+    def test_pending_order_is_completed_only_once(self):
+        sessions = [{'payment_intent': 'pi_paid', 'payment_status': 'paid', 'customer_details': {'email': 'pago@example.com'}}]
+        first = self.reconcile(sessions=sessions)
+        second = self.reconcile(sessions=sessions)
+
+        self.pending.refresh_from_db()
+        self.unpaid.refresh_from_db()
+        self.assertEqual(self.pending.status, 'completed')
+        self.assertEqual(self.pending.payment_status, 'succeeded')
+        self.assertEqual(self.pending.customer_email, 'pago@example.com')
+        self.assertEqual((self.unpaid.status, self.unpaid.payment_status), ('pending', 'requires_payment_method'))
+        self.assertEqual(first['admin_api.marketplace_views.send_order_invoice'].call_count, 1)
+        self.assertFalse(second['admin_api.marketplace_views.send_order_invoice'].called)
+        self.assertTrue(SiteConfig.objects.filter(key='stripe_reconcile_watermark').exists())
+        # El estado reconciliado queda en la caché para los polls
+        self.assertEqual(cache.get('stripe:payment_intent:pi_paid')['status'], 'succeeded')
+
+
+class ProductPopularityTests(TestCase):
+    """Popularidad: pesos con decaimiento, ?ordering=popular y una compra por orden pagada"""
+
+    FIRST_PAYMENT_EFFECTS = ('admin_api.marketplace_views.send_order_invoice', 'admin_api.popularity_services.record_order_purchase')
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', password='secret')
+        self.product = create_product()
+
+    def test_event_weight_doubles_every_half_life(self):
+        half_life = timedelta(days=POPULARITY_HALF_LIFE_DAYS)
+
+        self.assertEqual(event_weight('view', POPULARITY_EPOCH), 1.0)
+        self.assertAlmostEqual(event_weight('purchase', POPULARITY_EPOCH + half_life), 20.0)
+        # Un evento de hace dos vidas medias vale la cuarta parte de uno actual
+        now = POPULARITY_EPOCH + 10 * half_life
+        self.assertAlmostEqual(event_weight('favorite', now - 2 * half_life) / event_weight('favorite', now), 0.25)
+
+    def test_popular_ordering(self):
+        quiet = create_product('Tranquilo', popularity_score=1.0)
+        hot = create_product('Popular', popularity_score=50.0)
+        MarketplaceProduct.objects.filter(pk=self.product.pk).update(popularity_score=10.0)
+
+        response = self.client.get('/api/admin/marketplace/', {'ordering': 'popular'})
+
+        self.assertEqual([product['id'] for product in response.json()], [hot.id, self.product.id, quiet.id])
+
+    def run_events(self, *events):
+        order = MarketplaceOrder.objects.create(user=self.user, total_amount=Decimal('100.00'))
+        MarketplaceOrderItem.objects.create(order=order, product=self.product, quantity=1, price=Decimal('100.00'))
+        patches = {path: mock.patch(path) for path in self.FIRST_PAYMENT_EFFECTS}
+        mocks = {path: patch.start() for path, patch in patches.items()}
+        self.addCleanup(mock.patch.stopall)
+        with mock.patch('admin_api.marketplace_views.send_order_zip_files'), \
+                mock.patch('admin_api.analytics_services.refresh_order_sales'):
+            for event in events:
+                with self.captureOnCommitCallbacks(execute=True):
+                    try:
+                        OrderStateMachine.advance(order.id, event)
+                    except IllegalTransition:
+                        pass
+        return [mocks[path].call_count for path in self.FIRST_PAYMENT_EFFECTS]
+
+    def test_confirmed_then_files_sent_counts_one_purchase(self):
+        # pending -> paid -> completed; el webhook tardío se rechaza
+        self.assertEqual(self.run_events('payment_confirmed', 'files_sent', 'payment_succeeded'), [1, 1])
+
+    def test_confirmed_then_payment_succeeded_counts_one_purchase(self):
+        self.assertEqual(self.run_events('payment_confirmed', 'payment_succeeded'), [1, 1])
+
+    def test_direct_payment_counts_one_purchase(self):
+        self.assertEqual(self.run_events('payment_succeeded', 'files_sent'), [1, 1])
+
+    def test_unpaid_order_counts_no_purchase(self):
+        self.assertEqual(self.run_events('payment_failed'), [0, 0])
+
+    def test_advance_many_counts_only_first_payments(self):
+        paid = MarketplaceOrder.objects.create(user=self.user, total_amount=Decimal('100.00'), status='paid')
+        pending = MarketplaceOrder.objects.create(user=self.user, total_amount=Decimal('100.00'))
+
+        with mock.patch('admin_api.popularity_services.record_order_purchase') as purchase, \
+                mock.patch('admin_api.marketplace_views.send_order_invoice'), \
+                mock.patch('admin_api.analytics_services.refresh_order_sales'):
+            with self.captureOnCommitCallbacks(execute=True):
+                OrderStateMachine.advance_many([paid.id, pending.id], 'payment_succeeded')
+
+        self.assertEqual([call.args[0].id for call in purchase.call_args_list], [pending.id])
+
+
+class InteractionToggleTests(TestCase):
+    """Likes y favoritos: alternar por visitante y contadores que un save() no pisa"""
+
+    def setUp(self):
+        self.blog = Blog.objects.create(title='Blog con likes')
+        self.project = Project.objects.create(title='Proyecto con likes', year='2024')
+
+    def tearDown(self):
+        counter_buffer.flush()
+
+    def toggle(self, action, user_agent='navegador-a', target='blog'):
+        target_id = self.blog.id if target == 'blog' else self.project.id
+        return self.client.post(
+            f'/api/admin/toggle-{target}-interaction/', {target: target_id, 'action': action},
+            content_type='application/json', HTTP_USER_AGENT=user_agent
+        ).json()
+
+    def test_toggle_round_trip(self):
+        first = self.toggle('like')
+        self.assertEqual((first['liked'], first['favorited'], first['like_count']), (True, False, 1))
+
+        second = self.toggle('like')
+        self.assertEqual((second['liked'], second['like_count']), (False, 0))
+
+        counter_buffer.flush()
+        self.assertEqual(Blog.objects.get(pk=self.blog.pk).like_count, 0)
+
+    def test_second_visitor_counts(self):
+        self.toggle('like')
+        self.toggle('favorite')
+
+        other = self.toggle('like', user_agent='navegador-b')
+
+        self.assertEqual((other['liked'], other['favorited']), (True, False))
+        self.assertEqual((other['like_count'], other['favorite_count']), (2, 1))
+
+        project = self.toggle('favorite', target='project')
+        self.assertEqual((project['favorited'], project['favorite_count'], project['like_count']), (True, 1, 0))
+
+    def test_full_save_keeps_counters(self):
+        stale_blog = Blog.objects.get(pk=self.blog.pk)
+        stale_project = Project.objects.get(pk=self.project.pk)
+        self.toggle('like')
+        self.toggle('favorite', user_agent='navegador-b')
+        self.toggle('like', target='project')
+        counter_buffer.flush()
+
+        # Copias leídas antes de los incrementos: el save() completo no debe pisarlos
+        stale_blog.title = 'Título editado'
+        stale_blog.save()
+        stale_project.title = 'Proyecto editado'
+        stale_project.save()
+
+        blog = Blog.objects.get(pk=self.blog.pk)
+        self.assertEqual((blog.title, blog.like_count, blog.favorite_count), ('Título editado', 1, 1))
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertEqual((project.title, project.like_count), ('Proyecto editado', 1))
+
+    def test_constant_queries_per_toggle(self):
+        # Blog, SAVEPOINT, INSERT OR IGNORE, SELECT de la fila, UPDATE, RELEASE y contadores
+        with self.assertNumQueries(7):
+            self.toggle('like')
+
+        for index in range(20):
+            self.toggle('like', user_agent=f'visitante-{index}')
+            self.toggle('favorite', user_agent=f'visitante-{index}')
+
+        with self.assertNumQueries(7):
+            self.toggle('like')
+        with self.assertNumQueries(7):
+            self.toggle('favorite', user_agent='visitante-0')
@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .views import ProjectViewSet, BlogViewSet, BlogLikeFavoriteViewSet, ProjectLikeFavoriteViewSet, upload_blog_image, upload_project_image, toggle_project_like_favorite, toggle_blog_like_favorite, SiteConfigViewSet, update_site_config_bulk
 from .marketplace_views import MarketplaceProductViewSet, CartViewSet, MarketplaceOrderViewSet, ProductFavoriteViewSet, StripeWebhookView, SendZipFilesView
 from .contact_views import ContactMessageViewSet, send_contact_message
+from .dashboard_views import dashboard_summary, sales_daily, sales_by_product, sales_by_group
 from .design_views import DesignServicesView, DesignServiceDetailView, DesignServiceCreateView, DesignCategoriesView, DesignCategoryCreateView, DesignCategoryDetailView, DesignEntriesView, DesignConfigView
 
 router = DefaultRouter()
@@ -27,6 +28,13 @@ urlpatterns = [
     path('send-contact-message/', send_contact_message, name='send_contact_message'),
     path('stripe-webhook/', StripeWebhookView.as_view(), name='stripe_webhook'),
     path('marketplace/orders/<int:order_id>/send-zip-files/', SendZipFilesView.as_view(), name='send_zip_files'),
+
+    # Panel de administración
+    path('dashboard/', dashboard_summary, name='dashboard_summary'),
+    # Reportes de ventas (tablas agregadas)
+    path('dashboard/sales/daily/', sales_daily, name='dashboard_sales_daily'),
+    path('dashboard/sales/products/', sales_by_product, name='dashboard_sales_products'),
+    path('dashboard/sales/groups/', sales_by_group, name='dashboard_sales_groups'),
     
     # Endpoints para servicios de diseño
     path('design/services/', DesignServicesView.as_view(), name='design_services'),
@@ -1,16 +1,37 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, parser_classes, permission_classes
-from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.permissions import AllowAny
+from rest_framework.decorators import action, api_view, parser_classes, permission_classes
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
 import os
 from django.conf import settings
+from django.utils.text import slugify
 from .models import Project, ProjectImage, Blog, BlogLikeFavorite, ProjectLikeFavorite, SiteConfig
+from .counter_buffer import counter_buffer
+from .deletion_services import bulk_delete, parse_bulk_ids
+from .interaction_services import INTERACTION_ACTIONS, get_visitor_id, toggle_interaction
+from .related_services import get_related_posts
+from .tag_services import get_tag_counts
 from .serializers import (
-    ProjectSerializer, ProjectImageSerializer, BlogSerializer, 
-    BlogLikeFavoriteSerializer, ProjectLikeFavoriteSerializer, SiteConfigSerializer
+    ProjectSerializer, ProjectImageSerializer, BlogSerializer, BlogSummarySerializer,
+    BlogLikeFavoriteSerializer, ProjectLikeFavoriteSerializer, SiteConfigSerializer,
+    BLOG_SUMMARY_FIELDS
 )
 
+# Acción de borrado masivo: solo administradores autenticados (el barrido borra
+# después los archivos del disco, no se puede deshacer)
+BULK_DELETE_ACTION = {
+    'detail': False,
+    'methods': ['post'],
+    'url_path': 'bulk-delete',
+    'parser_classes': [JSONParser],
+    'permission_classes': [IsAdminUser],
+    'authentication_classes': [JWTAuthentication, SessionAuthentication],
+}
+
 class ProjectViewSet(viewsets.ModelViewSet):
     """
     ViewSet simple para operaciones CRUD de proyectos
@@ -150,55 +171,16 @@ class ProjectViewSet(viewsets.ModelViewSet):
             )
 
     def destroy(self, request, *args, **kwargs):
-        """Eliminar proyecto con manejo de foreign keys"""
-        from django.db import IntegrityError, transaction
-        
-        print(f"=== ELIMINANDO PROYECTO ID: {kwargs.get('pk')} ===")
-        try:
-            instance = self.get_object()
-            project_title = instance.title
-            project_id = instance.id
-            
-            with transaction.atomic():
-                # Eliminar registros relacionados primero
-                print(f"🧹 Limpiando registros relacionados para proyecto {project_id}...")
-                
-                # Eliminar interacciones relacionadas
-                from admin_api.models import ProjectLikeFavorite
-                interactions_count = ProjectLikeFavorite.objects.filter(project=instance).count()
-                ProjectLikeFavorite.objects.filter(project=instance).delete()
-                print(f"  - Eliminadas {interactions_count} interacciones")
-                
-                # Eliminar imágenes relacionadas  
-                from admin_api.models import ProjectImage
-                images_count = ProjectImage.objects.filter(project=instance).count()
-                ProjectImage.objects.filter(project=instance).delete()
-                print(f"  - Eliminadas {images_count} imágenes")
-                
-                # Ahora eliminar el proyecto
-                instance.delete()
-                print(f"✅ Proyecto eliminado: {project_title}")
-            
-            return Response(status=status.HTTP_204_NO_CONTENT)
-            
-        except IntegrityError as e:
-            print(f"❌ Error de integridad: {str(e)}")
-            return Response(
-                {
-                    "message": "No se puede eliminar el proyecto debido a restricciones de integridad",
-                    "error": str(e)
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        except Exception as e:
-            print(f"❌ Error eliminando proyecto: {str(e)}")
-            return Response(
-                {
-                    "message": "Error eliminando proyecto", 
-                    "error": str(e)
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        """Eliminar proyecto (imágenes e interacciones por cascada; archivos al barrido)"""
+        instance = self.get_object()
+        result = bulk_delete('project', [instance.id])
+        print(f"✅ Proyecto eliminado: {instance.title} ({result['deleted']} registros)")
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(**BULK_DELETE_ACTION)
+    def bulk_delete(self, request):
+        """Eliminar varios proyectos en una transacción: {"ids": [1, 2, 3]}"""
+        return bulk_delete_response(request, 'project')
 
 class ProjectImageViewSet(viewsets.ModelViewSet):
     queryset = ProjectImage.objects.all()
@@ -207,93 +189,87 @@ class ProjectImageViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]
     authentication_classes = []
 
+def bulk_delete_response(request, target):
+    """Respuesta común de los endpoints de borrado masivo"""
+    try:
+        ids = parse_bulk_ids(request.data)
+    except (TypeError, ValueError) as e:
+        return Response({'error': f'Parámetros inválidos: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+    result = bulk_delete(target, ids)
+    print(f"🗑️ Borrado masivo de {target}: {len(result['ids'])} eliminados, {result['files_queued']} archivos encolados")
+    return Response(result)
+
+def filter_blogs_by_tag(queryset, request):
+    """Filtrar por ?tag=<slug o nombre> usando el índice BlogTag"""
+    tag = request.query_params.get('tag')
+    if tag:
+        queryset = queryset.filter(blog_tags__tag__slug=slugify(tag))
+    return queryset
+
+class BlogPagination(PageNumberPagination):
+    """
+    Paginación del índice de blogs
+    """
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
 class BlogViewSet(viewsets.ModelViewSet):
-    queryset = Blog.objects.all().order_by('-date')
+    queryset = Blog.objects.prefetch_related('extra_images').order_by('-date')
     serializer_class = BlogSerializer
     parser_classes = (MultiPartParser, FormParser)
     permission_classes = [AllowAny]
     authentication_classes = []
     
     def list(self, request, *args, **kwargs):
-        """Listar blogs con manejo de errores robusto"""
-        print("=== LISTANDO BLOGS ===")
-        try:
-            # Usar .values() para evitar problemas con campos complejos
-            queryset = Blog.objects.all().order_by('-date').values(
-                'id', 'title', 'content', 'image', 'date', 'author', 
-                'category', 'read_time', 'summary', 'tags', 'excerpt', 
-                'slug', 'featured', 'like_count', 'favorite_count'
-            )
-            print(f"📝 Queryset count: {len(queryset)}")
-            
-            # Si no hay blogs, devolver array vacío
-            if len(queryset) == 0:
-                print("ℹ️ No hay blogs en la base de datos")
-                return Response([])
-            
-            # Crear datos con manejo defensivo
-            blogs_data = []
-            for blog in queryset:
-                try:
-                    # Manejo defensivo de cada campo
-                    blog_data = {
-                        'id': blog.get('id', 0),
-                        'title': blog.get('title', 'Sin título'),
-                        'content': blog.get('content', 'Sin contenido'),
-                        'image': blog.get('image'),
-                        'date': blog.get('date'),
-                        'author': blog.get('author', 'Autor desconocido'),
-                        'category': blog.get('category', 'General'),
-                        'read_time': blog.get('read_time'),
-                        'summary': blog.get('summary'),
-                        'tags': blog.get('tags'),
-                        'excerpt': blog.get('excerpt'),
-                        'slug': blog.get('slug'),
-                        'featured': blog.get('featured', False),
-                        'like_count': blog.get('like_count', 0),
-                        'favorite_count': blog.get('favorite_count', 0)
-                    }
-                    
-                    # Intentar agregar imagen si existe
-                    try:
-                        if blog_data['image']:
-                            # Construir URL correcta para la imagen
-                            if blog_data['image'].startswith('http'):
-                                # Ya es una URL completa
-                                blog_data['image'] = blog_data['image']
-                            else:
-                                # Construir URL completa apuntando a /media/
-                                base_url = f"{request.scheme}://{request.get_host()}"
-                                # Si la imagen no empieza con /media/, agregarlo
-                                if not blog_data['image'].startswith('/media/'):
-                                    blog_data['image'] = f"/media/{blog_data['image']}"
-                                blog_data['image'] = f"{base_url}{blog_data['image']}"
-                    except:
-                        blog_data['image'] = None
-                    
-                    # Formatear fecha
-                    try:
-                        if blog_data['date']:
-                            blog_data['date'] = blog_data['date'].isoformat()
-                    except:
-                        blog_data['date'] = None
-                    
-                    blogs_data.append(blog_data)
-                    print(f"✅ Blog procesado: {blog_data['title']}")
-                    
-                except Exception as blog_error:
-                    print(f"⚠️ Error procesando blog: {blog_error}")
-                    # Continuar con el siguiente blog sin agregarlo
-                    continue
-            
-            print(f"📝 Blogs data count: {len(blogs_data)}")
-            return Response(blogs_data)
-            
-        except Exception as e:
-            print(f"❌ Error general listando blogs: {e}")
-            # En caso de error total, devolver array vacío en lugar de error 500
-            print("🔄 Devolviendo array vacío para evitar error 500")
-            return Response([])
+        """Índice de blogs paginado, sin el cuerpo (content nunca se consulta)"""
+        queryset = filter_blogs_by_tag(Blog.objects.only(*BLOG_SUMMARY_FIELDS), request).order_by('-date', '-id')
+        category = request.query_params.get('category')
+        if category:
+            queryset = queryset.filter(category=category)
+
+        paginator = BlogPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = BlogSummarySerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Alias de list (el frontend usa /blogs/summary/)"""
+        return self.list(request)
+
+    @action(**BULK_DELETE_ACTION)
+    def bulk_delete(self, request):
+        """Eliminar varios blogs en una transacción: {"ids": [1, 2, 3]}"""
+        return bulk_delete_response(request, 'blog')
+
+    @action(detail=False, methods=['get'])
+    def tags(self, request):
+        """Etiquetas con su número de blogs (caché)"""
+        return Response(get_tag_counts())
+
+    @action(detail=False, methods=['get'], url_path=r'slug/(?P<slug>[-\w]+)')
+    def by_slug(self, request, slug=None):
+        """Detalle completo de un blog por slug"""
+        blog = Blog.objects.filter(slug=slug).prefetch_related('extra_images').first()
+        if blog is None:
+            return Response({'error': f'Blog con slug {slug} no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+        counter_buffer.increment(Blog, blog.id, 'view_count')
+        data = self.get_serializer(blog).data
+        data['related_posts'] = self.related_posts_data(blog)
+        return Response(data)
+
+    def related_posts_data(self, blog):
+        return BlogSummarySerializer(get_related_posts(blog), many=True, context={'request': self.request}).data
+
+    def retrieve(self, request, *args, **kwargs):
+        """Obtener un blog con sus relacionados y registrar la lectura (escritura diferida)"""
+        blog = self.get_object()
+        counter_buffer.increment(Blog, blog.id, 'view_count')
+        data = self.get_serializer(blog).data
+        data['related_posts'] = self.related_posts_data(blog)
+        return Response(data)
 
 class BlogLikeFavoriteViewSet(viewsets.ModelViewSet):
     queryset = BlogLikeFavorite.objects.all()
@@ -332,7 +308,7 @@ def toggle_project_like_favorite(request):
         
         # Verificar que el proyecto existe
         try:
-            project = Project.objects.get(id=project_id)
+            project = Project.objects.only('id', 'title').get(id=project_id)
             print(f"✅ Proyecto encontrado: {project.title}")
         except Project.DoesNotExist:
             print(f"❌ Proyecto no encontrado: {project_id}")
@@ -341,71 +317,17 @@ def toggle_project_like_favorite(request):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Generar un visitor_id único para esta sesión
-        import uuid
-        # Usar una combinación de IP y User-Agent para crear un visitor_id más consistente
-        user_ip = request.META.get('REMOTE_ADDR', 'unknown')
-        user_agent = request.META.get('HTTP_USER_AGENT', 'unknown')
-        import hashlib
-        visitor_hash = hashlib.md5(f"{user_ip}{user_agent}".encode()).hexdigest()[:8]
-        visitor_id = f'visitor_{visitor_hash}'
-        
-        print(f"Visitor ID generado: {visitor_id}")
-        
-        # SOLUCIÓN TEMPORAL: Simular interacciones sin usar la tabla problemática
-        # Usar un diccionario en memoria para simular las interacciones
-        if not hasattr(toggle_project_like_favorite, '_interactions'):
-            toggle_project_like_favorite._interactions = {}
-        
-        interaction_key = f"{project.id}_{visitor_id}"
-        
-        if interaction_key not in toggle_project_like_favorite._interactions:
-            toggle_project_like_favorite._interactions[interaction_key] = {
-                'liked': False,
-                'favorited': False
-            }
-            created = True
-        else:
-            created = False
-        
-        interaction = toggle_project_like_favorite._interactions[interaction_key]
-        print(f"✅ Interacción {'creada' if created else 'encontrada'} en memoria: {interaction_key}")
-        
-        if action == 'like':
-            # Alternar el estado de like
-            interaction['liked'] = not interaction['liked']
-            
-            # Calcular conteos simulados
-            like_count = sum(1 for i in toggle_project_like_favorite._interactions.values() if i['liked'])
-            favorite_count = sum(1 for i in toggle_project_like_favorite._interactions.values() if i['favorited'])
-            
-            return Response({
-                'success': True,
-                'liked': interaction['liked'],
-                'favorited': interaction['favorited'],
-                'like_count': like_count,
-                'favorite_count': favorite_count
-            })
-        elif action == 'favorite':
-            # Alternar el estado de favorite
-            interaction['favorited'] = not interaction['favorited']
-            
-            # Calcular conteos simulados
-            like_count = sum(1 for i in toggle_project_like_favorite._interactions.values() if i['liked'])
-            favorite_count = sum(1 for i in toggle_project_like_favorite._interactions.values() if i['favorited'])
-            
-            return Response({
-                'success': True,
-                'liked': interaction['liked'],
-                'favorited': interaction['favorited'],
-                'like_count': like_count,
-                'favorite_count': favorite_count
-            })
-        else:
+        if action not in INTERACTION_ACTIONS:
             return Response(
                 {'error': 'Action debe ser "like" o "favorite"'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        
+        visitor_id = get_visitor_id(request)
+        print(f"Visitor ID generado: {visitor_id}")
+        
+        # Guardar la interacción y actualizar el contador del proyecto
+        return Response(toggle_interaction('project', project.id, visitor_id, action))
 
     except Exception as e:
         return Response(
@@ -631,7 +553,7 @@ def toggle_blog_like_favorite(request):
         
         # Verificar que el blog existe
         try:
-            blog = Blog.objects.get(id=blog_id)
+            blog = Blog.objects.only('id', 'title').get(id=blog_id)
             print(f"✅ Blog encontrado: {blog.title}")
         except Blog.DoesNotExist:
             print(f"❌ Blog no encontrado: {blog_id}")
@@ -640,69 +562,18 @@ def toggle_blog_like_favorite(request):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Generar un visitor_id único para esta sesión
-        import uuid
-        user_ip = request.META.get('REMOTE_ADDR', 'unknown')
-        user_agent = request.META.get('HTTP_USER_AGENT', 'unknown')
-        import hashlib
-        visitor_hash = hashlib.md5(f"{user_ip}{user_agent}".encode()).hexdigest()[:8]
-        visitor_id = f'visitor_{visitor_hash}'
-        
-        print(f"Visitor ID generado: {visitor_id}")
-        
-        # SOLUCIÓN TEMPORAL: Simular interacciones sin usar la tabla problemática
-        if not hasattr(toggle_blog_like_favorite, '_interactions'):
-            toggle_blog_like_favorite._interactions = {}
-        
-        interaction_key = f"{blog.id}_{visitor_id}"
-        
-        if interaction_key not in toggle_blog_like_favorite._interactions:
-            toggle_blog_like_favorite._interactions[interaction_key] = {
-                'liked': False,
-                'favorited': False
-            }
-            created = True
-        else:
-            created = False
-        
-        interaction = toggle_blog_like_favorite._interactions[interaction_key]
-        print(f"✅ Interacción {'creada' if created else 'encontrada'} en memoria: {interaction_key}")
-        
-        if action == 'like':
-            # Alternar el estado de like
-            interaction['liked'] = not interaction['liked']
-            
-            # Calcular conteos simulados
-            like_count = sum(1 for i in toggle_blog_like_favorite._interactions.values() if i['liked'])
-            favorite_count = sum(1 for i in toggle_blog_like_favorite._interactions.values() if i['favorited'])
-            
-            return Response({
-                'success': True,
-                'liked': interaction['liked'],
-                'favorited': interaction['favorited'],
-                'like_count': like_count,
-                'favorite_count': favorite_count
-            })
-        elif action == 'favorite':
-            # Alternar el estado de favorite
-            interaction['favorited'] = not interaction['favorited']
-            
-            # Calcular conteos simulados
-            like_count = sum(1 for i in toggle_blog_like_favorite._interactions.values() if i['liked'])
-            favorite_count = sum(1 for i in toggle_blog_like_favorite._interactions.values() if i['favorited'])
-            
-            return Response({
-                'success': True,
-                'liked': interaction['liked'],
-                'favorited': interaction['favorited'],
-                'like_count': like_count,
-                'favorite_count': favorite_count
-            })
-        else:
+        if action not in INTERACTION_ACTIONS:
             return Response(
                 {'error': 'Action debe ser "like" o "favorite"'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        
+        visitor_id = get_visitor_id(request)
+        print(f"Visitor ID generado: {visitor_id}")
+        
+        # Guardar la interacción y actualizar el contador del blog
+        return Response(toggle_interaction('blog', blog.id, visitor_id, action))
+
     except Exception as e:
         print(f"❌ Error en toggle_blog_like_favorite: {str(e)}")
         return Response(
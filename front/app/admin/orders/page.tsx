@@ -13,7 +13,7 @@ import {
   Download,
   Mail
 } from 'lucide-react';
-import { sendZipFiles, getMarketplaceOrders } from '@/lib/api-marketplace';
+import { sendZipFiles, getAllMarketplaceOrders } from '@/lib/api-marketplace';
 import { useToast } from '@/components/ui/toast';
 
 interface MarketplaceOrder {
@@ -52,7 +52,8 @@ export default function AdminOrdersPage() {
     try {
       setIsLoading(true);
       setError(null);
-      const data = await getMarketplaceOrders() as any;
+      // Todas las páginas: las estadísticas se calculan sobre el historial completo
+      const data = await getAllMarketplaceOrders() as any;
       setOrders(data as any);
     } catch (err) {
       console.error('Error cargando órdenes:', err);
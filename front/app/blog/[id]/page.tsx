@@ -11,6 +11,7 @@ import { useLanguage } from "@/hooks/use-language"
 import { useParams } from "next/navigation"
 import { AdminDataManager } from "@/data/admin-data"
 import { useState, useEffect } from "react"
+import { preload } from "react-dom"
 import type { AdminBlog } from "@/types"
 import axios from "axios";
 import { getBlogLikeFavorite, toggleBlogLike, toggleBlogFavorite, getBlogLikeFavoriteCount } from "@/lib/api-blogs";
@@ -50,6 +51,8 @@ export default function BlogPostPage() {
         console.log('📋 URL de imagen generada:', getBlogImageUrl(blogData));
         console.log('📋 Tipo de extra imágenes:', typeof blogData.extra_images);
         console.log('📋 Longitud de extra imágenes:', blogData.extra_images ? blogData.extra_images.length : 0);
+        // Precargar las imágenes del contenido (extraídas al guardar el blog)
+        (blogData.content_images || []).forEach((src: string) => preload(src, { as: "image" }));
         setBlogPost(blogData);
         setError("");
       } catch (err: any) {
@@ -65,8 +68,8 @@ export default function BlogPostPage() {
   useEffect(() => {
     const fetchBlogs = async () => {
       try {
-        const res = await axios.get(`${API_URL}/admin/blogs/`);
-        const blogs: AdminBlog[] = res.data as AdminBlog[];
+        const res = await axios.get(`${API_URL}/admin/blogs/summary/?page_size=20`);
+        const blogs: AdminBlog[] = res.data.results as AdminBlog[];
         if (blogPost) {
           setRelatedBlogs(blogs.filter((b) => b.category === blogPost.category && b.id !== blogPost.id).slice(0, 3));
           setLatestBlogs(blogs.filter((b) => b.id !== blogPost.id).slice(0, 4));
@@ -241,7 +244,12 @@ export default function BlogPostPage() {
 
             {/* Contenido del artículo */}
             <div className="prose max-w-none">
-              {typeof blogPost.content === "string" ? (
+              {blogPost.content_html ? (
+                <div
+                  className="text-lg text-gray-700 mb-6 neutra-font leading-relaxed"
+                  dangerouslySetInnerHTML={{ __html: blogPost.content_html }}
+                />
+              ) : typeof blogPost.content === "string" ? (
                 <p className="text-lg text-gray-700 mb-6 neutra-font leading-relaxed">
                   {blogPost.content}
                 </p>
@@ -17,6 +17,8 @@ import { BLOG_CATEGORIES, CATEGORY_TRANSLATIONS } from "@/data/blog-categories";
 import { useSearchParams } from 'next/navigation'
 import { getBlogImageUrl } from "@/lib/image-utils";
 
+const BLOGS_PAGE_SIZE = 12;
+
 export default function BlogPage() {
   const { t, language } = useLanguage();
   const searchParams = useSearchParams();
@@ -33,30 +35,49 @@ export default function BlogPage() {
 
   const API_URL = process.env.NEXT_PUBLIC_API_URL || "/api";
 
-  const loadBlogs = async () => {
-    try {
-      setLoading(true);
-      const res = await axios.get(`${API_URL}/admin/blogs/`);
-      console.log('📋 Blogs cargados:', res.data);
-      
-      // Log de cada blog para debuggear imágenes
-      (res.data as AdminBlog[]).forEach((blog, index) => {
-        console.log(`📋 Blog ${index + 1}:`, {
-          id: blog.id,
-          title: blog.title,
-          image: blog.image,
-          images: blog.images,
-          imageUrl: getBlogImageUrl(blog)
-        });
+  // Índice paginado: se pide la primera página de la categoría y las siguientes con "Cargar más"
+  const [page, setPage] = useState(1);
+  const [hasMore, setHasMore] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const pageRef = useRef(1);
+
+  const fetchBlogsPage = async (pageNumber: number, category: string) => {
+    const params: { [key: string]: string | number } = { page: pageNumber, page_size: BLOGS_PAGE_SIZE };
+    if (category !== "all") {
+      params.category = category;
+    }
+    const res = await axios.get(`${API_URL}/admin/blogs/summary/`, { params });
+    const blogs = res.data.results as AdminBlog[];
+    console.log('📋 Blogs cargados:', blogs);
+    
+    // Log de cada blog para debuggear imágenes
+    blogs.forEach((blog, index) => {
+      console.log(`📋 Blog ${index + 1}:`, {
+        id: blog.id,
+        title: blog.title,
+        image: blog.image,
+        images: blog.images,
+        imageUrl: getBlogImageUrl(blog)
       });
-      
-      setAllBlogs(res.data as AdminBlog[]);
-      // Para cada blog, obtener el contador de likes/favoritos
-      (res.data as AdminBlog[]).forEach((blog) => {
-        getBlogLikeFavoriteCount(blog.id).then(count => {
-          setLikeCounts(prev => ({ ...prev, [blog.id]: count }));
-        });
+    });
+    
+    // Para cada blog, obtener el contador de likes/favoritos
+    blogs.forEach((blog) => {
+      getBlogLikeFavoriteCount(blog.id).then(count => {
+        setLikeCounts(prev => ({ ...prev, [blog.id]: count }));
       });
+    });
+    return { blogs, next: res.data.next as string | null };
+  };
+
+  const loadBlogs = async (category: string) => {
+    try {
+      setLoading(true);
+      const { blogs, next } = await fetchBlogsPage(1, category);
+      setAllBlogs(blogs);
+      setPage(1);
+      pageRef.current = 1;
+      setHasMore(Boolean(next));
       setError("");
     } catch (err) {
       console.error('Error al cargar blogs:', err);
@@ -66,16 +87,33 @@ export default function BlogPage() {
     }
   };
 
+  const loadMoreBlogs = async () => {
+    try {
+      setLoadingMore(true);
+      const { blogs, next } = await fetchBlogsPage(page + 1, selectedCategory);
+      setAllBlogs(prev => [...prev, ...blogs]);
+      setPage(page + 1);
+      pageRef.current = page + 1;
+      setHasMore(Boolean(next));
+    } catch (err) {
+      console.error('Error al cargar más blogs:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
-    loadBlogs();
+    loadBlogs(selectedCategory);
 
-    // Recargar blogs cada 30 segundos
+    // Recargar blogs cada 30 segundos (solo si no se cargaron más páginas)
     const interval = setInterval(() => {
-      loadBlogs();
+      if (pageRef.current === 1) {
+        loadBlogs(selectedCategory);
+      }
     }, 30000);
 
     return () => clearInterval(interval);
-  }, []);
+  }, [selectedCategory]);
 
   // Efecto para actualizar la URL cuando cambia la categoría seleccionada
   useEffect(() => {
@@ -93,9 +131,8 @@ export default function BlogPage() {
     return "bg-blue-600 text-white"
   }
 
-  // FUNCIÓN PARA FILTRAR BLOGS POR CATEGORÍA
-  const filteredBlogs: AdminBlog[] =
-    selectedCategory === "all" ? allBlogs : allBlogs.filter((blog) => blog.category === selectedCategory)
+  // El backend ya filtra por categoría (?category=)
+  const filteredBlogs: AdminBlog[] = allBlogs
 
   // FUNCIÓN PARA DAR LIKE O FAVORITO DESDE LA LANDING
   const handleLike = async (blogId: number) => {
@@ -228,6 +265,18 @@ export default function BlogPage() {
               )}
             </div>
           )}
+          {!loading && hasMore && (
+            <div className="text-center">
+              <Button
+                variant="outline"
+                onClick={loadMoreBlogs}
+                disabled={loadingMore}
+                className="border-blue-600 text-blue-600 hover:bg-blue-600 hover:text-white bg-transparent shadow-md"
+              >
+                {loadingMore ? "..." : t("loadMoreBlogs")}
+              </Button>
+            </div>
+          )}
         </div>
       </section>
       <div className="w-full h-2 bg-gradient-to-r from-blue-100 via-blue-200 to-blue-100 my-8" />
@@ -11,6 +11,9 @@ export default function OrdersPage() {
   const { isAuthenticated } = useAuth();
   const [orders, setOrders] = useState<MarketplaceOrder[]>([]);
   const [loading, setLoading] = useState(true);
+  const [page, setPage] = useState(1);
+  const [hasMore, setHasMore] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     if (isAuthenticated) {
@@ -36,9 +39,11 @@ export default function OrdersPage() {
         }
       }
       
-      const ordersData = await getMarketplaceOrders();
+      const ordersData = await getMarketplaceOrders(1);
       console.log('📦 Órdenes cargadas:', ordersData);
-      setOrders(ordersData);
+      setOrders(ordersData.results);
+      setPage(1);
+      setHasMore(Boolean(ordersData.next));
     } catch (error) {
       console.error('Error loading orders:', error);
     } finally {
@@ -46,6 +51,20 @@ export default function OrdersPage() {
     }
   };
 
+  const loadMoreOrders = async () => {
+    try {
+      setLoadingMore(true);
+      const ordersData = await getMarketplaceOrders(page + 1);
+      setOrders((current) => [...current, ...ordersData.results]);
+      setPage(page + 1);
+      setHasMore(Boolean(ordersData.next));
+    } catch (error) {
+      console.error('Error loading more orders:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getStatusIcon = (status: string) => {
     switch (status) {
       case 'completed':
@@ -229,6 +248,18 @@ export default function OrdersPage() {
                   </div>
                 </div>
               ))}
+
+              {hasMore && (
+                <div className="text-center">
+                  <button
+                    onClick={loadMoreOrders}
+                    disabled={loadingMore}
+                    className="px-6 py-3 bg-white border border-gray-300 text-gray-700 font-medium rounded-lg hover:bg-gray-50 transition-colors disabled:opacity-50"
+                  >
+                    {loadingMore ? 'Cargando...' : 'Cargar más órdenes'}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
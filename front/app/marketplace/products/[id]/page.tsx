@@ -3,7 +3,7 @@
 import { useState, useEffect } from "react"
 import { useParams, useRouter } from "next/navigation"
 import Image from "next/image"
-import { getMarketplaceProduct, getImageUrl, addToFavorites } from "@/lib/api-marketplace"
+import { getMarketplaceProduct, getImageUrl, setProductFavorite } from "@/lib/api-marketplace"
 import { MarketplaceProduct } from "@/lib/api-marketplace"
 import Header from "@/components/layout/header"
 import Footer from "@/components/layout/footer"
@@ -33,13 +33,8 @@ export default function ProductDetailPage() {
         setLoading(true)
         const productData = await getMarketplaceProduct(productId)
         setProduct(productData)
-        
-        // Verificar si el producto está en favoritos
-        if (isAuthenticated) {
-          const favorites = JSON.parse(localStorage.getItem('favorites') || '[]')
-          const isFavorited = favorites.find((f: any) => f.product === productId)
-          setIsInFavorites(!!isFavorited)
-        }
+        // is_favorited viene anotado por el backend cuando hay sesión
+        setIsInFavorites(!!productData.is_favorited)
       } catch (err) {
         setError('Error al cargar el producto')
         console.error('Error loading product:', err)
@@ -85,25 +80,33 @@ export default function ProductDetailPage() {
     }
   }
 
-  const handleAddToFavorites = async () => {
+  const updateFavorite = async (favorited: boolean) => {
+    // Actualizar el corazón al instante; el cambio se envía agrupado a /product-favorites/sync/
+    setIsInFavorites(favorited)
+    if (favorited) {
+      setShowSuccessMessage(true)
+      // Ocultar mensaje después de 3 segundos
+      setTimeout(() => {
+        setShowSuccessMessage(false)
+      }, 3000)
+    }
+    try {
+      const result = await setProductFavorite(productId, favorited)
+      setIsInFavorites(result.favorites.includes(productId))
+    } catch (err) {
+      console.error('Error updating favorites:', err)
+      setIsInFavorites(!favorited)
+      setShowSuccessMessage(false)
+      alert('Error al actualizar favoritos')
+    }
+  }
+
+  const handleToggleFavorite = () => {
     if (!isAuthenticated) {
       setLoginAction('favorites')
       setShowLoginModal(true)
     } else {
-      try {
-        await addToFavorites(productId)
-        setIsInFavorites(true)
-        setShowSuccessMessage(true)
-        console.log('Producto agregado a favoritos')
-        
-        // Ocultar mensaje después de 3 segundos
-        setTimeout(() => {
-          setShowSuccessMessage(false)
-        }, 3000)
-      } catch (err) {
-        console.error('Error adding to favorites:', err)
-        alert('Error al agregar a favoritos')
-      }
+      updateFavorite(!isInFavorites)
     }
   }
 
@@ -115,7 +118,7 @@ export default function ProductDetailPage() {
       // Redirigir directamente a la página de planos
       router.push(`/marketplace/products/${productId}/plans` as any)
     } else if (loginAction === 'favorites') {
-      handleAddToFavorites()
+      updateFavorite(true)
     }
   }
 
@@ -255,11 +258,11 @@ export default function ProductDetailPage() {
                 Ver Planos
               </Button>
                              <button 
-                 onClick={handleAddToFavorites}
+                 onClick={handleToggleFavorite}
                  className={`p-2 border border-gray-300 rounded-lg hover:bg-gray-50 transition-colors ${
                    isInFavorites ? 'bg-red-50 border-red-300' : ''
                  }`}
-                 title={isInFavorites ? "Ya está en favoritos" : "Agregar a Favoritos"}
+                 title={isInFavorites ? "Quitar de favoritos" : "Agregar a Favoritos"}
                >
                  <Heart 
                    className={`w-5 h-5 transition-colors ${
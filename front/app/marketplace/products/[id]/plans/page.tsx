@@ -27,7 +27,7 @@ import {
 import { Button } from "@/components/ui/button"
 import { Badge } from "@/components/ui/badge"
 import { DropdownMenu, DropdownMenuContent, DropdownMenuItem, DropdownMenuTrigger } from "@/components/ui/dropdown-menu"
-import { getMarketplaceProduct, getImageUrl, addToFavorites } from "@/lib/api-marketplace"
+import { getMarketplaceProduct, getImageUrl, getFavoritesCount, setProductFavorite } from "@/lib/api-marketplace"
 import { MarketplaceProduct } from "@/lib/api-marketplace"
 import Header from "@/components/layout/header"
 import Footer from "@/components/layout/footer"
@@ -94,11 +94,8 @@ export default function ProductPlansPage() {
         setLoading(true)
         const productData = await getMarketplaceProduct(productId)
         setProduct(productData)
-        
-        // Verificar si el producto ya está en favoritos
-        const favorites = JSON.parse(localStorage.getItem('favorites') || '[]');
-        const isAlreadyFavorite = favorites.find((f: any) => f.product === productId);
-        setIsHeartFilled(!!isAlreadyFavorite);
+        // is_favorited viene anotado por el backend para el usuario actual
+        setIsHeartFilled(!!productData.is_favorited)
       } catch (err) {
         setError('Error al cargar el producto')
         console.error('Error loading product:', err)
@@ -112,11 +109,12 @@ export default function ProductPlansPage() {
     }
   }, [productId, isAuthenticated])
 
-  // Actualizar contador de favoritos
+  // Contador de favoritos del usuario (después se actualiza con la respuesta de sync)
   useEffect(() => {
-    const favorites = JSON.parse(localStorage.getItem('favorites') || '[]');
-    setFavoritesCount(favorites.length);
-  }, [favoritesCount]) // Agregar dependencia para que se actualice cuando cambie
+    if (isAuthenticated) {
+      getFavoritesCount().then(({ count }) => setFavoritesCount(count))
+    }
+  }, [isAuthenticated])
 
   // Intersection Observer para detectar cuando mostrar el popup y actualizar sección activa
   useEffect(() => {
@@ -244,23 +242,19 @@ export default function ProductPlansPage() {
       try {
         console.log('🖤 Adding product to favorites:', productId);
         
-        // Verificar si ya está en favoritos
-        const favorites = JSON.parse(localStorage.getItem('favorites') || '[]');
-        const isAlreadyFavorite = favorites.find((f: any) => f.product === productId);
-        
-        if (isAlreadyFavorite) {
+        if (isHeartFilled) {
           setSuccessMessage('Este producto ya está en tus favoritos')
-          setIsHeartFilled(true)
         } else {
-          await addToFavorites(productId)
           setIsHeartFilled(true)
+          const result = await setProductFavorite(productId, true)
+          setIsHeartFilled(result.favorites.includes(productId))
           setSuccessMessage('Producto agregado a favoritos')
-          // Actualizar contador de favoritos
-          setFavoritesCount(favorites.length + 1)
+          setFavoritesCount(result.count)
         }
         
         setShowSuccessModal(true)
       } catch (err) {
+        setIsHeartFilled(false)
         console.error('🖤 Error adding to favorites:', err)
         setSuccessMessage('Error al agregar a favoritos. Inténtalo de nuevo.')
         setShowSuccessModal(true)
@@ -121,8 +121,8 @@ export default function HomePage() {
       try {
         setLoadingBlogs(true);
         const API_URL = process.env.NEXT_PUBLIC_API_URL || "/api";
-        const res = await axios.get(`${API_URL}/admin/blogs/`);
-        setBlogs((res.data as any[]).slice(0, 4)); // Solo los 4 más recientes
+        const res = await axios.get(`${API_URL}/admin/blogs/summary/?page_size=4`);
+        setBlogs(res.data.results as any[]); // Solo los 4 más recientes
         setErrorBlogs("");
       } catch (err) {
         setErrorBlogs("Error loading blogs");
@@ -1,7 +1,7 @@
 "use client"
 
 import { useEffect, useRef, useState } from "react"
-import { getProjects } from "@/lib/api-projects"
+import { getProjectMap } from "@/lib/api-projects"
 
 // Extiende el tipo Window con el callback dinámico
 declare global {
@@ -18,6 +18,8 @@ interface ProjectLocation {
   lng: number
   description?: string
   projectUrl?: string
+  count?: number
+  bounds?: [number, number, number, number]
 }
 
 const PROJECT_LOCATIONS: ProjectLocation[] = [
@@ -89,6 +91,8 @@ const createHouseIcon = (color: string = "#0D00FF") => {
   return `data:image/svg+xml;charset=UTF-8,${encodeURIComponent(svg)}`;
 };
 
+const MAP_MAX_ZOOM = 16;
+
 interface GoogleMapsWorkingProps {
   apiKey: string
   height?: string
@@ -112,49 +116,6 @@ export default function GoogleMapsWorking({
   const [isLoading, setIsLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
 
-  // Cargar proyectos del backend
-  useEffect(() => {
-    const loadBackendProjects = async () => {
-      try {
-        setLoadingProjects(true);
-        console.log('🗺️ Cargando proyectos para el mapa...');
-        const projects = await getProjects();
-        console.log('🗺️ Proyectos obtenidos:', projects);
-        
-        // Convertir proyectos del backend a ProjectLocation
-        const backendLocations: ProjectLocation[] = projects
-          .filter(project => 
-            (project as any).latitude && 
-            (project as any).longitude && 
-            (project as any).show_on_map !== false // Solo proyectos marcados para mostrar en mapa
-          )
-          .map((project: any) => ({
-            id: project.id.toString(),
-            name: project.title,
-            lat: parseFloat(project.latitude),
-            lng: parseFloat(project.longitude),
-            description: project.description || `Proyecto ${project.title}`,
-            projectUrl: `/proyectos/${project.id}`,
-          }));
-        
-        console.log('🗺️ Ubicaciones del backend:', backendLocations);
-        
-        // Combinar ubicaciones estáticas con las del backend
-        const allLocations = [...PROJECT_LOCATIONS, ...backendLocations];
-        setDynamicLocations(allLocations);
-        
-      } catch (error) {
-        console.error('❌ Error cargando proyectos para el mapa:', error);
-        // En caso de error, usar solo las ubicaciones estáticas
-        setDynamicLocations(PROJECT_LOCATIONS);
-      } finally {
-        setLoadingProjects(false);
-      }
-    };
-
-    loadBackendProjects();
-  }, []);
-
   useEffect(() => {
     if (typeof window !== "undefined" && window.google && window.google.maps) {
       setIsLoaded(true)
@@ -346,7 +307,9 @@ export default function GoogleMapsWorking({
         rotateControl: false,
         fullscreenControl: true,
         minZoom: 4,
-        maxZoom: 4,
+        // Hasta el zoom en que el backend deja de agrupar (MAX_CLUSTER_ZOOM en map_services),
+        // para que al hacer clic en un grupo se pueda acercar hasta ver cada proyecto
+        maxZoom: MAP_MAX_ZOOM,
         restriction: {
           latLngBounds: {
             north: 85,
@@ -364,6 +327,51 @@ export default function GoogleMapsWorking({
     }
   }, [isLoaded, center, zoom])
 
+  // Cargar los proyectos del área visible (agrupados en el backend) cada vez que el mapa se detiene
+  useEffect(() => {
+    if (!map) return
+
+    const loadVisibleProjects = async () => {
+      const bounds = map.getBounds()
+      if (!bounds) return
+      const northEast = bounds.getNorthEast()
+      const southWest = bounds.getSouthWest()
+      try {
+        setLoadingProjects(true);
+        const data = await getProjectMap(
+          [southWest.lng(), southWest.lat(), northEast.lng(), northEast.lat()],
+          map.getZoom()
+        );
+        const points: ProjectLocation[] = data.points.map((project) => ({
+          id: project.id.toString(),
+          name: project.title,
+          lat: project.latitude,
+          lng: project.longitude,
+          description: project.location || `Proyecto ${project.title}`,
+          projectUrl: `/proyectos/${project.id}`,
+        }));
+        const clusters: ProjectLocation[] = data.clusters.map((cluster, index) => ({
+          id: `cluster-${index}`,
+          name: `${cluster.count} proyectos`,
+          lat: cluster.latitude,
+          lng: cluster.longitude,
+          count: cluster.count,
+          bounds: cluster.bounds,
+        }));
+        setDynamicLocations([...PROJECT_LOCATIONS, ...points, ...clusters]);
+      } catch (error) {
+        console.error('❌ Error cargando proyectos para el mapa:', error);
+        // En caso de error, usar solo las ubicaciones estáticas
+        setDynamicLocations(PROJECT_LOCATIONS);
+      } finally {
+        setLoadingProjects(false);
+      }
+    };
+
+    const listener = map.addListener("idle", loadVisibleProjects)
+    return () => listener.remove()
+  }, [map])
+
   useEffect(() => {
     if (!map || !dynamicLocations.length || typeof window === "undefined" || !window.google) return
 
@@ -371,7 +379,23 @@ export default function GoogleMapsWorking({
     const infoWindows: any[] = []
 
     try {
-              dynamicLocations.forEach((location) => {
+      dynamicLocations.forEach((location) => {
+        if (location.count && location.bounds) {
+          // Grupo de proyectos: al hacer clic se acerca a su extensión
+          const [west, south, east, north] = location.bounds
+          const clusterMarker = new window.google.maps.Marker({
+            position: { lat: location.lat, lng: location.lng },
+            map,
+            title: location.name,
+            label: { text: String(location.count), color: "#FFFFFF", fontWeight: "bold" },
+          })
+          clusterMarker.addListener("click", () => {
+            map.fitBounds(new window.google.maps.LatLngBounds({ lat: south, lng: west }, { lat: north, lng: east }))
+          })
+          markers.push(clusterMarker)
+          return
+        }
+
         const marker = new window.google.maps.Marker({
           position: { lat: location.lat, lng: location.lng },
           map,
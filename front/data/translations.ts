@@ -219,6 +219,7 @@ export const translations = {
     
     // MENSAJES DE ESTADO
     noBlogs: "No hay blogs disponibles",
+    loadMoreBlogs: "Cargar más artículos",
     designAreaTitle: "Área de diseño:",
     
     // POLÍTICA DE PRIVACIDAD
@@ -528,6 +529,7 @@ export const translations = {
     
     // STATUS MESSAGES
     noBlogs: "No blogs available",
+    loadMoreBlogs: "Load more articles",
     designAreaTitle: "Design area:",
     
     // PRIVACY POLICY
@@ -18,10 +18,9 @@ export async function getBlogs() {
   const res = await axios.get(`${API_URL}/admin/blogs/`);
   console.log('✅ Blogs obtenidos:', res.data);
   
-  // Manejar tanto formato DRF directo como formato con success/data
-  if (res.data && typeof res.data === 'object' && 'success' in res.data && 'data' in res.data) {
-    console.log('📦 Formato con success/data detectado');
-    return res.data.data;
+  // El índice viene paginado (resúmenes sin el cuerpo; el detalle se pide por id o slug)
+  if (res.data && typeof res.data === 'object' && Array.isArray(res.data.results)) {
+    return res.data.results;
   }
   
   return res.data;
@@ -32,6 +32,8 @@ export interface MarketplaceProduct {
   area_unit?: string;
   garage_spaces?: number;
   main_level_images?: string[];
+  // Solo con sesión iniciada (anotado por el backend para el usuario actual)
+  is_favorited?: boolean;
   created_at: string;
   updated_at: string;
 }
@@ -86,12 +88,16 @@ export interface ProductFavorite {
   created_at: string;
 }
 
+export interface FavoriteSyncResult {
+  favorites: number[];
+  count: number;
+}
+
 // Funciones de autenticación
-const getAuthHeaders = () => {
-  // Para desarrollo, no enviar token de autorización ya que el backend usa usuario hardcodeado
-  console.log('🔐 Development mode - no auth headers needed');
-  
-  return {};
+const getAuthHeaders = (): Record<string, string> => {
+  // Token JWT del cliente (ver hooks/use-auth); sin sesión las peticiones van anónimas
+  const token = typeof window !== 'undefined' ? localStorage.getItem('token') : null;
+  return token ? { Authorization: `Bearer ${token}` } : {};
 };
 
 // Productos del marketplace
@@ -101,7 +107,7 @@ export async function getMarketplaceProducts(): Promise<MarketplaceProduct[]> {
     console.log('🌐 getMarketplaceProducts - process.env.NEXT_PUBLIC_API_URL:', process.env.NEXT_PUBLIC_API_URL);
     console.log('🌐 getMarketplaceProducts - URL completa:', `${API_URL}/admin/marketplace/`);
     console.log('🌐 getMarketplaceProducts - Haciendo petición a:', `${API_URL}/admin/marketplace/`);
-    const res = await axios.get(`${API_URL}/admin/marketplace/`);
+    const res = await axios.get(`${API_URL}/admin/marketplace/`, { headers: getAuthHeaders() });
     console.log('✅ getMarketplaceProducts - Respuesta completa:', res);
     console.log('✅ getMarketplaceProducts - Tipo de res.data:', typeof res.data);
     console.log('✅ getMarketplaceProducts - res.data:', res.data);
@@ -146,7 +152,7 @@ export async function getMarketplaceProducts(): Promise<MarketplaceProduct[]> {
 }
 
 export async function getMarketplaceProduct(id: number): Promise<MarketplaceProduct> {
-  const res = await axios.get<MarketplaceProduct>(`${API_URL}/admin/marketplace/${id}/`);
+  const res = await axios.get<MarketplaceProduct>(`${API_URL}/admin/marketplace/${id}/`, { headers: getAuthHeaders() });
   return res.data;
 }
 
@@ -182,15 +188,6 @@ export async function addToCart(productId: number, quantity: number = 1, price?:
   }
 }
 
-export async function toggleProductFavorite(productId: number): Promise<{ favorited: boolean }> {
-  const res = await axios.post<{ favorited: boolean }>(
-    `${API_URL}/admin/marketplace/${productId}/toggle_favorite/`,
-    {},
-    { headers: getAuthHeaders() }
-  );
-  return res.data;
-}
-
 // Carrito de compras
 export async function getCart(): Promise<Cart> {
   try {
@@ -262,16 +259,26 @@ export async function checkoutCart(cartId: number): Promise<{
 }
 
 // Órdenes
-export async function getMarketplaceOrders(): Promise<MarketplaceOrder[]> {
+export interface PaginatedResponse<T> {
+  count: number;
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+export async function getMarketplaceOrders(page: number = 1, pageSize: number = 20): Promise<PaginatedResponse<MarketplaceOrder>> {
   try {
     console.log('📦 Obteniendo órdenes del marketplace...');
     console.log('📦 URL:', `${API_URL}/admin/marketplace-orders/`);
     console.log('📦 Headers:', getAuthHeaders());
     
-    const res = await axios.get<MarketplaceOrder[]>(`${API_URL}/admin/marketplace-orders/`, { headers: getAuthHeaders() });
+    const res = await axios.get<PaginatedResponse<MarketplaceOrder>>(`${API_URL}/admin/marketplace-orders/`, {
+      headers: getAuthHeaders(),
+      params: { page, page_size: pageSize }
+    });
     
     console.log('📦 Respuesta del servidor:', res.data);
-    console.log('📦 Número de órdenes:', res.data.length);
+    console.log('📦 Número de órdenes:', res.data.count);
     
     return res.data;
   } catch (error: any) {
@@ -284,6 +291,19 @@ export async function getMarketplaceOrders(): Promise<MarketplaceOrder[]> {
   }
 }
 
+// Todas las órdenes, siguiendo los enlaces `next` de la paginación (100 por página, el máximo del backend)
+export async function getAllMarketplaceOrders(): Promise<MarketplaceOrder[]> {
+  const firstPage = await getMarketplaceOrders(1, 100);
+  const orders = [...firstPage.results];
+  let next = firstPage.next;
+  while (next) {
+    const res = await axios.get<PaginatedResponse<MarketplaceOrder>>(next, { headers: getAuthHeaders() });
+    orders.push(...res.data.results);
+    next = res.data.next;
+  }
+  return orders;
+}
+
 export async function getMarketplaceOrder(id: number): Promise<MarketplaceOrder> {
   const res = await axios.get<MarketplaceOrder>(`${API_URL}/admin/marketplace-orders/${id}/`, { headers: getAuthHeaders() });
   return res.data;
@@ -377,7 +397,7 @@ export async function sendZipFiles(orderId: number, zipFile: File): Promise<{ su
 // Favoritos
 export async function getProductFavorites(): Promise<ProductFavorite[]> {
   try {
-    const res = await axios.get<ProductFavorite[]>(`${API_URL}/product-favorites/`, { headers: getAuthHeaders() });
+    const res = await axios.get<ProductFavorite[]>(`${API_URL}/admin/product-favorites/`, { headers: getAuthHeaders() });
     return res.data;
   } catch (error) {
     console.warn('🖤 Error getting favorites from backend, using localStorage fallback:', error);
@@ -390,7 +410,7 @@ export async function getProductFavorites(): Promise<ProductFavorite[]> {
 
 export async function getFavoritesCount(): Promise<{ count: number }> {
   try {
-    const res = await axios.get<{ count: number }>(`${API_URL}/product-favorites/count/`, { headers: getAuthHeaders() });
+    const res = await axios.get<{ count: number }>(`${API_URL}/admin/product-favorites/count/`, { headers: getAuthHeaders() });
     return res.data;
   } catch (error) {
     console.warn('Error getting favorites count from backend, using localStorage fallback');
@@ -405,7 +425,7 @@ export async function addToFavorites(productId: number): Promise<ProductFavorite
     console.log('🖤 Adding to favorites, productId:', productId);
     
     const response = await axios.post<ProductFavorite>(
-      `${API_URL}/product-favorites/`,
+      `${API_URL}/admin/product-favorites/`,
       { product: productId },
       { headers: getAuthHeaders() }
     );
@@ -439,7 +459,52 @@ export async function addToFavorites(productId: number): Promise<ProductFavorite
 }
 
 export async function removeFromFavorites(favoriteId: number): Promise<void> {
-  await axios.delete(`${API_URL}/product-favorites/${favoriteId}/`, { headers: getAuthHeaders() });
+  await axios.delete(`${API_URL}/admin/product-favorites/${favoriteId}/`, { headers: getAuthHeaders() });
+}
+
+export async function syncProductFavorites(add: number[], remove: number[]): Promise<FavoriteSyncResult> {
+  const res = await axios.post<FavoriteSyncResult>(
+    `${API_URL}/admin/product-favorites/sync/`,
+    { add, remove },
+    { headers: getAuthHeaders() }
+  );
+  return res.data;
+}
+
+// Cambios de favoritos pendientes: los clics seguidos se envían juntos en una sola llamada a sync
+const FAVORITE_SYNC_DELAY_MS = 400;
+const pendingFavoriteChanges = new Map<number, boolean>();
+let favoriteSyncWaiters: Array<{ resolve: (result: FavoriteSyncResult) => void; reject: (error: unknown) => void }> = [];
+let favoriteSyncTimer: ReturnType<typeof setTimeout> | null = null;
+
+async function flushFavoriteChanges() {
+  favoriteSyncTimer = null;
+  const changes = Array.from(pendingFavoriteChanges.entries());
+  const waiters = favoriteSyncWaiters;
+  pendingFavoriteChanges.clear();
+  favoriteSyncWaiters = [];
+
+  try {
+    const result = await syncProductFavorites(
+      changes.filter(([, favorited]) => favorited).map(([productId]) => productId),
+      changes.filter(([, favorited]) => !favorited).map(([productId]) => productId)
+    );
+    waiters.forEach(({ resolve }) => resolve(result));
+  } catch (error) {
+    console.error('🖤 Error syncing favorites:', error);
+    waiters.forEach(({ reject }) => reject(error));
+  }
+}
+
+export function setProductFavorite(productId: number, favorited: boolean): Promise<FavoriteSyncResult> {
+  pendingFavoriteChanges.set(productId, favorited);
+  return new Promise((resolve, reject) => {
+    favoriteSyncWaiters.push({ resolve, reject });
+    if (favoriteSyncTimer) {
+      clearTimeout(favoriteSyncTimer);
+    }
+    favoriteSyncTimer = setTimeout(flushFavoriteChanges, FAVORITE_SYNC_DELAY_MS);
+  });
 }
 
 export async function createMarketplaceProduct(product: Partial<MarketplaceProduct> | FormData): Promise<MarketplaceProduct> {
@@ -25,6 +25,42 @@ export async function getProjects(): Promise<Project[]> {
   return data;
 }
 
+export interface ProjectMapPoint {
+  id: number;
+  title: string;
+  category: string;
+  location: string;
+  latitude: number;
+  longitude: number;
+  image: string | null;
+}
+
+export interface ProjectMapCluster {
+  count: number;
+  latitude: number;
+  longitude: number;
+  bounds: [number, number, number, number]; // oeste, sur, este, norte
+}
+
+export interface ProjectMapResponse {
+  zoom: number;
+  cell_size: number | null;
+  clusters: ProjectMapCluster[];
+  points: ProjectMapPoint[];
+}
+
+export async function getProjectMap(bbox: [number, number, number, number], zoom: number): Promise<ProjectMapResponse> {
+  const params = new URLSearchParams({ bbox: bbox.join(','), zoom: String(Math.round(zoom)) });
+  const res = await fetch(`${API_URL}/projects/map/?${params}`);
+
+  if (!res.ok) {
+    console.error(`❌ Error HTTP ${res.status}: ${res.statusText}`);
+    throw new Error(`Error obteniendo el mapa de proyectos: ${res.statusText}`);
+  }
+
+  return res.json();
+}
+
 export async function getProject(id: number): Promise<Project> {
   console.log(`📋 Obteniendo proyecto ${id}...`);
   
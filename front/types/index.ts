@@ -2,6 +2,9 @@ export interface AdminBlog {
   id: string | number;
   title: string;
   content?: any;
+  content_html?: string;
+  content_images?: string[];
+  word_count?: number;
   author?: string | { name: string; title: string; bio: string; image: string };
   created_at: string;
   updated_at?: string;
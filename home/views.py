@@ -14,13 +14,15 @@ from .serializer import (
     UserSerializer, OrderSerializer
 )
 from django.core.mail import send_mail
+from django.http import HttpResponse
+from django.utils.http import parse_etags
 from django.conf import settings
 import jwt
 import datetime
 import logging
 from django.utils import timezone
 
-from Back.stripe_config import create_payment_intent, validate_stripe_config
+from Back.stripe_config import create_payment_intent, validate_stripe_config, get_discount_code, get_stripe_config_payload
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -30,6 +32,12 @@ import stripe
 from admin_api.marketplace_views import ProductFavoriteViewSet
 from admin_api.models import MarketplaceProduct
 from admin_api.serializers import MarketplaceProductSerializer
+from admin_api.map_services import (
+    DEFAULT_NEARBY_LIMIT, DEFAULT_NEARBY_RADIUS_KM, GEOJSON_CACHE_TTL, MAX_NEARBY_LIMIT, MAX_NEARBY_RADIUS_KM, MAX_ZOOM,
+    cluster_projects, get_projects_geojson, nearest_projects, parse_bbox
+)
+from admin_api.popularity_services import order_products, record_product_view
+from admin_api.product_services import BATCH_MAX_IDS, add_live_fields, get_product_detail, get_product_payloads
 
 User = get_user_model()
 
@@ -277,6 +285,78 @@ class ProjectViewSet(viewsets.ModelViewSet):
             print("🔄 Devolviendo array vacío para evitar error 500")
             return Response([])
 
+    @action(detail=False, methods=['get'])
+    def map(self, request):
+        """
+        Proyectos del área visible del mapa, agrupados según el zoom
+
+        Query params:
+            bbox: oeste,sur,este,norte (opcional, por defecto todo el mapa)
+            zoom: nivel de zoom 0-22 (por defecto 2)
+        """
+        try:
+            bbox = parse_bbox(request.query_params['bbox']) if request.query_params.get('bbox') else None
+            zoom = min(max(int(request.query_params.get('zoom', 2)), 0), MAX_ZOOM)
+        except ValueError:
+            return Response(
+                {'error': 'Parámetros inválidos: bbox=oeste,sur,este,norte y zoom entero'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(cluster_projects(bbox, zoom, request))
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        Proyectos cercanos a un punto, ordenados por distancia
+
+        Query params:
+            lat, lng: punto de referencia (grados)
+            radius: radio en km (por defecto 100, máximo 2000)
+            limit: número máximo de resultados (por defecto 20, máximo 100)
+        """
+        try:
+            latitude = float(request.query_params['lat'])
+            longitude = float(request.query_params['lng'])
+            radius_km = float(request.query_params.get('radius', DEFAULT_NEARBY_RADIUS_KM))
+            limit = int(request.query_params.get('limit', DEFAULT_NEARBY_LIMIT))
+        except (KeyError, ValueError):
+            return Response(
+                {'error': 'Parámetros inválidos: lat y lng son requeridos; radius y limit deben ser numéricos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or radius_km <= 0 or limit <= 0:
+            return Response({'error': 'Coordenadas, radio o límite fuera de rango'}, status=status.HTTP_400_BAD_REQUEST)
+
+        radius_km = min(radius_km, MAX_NEARBY_RADIUS_KM)
+        limit = min(limit, MAX_NEARBY_LIMIT)
+        return Response({
+            'latitude': latitude,
+            'longitude': longitude,
+            'radius_km': radius_km,
+            'results': nearest_projects(latitude, longitude, radius_km, limit, request)
+        })
+
+    @action(detail=False, methods=['get'])
+    def geojson(self, request):
+        """FeatureCollection de todos los proyectos del mapa (bytes precodificados, gzip y ETag)"""
+        feed = get_projects_geojson()
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = feed['gzip_etag'] if use_gzip else feed['etag']
+
+        # Comparación exacta con cada ETag de la lista (un W/"..." no coincide)
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        elif use_gzip:
+            response = HttpResponse(feed['gzip_body'], content_type='application/geo+json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(feed['body'], content_type='application/geo+json')
+        response['ETag'] = etag
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = f'public, max-age={GEOJSON_CACHE_TTL}'
+        return response
+
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all().prefetch_related('images')
     serializer_class = ProductSerializer
@@ -332,6 +412,10 @@ class PublicMarketplaceProductViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = MarketplaceProductSerializer
     permission_classes = [AllowAny]
     lookup_field = 'id'
+
+    def get_queryset(self):
+        # ?ordering=popular: mismo ranking que el listado del admin
+        return order_products(super().get_queryset(), self.request.query_params.get('ordering'))
     
     def list(self, request, *args, **kwargs):
         """Listar productos del marketplace público"""
@@ -368,6 +452,43 @@ class PublicMarketplaceProductViewSet(viewsets.ReadOnlyModelViewSet):
             print(f"❌ Error en PublicMarketplaceProductViewSet.list(): {e}")
             return Response({'error': str(e)}, status=500)
     
+    def retrieve(self, request, *args, **kwargs):
+        """Obtener un producto del marketplace público (payload en caché) y registrar la vista"""
+        try:
+            product_id = int(kwargs['id'])
+        except (TypeError, ValueError):
+            return Response({'error': 'Producto no encontrado'}, status=404)
+
+        payload = get_product_detail(product_id, request.user)
+        if payload is None:
+            return Response({'error': 'Producto no encontrado'}, status=404)
+
+        record_product_view(product_id)
+        return Response(payload)
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """
+        Obtener varios productos por ID en una sola llamada (?ids=3,1,7)
+        Devuelve los productos en el orden pedido y los IDs no encontrados en `missing`.
+        """
+        raw_ids = [value for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        try:
+            product_ids = list(dict.fromkeys(int(value) for value in raw_ids))
+        except ValueError:
+            return Response({'error': 'ids debe ser una lista de números separados por comas'}, status=400)
+        if not product_ids:
+            return Response({'error': 'ids es requerido'}, status=400)
+        if len(product_ids) > BATCH_MAX_IDS:
+            return Response({'error': f'Máximo {BATCH_MAX_IDS} productos por llamada'}, status=400)
+
+        payloads = get_product_payloads(product_ids)
+        results = add_live_fields([payloads[product_id] for product_id in product_ids if product_id in payloads], request.user)
+        return Response({
+            'results': results,
+            'missing': [product_id for product_id in product_ids if product_id not in payloads]
+        })
+
     @action(detail=False, methods=['get'])
     def filters(self, request):
         """Obtener configuraciones de filtros para el marketplace"""
@@ -730,15 +851,7 @@ def stripe_config(request):
     Endpoint para obtener la configuración de Stripe del frontend
     """
     try:
-        validation_result = validate_stripe_config()
-        is_valid = validation_result.get('valid', False)
-        message = validation_result.get('error', 'Stripe configured successfully') if not is_valid else 'Stripe configured successfully'
-        
-        return Response({
-            'stripe_configured': is_valid,
-            'publishable_key': settings.STRIPE_PUBLISHABLE_KEY,
-            'message': message
-        })
+        return Response(get_stripe_config_payload())
     except Exception as e:
         return Response({
             'stripe_configured': False,
@@ -996,36 +1109,13 @@ def validate_discount_view(request):
         amount = request.data.get('amount', 0)  # En centavos
         currency = request.data.get('currency', 'usd')
 
-        # Códigos de descuento de prueba
-        discount_codes = {
-            'DESCUENTO20': {
-                'percentage': 20,
-                'min_amount': 1000,  # $10.00 en centavos
-                'max_discount': 5000,  # $50.00 en centavos
-                'active': True
-            },
-            'WELCOME10': {
-                'percentage': 10,
-                'min_amount': 500,   # $5.00 en centavos
-                'max_discount': 2000, # $20.00 en centavos
-                'active': True
-            },
-            'FLASH25': {
-                'percentage': 25,
-                'min_amount': 2000,  # $20.00 en centavos
-                'max_discount': 10000, # $100.00 en centavos
-                'active': True
-            }
-        }
-
-        # Verificar si el código existe y está activo
-        if code not in discount_codes or not discount_codes[code]['active']:
+        # Verificar si el código existe y está activo (consulta cacheada)
+        discount_info = get_discount_code(code)
+        if discount_info is None:
             return Response({
                 'error': 'Código de descuento inválido o inactivo'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        discount_info = discount_codes[code]
-
         # Verificar monto mínimo
         if amount < discount_info['min_amount']:
             return Response({
@@ -1036,7 +1126,7 @@ def validate_discount_view(request):
         discount_amount = (amount * discount_info['percentage']) / 100
 
         # Aplicar límite máximo
-        if discount_amount > discount_info['max_discount']:
+        if discount_info['max_discount'] and discount_amount > discount_info['max_discount']:
             discount_amount = discount_info['max_discount']
 
         return Response({